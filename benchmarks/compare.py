@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files written by benchmarks/run.py.
+
+Prints the percent change in throughput, tail latency, CPU per request and
+peak RSS for every case present in both files (positive is better), and exits with status 1 when any case
+regressed by more than the threshold, so it can gate an upgrade in CI.
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 10
+"""
+
+import json
+
+import click
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+# Metrics compared per case: (label, getter, whether higher is better)
+METRICS = (
+    ('req/s', lambda result: result['requests_per_s'], True),
+    ('p50 ms', lambda result: result['latency_ms']['p50'], False),
+    ('p95 ms', lambda result: result['latency_ms']['p95'], False),
+    ('p99 ms', lambda result: result['latency_ms']['p99'], False),
+    ('cpu ms/req', lambda result: result['cpu_ms_per_request'], False),
+    ('rss MB', lambda result: result['peak_rss_mb'], False)
+)
+
+console = Console()
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {(result['scenario'], result['mode'], result['concurrency']): result for result in report['results']}
+
+
+def change(before: float, after: float, higher_is_better: bool) -> float:
+    """Relative change in percent, signed so that positive is an improvement."""
+    if not before:
+        return 0.0
+    delta = (after - before) / before * 100
+    return delta if higher_is_better else -delta
+
+
+@click.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', type=float, default=10.0, show_default=True,
+              help='Percent worsening of any metric that counts as a regression.')
+def main(baseline, candidate, threshold):
+    """Show per-case changes from BASELINE to CANDIDATE."""
+    before, after = _load(baseline), _load(candidate)
+    cases = [case for case in before if case in after]
+    if not cases:
+        console.print('[yellow]No cases in common.[/yellow]')
+        return
+    
+    table = Table(title=f'{baseline} → {candidate}', box=box.ROUNDED)
+    table.add_column('Case', style='cyan', no_wrap=True)
+    for label, _, _ in METRICS:
+        table.add_column(label, justify='right')
+    
+    regressions = []
+    for case in cases:
+        cells = []
+        for label, get, higher_is_better in METRICS:
+            delta = change(get(before[case]), get(after[case]), higher_is_better)
+            style = 'red' if delta < -threshold else 'green' if delta > threshold else 'dim'
+            cells.append(f'[{style}]{delta:+.1f}%[/{style}]')
+            if delta < -threshold:
+                regressions.append((case, label, delta))
+        scenario, mode, concurrency = case
+        table.add_row(f'{scenario} {mode} c={concurrency}', *cells)
+    
+    console.print(table)
+    for (scenario, mode, concurrency), label, delta in regressions:
+        console.print(f'[red]Regression:[/red] {scenario} {mode} c={concurrency} {label} worse by {-delta:.1f}%')
+    if regressions:
+        raise SystemExit(1)
+    console.print(f'[green]No regressions beyond {threshold:g}%.[/green]')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmarks for the Dify Knowledge Client.
+
+Drives DifyClient and AsyncDifyClient against the in-memory mock server and
+records requests/sec, p50/p95/p99 latency, CPU time per request and peak RSS
+for each scenario, mode and concurrency level. Every case runs in a fresh
+process, so CPU and RSS figures belong to that case alone; the server runs in
+its own process and is not counted.
+
+Results are written as JSON. Compare two runs with benchmarks/compare.py.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py -s retrieve -s paginate -c 8 --mode async
+"""
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import click
+
+from dify_client.api_client import APIError
+from dify_client.client import AsyncDifyClient, DifyClient
+from dify_client.codec import CODECS, MsgspecCodec, default_codec
+from dify_client.mock_server import MockDifyServer
+
+# Documents in the paginated dataset; listed 20 per page
+LIST_DOCUMENTS = 200
+LIST_PAGE_SIZE = 20
+
+# Documents and paragraphs per document in the retrieval corpus
+CORPUS_DOCUMENTS = 100
+CORPUS_PARAGRAPHS = 10
+
+# Segments available to the bulk edit scenario
+EDIT_SEGMENTS = 1000
+
+# Size of the small upload file
+SMALL_FILE_SIZE = 4 * 1024
+
+# Words used to generate corpus text and queries
+VOCABULARY = ('retrieval index chunk segment embedding vector query score rank document '
+              'dataset knowledge token latency throughput cache batch upload metadata '
+              'keyword semantic hybrid rerank child parent paragraph sentence model').split()
+
+# Operations per case when --operations is not given; at least one per worker is always run
+DEFAULT_OPERATIONS = {
+    'retrieve': 2000,
+    'paginate': 100,
+    'upload_small': 500,
+    'upload_huge': 16,
+    'segment_edit': 2000
+}
+
+SCENARIOS = tuple(DEFAULT_OPERATIONS)
+
+# Values of --codec besides the plain codec names
+CODEC_CHOICES = ('auto',) + tuple(CODECS) + ('msgspec-typed',)
+
+
+def _text(seed: int, words: int) -> str:
+    return ' '.join(VOCABULARY[(seed * 7 + i * 13) % len(VOCABULARY)] for i in range(words))
+
+
+def _write_file(path: str, size: int) -> str:
+    line = (_text(1, 12) + '\n').encode('utf-8')
+    with open(path, 'wb') as f:
+        block = line * (64 * 1024 // len(line))
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+    return path
+
+
+def prepare(api_key: str, base_url: str, workdir: str, huge_size: int) -> dict:
+    """Create the datasets and files the scenarios use, through the API."""
+    client = DifyClient(api_key, base_url)
+    kb = client.knowledge_bases
+    suffix = os.urandom(4).hex()
+    
+    corpus = kb.create_dataset(f'bench-retrieve-{suffix}', indexing_technique='high_quality')
+    for doc in range(CORPUS_DOCUMENTS):
+        text = '\n\n'.join(_text(doc * CORPUS_PARAGRAPHS + p, 40) for p in range(CORPUS_PARAGRAPHS))
+        client.documents.create_document_from_text(corpus['id'], f'corpus-{doc}', text)
+    
+    listing = kb.create_dataset(f'bench-list-{suffix}')
+    for doc in range(LIST_DOCUMENTS):
+        client.documents.create_document_from_text(listing['id'], f'list-{doc}', _text(doc, 10))
+    
+    edits = kb.create_dataset(f'bench-segments-{suffix}')
+    document = client.documents.create_document_from_text(edits['id'], 'segments', _text(0, 10))['document']
+    for start in range(0, EDIT_SEGMENTS, 100):
+        client.segments.add_segments(edits['id'], document['id'],
+                                     [{'content': _text(i, 20)} for i in range(start, start + 100)])
+    segment_ids = [segment['id'] for segment in client.segments.iter_segments(edits['id'], document['id'])]
+    
+    uploads = kb.create_dataset(f'bench-upload-{suffix}')
+    return {
+        'api_key': api_key,
+        'base_url': base_url,
+        'retrieve_dataset': corpus['id'],
+        'list_dataset': listing['id'],
+        'upload_dataset': uploads['id'],
+        'edit_dataset': edits['id'],
+        'edit_document': document['id'],
+        'edit_segments': segment_ids,
+        'small_file': _write_file(os.path.join(workdir, 'small.txt'), SMALL_FILE_SIZE),
+        'huge_file': _write_file(os.path.join(workdir, 'huge.txt'), huge_size)
+    }
+
+
+def cleanup(fixture: dict) -> None:
+    """Delete the datasets ``prepare`` created."""
+    client = DifyClient(fixture['api_key'], fixture['base_url'])
+    for key in ('retrieve_dataset', 'list_dataset', 'upload_dataset', 'edit_dataset'):
+        try:
+            client.knowledge_bases.delete_dataset(fixture[key])
+        except APIError as e:
+            click.echo(f'Could not delete {fixture[key]}: {e}')
+
+
+def requests_per_operation(scenario: str) -> int:
+    if scenario == 'paginate':
+        # The last page is short, so has_more ends the walk without an extra request
+        return -(-LIST_DOCUMENTS // LIST_PAGE_SIZE)
+    return 1
+
+
+def sync_operation(scenario: str, client: DifyClient, fixture: dict):
+    """Get a callable performing one operation of ``scenario`` with the sync client."""
+    if scenario == 'retrieve':
+        return lambda i: client.retrieval.retrieve_chunks(fixture['retrieve_dataset'], _text(i, 3))
+    if scenario == 'paginate':
+        return lambda i: list(client.documents.iter_documents(fixture['list_dataset'], limit=LIST_PAGE_SIZE))
+    if scenario in ('upload_small', 'upload_huge'):
+        path = fixture['small_file' if scenario == 'upload_small' else 'huge_file']
+        return lambda i: client.documents.create_document_from_file(fixture['upload_dataset'], path)
+    if scenario == 'segment_edit':
+        segments = fixture['edit_segments']
+        return lambda i: client.segments.update_segment(fixture['edit_dataset'], fixture['edit_document'],
+                                                        segments[i % len(segments)], content=_text(i, 20))
+    raise ValueError(f'Unknown scenario: {scenario}')
+
+
+def async_operation(scenario: str, client: AsyncDifyClient, fixture: dict):
+    """Get a coroutine function performing one operation of ``scenario`` with the async client."""
+    if scenario == 'paginate':
+        async def paginate(i):
+            return [item async for item in client.documents.iter_documents(fixture['list_dataset'],
+                                                                           limit=LIST_PAGE_SIZE)]
+        return paginate
+    # The other managers' methods already return awaitables
+    return sync_operation(scenario, client, fixture)
+
+
+def make_codec(name: str):
+    if name == 'auto':
+        return default_codec()
+    if name == 'msgspec-typed':
+        return MsgspecCodec(typed=True)
+    return CODECS[name]()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def _run_sync(scenario, fixture, concurrency, operations, warmup):
+    client = DifyClient(fixture['api_key'], fixture['base_url'], pool_maxsize=concurrency,
+                        codec=make_codec(fixture['codec']))
+    operation = sync_operation(scenario, client, fixture)
+    for i in range(warmup):
+        operation(i)
+    
+    counter = itertools.count(warmup)
+    latencies, errors = [], []
+    
+    def worker():
+        while True:
+            i = next(counter)
+            if i >= warmup + operations:
+                return
+            started = time.perf_counter()
+            try:
+                operation(i)
+            except APIError as e:
+                errors.append(e.code or str(e.status))
+                continue
+            latencies.append(time.perf_counter() - started)
+    
+    cpu, wall = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return latencies, errors, time.perf_counter() - wall, time.process_time() - cpu
+
+
+async def _run_async(scenario, fixture, concurrency, operations, warmup):
+    async with AsyncDifyClient(fixture['api_key'], fixture['base_url'], max_connections=concurrency,
+                               codec=make_codec(fixture['codec'])) as client:
+        operation = async_operation(scenario, client, fixture)
+        for i in range(warmup):
+            await operation(i)
+        
+        counter = itertools.count(warmup)
+        latencies, errors = [], []
+        
+        async def worker():
+            while True:
+                i = next(counter)
+                if i >= warmup + operations:
+                    return
+                started = time.perf_counter()
+                try:
+                    await operation(i)
+                except APIError as e:
+                    errors.append(e.code or str(e.status))
+                    continue
+                latencies.append(time.perf_counter() - started)
+        
+        cpu, wall = time.process_time(), time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return latencies, errors, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def run_case(scenario: str, mode: str, concurrency: int, operations: int, warmup: int, fixture: dict) -> dict:
+    """Run one case and summarize it. Meant to run in a fresh process."""
+    baseline_rss = _peak_rss_mb()
+    if mode == 'sync':
+        latencies, errors, wall, cpu = _run_sync(scenario, fixture, concurrency, operations, warmup)
+    else:
+        latencies, errors, wall, cpu = asyncio.run(_run_async(scenario, fixture, concurrency, operations, warmup))
+    
+    latencies.sort()
+    requests = (len(latencies) + len(errors)) * requests_per_operation(scenario)
+    ms = 1000.0
+    return {
+        'scenario': scenario,
+        'mode': mode,
+        'concurrency': concurrency,
+        'operations': len(latencies),
+        'requests': requests,
+        'errors': len(errors),
+        'error_codes': {code: errors.count(code) for code in set(errors)},
+        'duration_s': round(wall, 4),
+        'operations_per_s': round(len(latencies) / wall, 2) if wall else 0.0,
+        'requests_per_s': round(requests / wall, 2) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * ms, 3),
+            'p95': round(percentile(latencies, 0.95) * ms, 3),
+            'p99': round(percentile(latencies, 0.99) * ms, 3),
+            'mean': round(sum(latencies) / len(latencies) * ms, 3) if latencies else 0.0,
+            'max': round(latencies[-1] * ms, 3) if latencies else 0.0
+        },
+        'cpu_ms_per_request': round(cpu / requests * ms, 4) if requests else 0.0,
+        'baseline_rss_mb': round(baseline_rss, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1)
+    }
+
+
+def _case_process(queue, *args):
+    try:
+        queue.put(run_case(*args))
+    except Exception as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'})
+
+
+def _serve(conn, options):
+    server = MockDifyServer(**options).start()
+    conn.send(server.base_url)
+    # Serve until the parent closes its end of the pipe
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+    server.stop()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_cases(context, fixture, scenarios, modes, levels, operations, warmup):
+    results = []
+    for scenario, case_mode, concurrency in itertools.product(scenarios, modes, levels):
+        count = max(operations or DEFAULT_OPERATIONS[scenario], concurrency)
+        queue = context.Queue()
+        process = context.Process(target=_case_process,
+                                  args=(queue, scenario, case_mode, concurrency, count, warmup, fixture))
+        process.start()
+        result = queue.get()
+        process.join()
+        if 'error' in result:
+            click.echo(f'{scenario:<13} {case_mode:<5} c={concurrency:<3} failed: {result["error"]}')
+            continue
+        
+        results.append(result)
+        latency_ms = result['latency_ms']
+        click.echo(f"{scenario:<13} {case_mode:<5} c={concurrency:<3} "
+                   f"{result['requests_per_s']:>9.1f} req/s  "
+                   f"p50 {latency_ms['p50']:>8.2f}ms  p95 {latency_ms['p95']:>8.2f}ms  "
+                   f"p99 {latency_ms['p99']:>8.2f}ms  "
+                   f"cpu {result['cpu_ms_per_request']:.3f}ms/req  "
+                   f"rss {result['peak_rss_mb']:.0f}MB  errors {result['errors']}")
+    return results
+
+
+@click.command()
+@click.option('--scenario', '-s', 'scenarios', multiple=True, type=click.Choice(SCENARIOS),
+              help='Scenario to run; repeat for several. Defaults to all.')
+@click.option('--concurrency', '-c', 'levels', multiple=True, type=int,
+              help='Concurrency level; repeat for several. Defaults to 1, 8 and 64.')
+@click.option('--mode', type=click.Choice(['sync', 'async', 'both']), default='both', show_default=True)
+@click.option('--operations', '-n', type=int, default=None,
+              help='Operations per case. Defaults to a per-scenario count.')
+@click.option('--warmup', type=int, default=5, show_default=True, help='Unmeasured operations per case.')
+@click.option('--huge-mb', type=int, default=64, show_default=True, help='Size of the huge upload file in MiB.')
+@click.option('--latency', type=float, default=0.0, show_default=True,
+              help='Seconds the mock server adds to every response, to simulate a network round trip.')
+@click.option('--server-url', default=None,
+              help='Benchmark an already running Dify-compatible server instead of starting the mock.')
+@click.option('--codec', type=click.Choice(CODEC_CHOICES), default='auto', show_default=True,
+              help='JSON codec the client uses; auto picks the fastest installed.')
+@click.option('--api-key', default='bench', show_default=True, help='API key sent to the server.')
+@click.option('--output', '-o', default='benchmark_results.json', show_default=True, help='JSON results file.')
+def main(scenarios, levels, mode, operations, warmup, huge_mb, latency, server_url, codec, api_key, output):
+    """Benchmark the client against a local mock server."""
+    scenarios = scenarios or SCENARIOS
+    levels = levels or (1, 8, 64)
+    modes = ('sync', 'async') if mode == 'both' else (mode,)
+    
+    context = multiprocessing.get_context('spawn')
+    server, conn = None, None
+    if server_url is None:
+        conn, child = context.Pipe()
+        server = context.Process(target=_serve, args=(child, {'latency': latency, 'seed': 0}), daemon=True)
+        server.start()
+        server_url = conn.recv()
+    
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            click.echo(f'Preparing fixtures on {server_url}...')
+            fixture = prepare(api_key, server_url, workdir, huge_mb * 1024 * 1024)
+            fixture['codec'] = codec
+            try:
+                results = _run_cases(context, fixture, scenarios, modes, levels, operations, warmup)
+            finally:
+                cleanup(fixture)
+    finally:
+        if server is not None:
+            conn.close()
+            server.join(timeout=5)
+    
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'server': 'mock' if server is not None else server_url,
+            'server_latency_s': latency if server is not None else None,
+            'huge_file_mb': huge_mb,
+            'codec': repr(make_codec(codec)),
+            'warmup': warmup
+        },
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    click.echo(f'Wrote {len(results)} results to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,9 @@ import click
 
 from dify_client.client import DifyClient
 from dify_client.api_client import APIError
+from dify_client.bulk import BulkSegments
+from dify_client.cache import ResponseCache
+from dify_client.indexing import IndexingWatcher
 
 console = Console()
 
@@ -25,11 +28,14 @@ class DifyInteractiveCLI:
     
     def __init__(self):
         try:
-            self.client = DifyClient()
+            # Menus re-read datasets, metadata and models constantly; cache them briefly
+            self.client = DifyClient(cache=ResponseCache())
             self.current_dataset_id = None
             self.current_dataset_name = None
             self.current_document_id = None
             self.current_document_name = None
+            # Upload batches of this session as (dataset_id, batch, document name)
+            self.recent_batches = []
         except Exception as e:
             console.print(f"[red]Error initializing client: {e}[/red]")
             sys.exit(1)
@@ -248,14 +254,13 @@ class DifyInteractiveCLI:
         try:
             # First list available KBs
             with console.status("[bold green]Loading knowledge bases..."):
-                response = self.client.knowledge_bases.list_datasets(limit=100)
+                # Create a mapping of names to IDs across every page
+                kb_map = {kb['name']: kb['id'] for kb in self.client.knowledge_bases.iter_datasets()}
             
-            if not response.get('data'):
+            if not kb_map:
                 console.print("\n[yellow]No knowledge bases found.[/yellow]")
                 return
             
-            # Create a mapping of names to IDs
-            kb_map = {kb['name']: kb['id'] for kb in response['data']}
             kb_names = list(kb_map.keys())
             
             # Use prompt_toolkit for autocomplete
@@ -651,6 +656,7 @@ class DifyInteractiveCLI:
             
             if response.get('batch'):
                 console.print(f"[dim]Batch: {response['batch']}[/dim]")
+                self.remember_batch(response)
             
         except APIError as e:
             console.print(f"\n[red]API Error: {e}[/red]")
@@ -730,6 +736,7 @@ class DifyInteractiveCLI:
             
             if response.get('batch'):
                 console.print(f"[dim]Batch: {response['batch']}[/dim]")
+                self.remember_batch(response)
             
         except APIError as e:
             console.print(f"\n[red]API Error: {e}[/red]")
@@ -743,17 +750,16 @@ class DifyInteractiveCLI:
         try:
             # First list available documents
             with console.status("[bold green]Loading documents..."):
-                response = self.client.documents.list_documents(
-                    self.current_dataset_id,
-                    limit=100
-                )
+                # Create a mapping of names to IDs across every page
+                doc_map = {
+                    doc['name']: doc['id']
+                    for doc in self.client.documents.iter_documents(self.current_dataset_id)
+                }
             
-            if not response.get('data'):
+            if not doc_map:
                 console.print("\n[yellow]No documents found.[/yellow]")
                 return
             
-            # Create a mapping of names to IDs
-            doc_map = {doc['name']: doc['id'] for doc in response['data']}
             doc_names = list(doc_map.keys())
             
             # Use prompt_toolkit for autocomplete
@@ -823,6 +829,7 @@ class DifyInteractiveCLI:
                         )
                     
                     console.print(f"\n[green]✓ Document updated successfully![/green]")
+                    self.remember_batch(response)
                     
                     if name:
                         self.current_document_name = name
@@ -847,6 +854,7 @@ class DifyInteractiveCLI:
                     )
                 
                 console.print(f"\n[green]✓ Document updated successfully![/green]")
+                self.remember_batch(response)
                 
                 if name:
                     self.current_document_name = name
@@ -888,43 +896,96 @@ class DifyInteractiveCLI:
         
         Prompt.ask("\n[dim]Press Enter to continue[/dim]")
     
+    def remember_batch(self, response: Dict[str, Any]):
+        """Remember the indexing batch of an upload so its status can be checked later."""
+        if response.get('batch'):
+            name = (response.get('document') or {}).get('name', 'N/A')
+            self.recent_batches.append((self.current_dataset_id, response['batch'], name))
+    
     def check_indexing_status(self):
-        """Check document indexing status."""
+        """Check, and optionally watch, the indexing status of this session's uploads."""
         try:
-            batch = Prompt.ask("\nEnter batch number")
-            
-            with console.status("[bold green]Checking indexing status..."):
-                response = self.client.documents.get_document_indexing_status(
-                    self.current_dataset_id,
-                    batch
+            batches = [b for b in self.recent_batches if b[0] == self.current_dataset_id]
+            
+            if batches:
+                table = Table(title="Recent Uploads", box=box.ROUNDED)
+                table.add_column("#", style="dim")
+                table.add_column("Document", style="green")
+                table.add_column("Batch", style="cyan")
+                for i, (_, batch, name) in enumerate(batches, 1):
+                    table.add_row(str(i), name, batch)
+                console.print(table)
+                
+                choice = Prompt.ask(
+                    "\nBatch to check ('all' for every upload, or enter a batch number)",
+                    default="all"
                 )
+                if choice == "all":
+                    selected = [batch for _, batch, _ in batches]
+                elif choice.isdigit() and 1 <= int(choice) <= len(batches):
+                    selected = [batches[int(choice) - 1][1]]
+                else:
+                    selected = [choice]
+            else:
+                selected = [Prompt.ask("\nEnter batch number")]
+            
+            if not Confirm.ask("Wait for indexing to finish?", default=True):
+                with console.status("[bold green]Checking indexing status..."):
+                    results = [
+                        (batch, self.client.documents.get_document_indexing_status(
+                            self.current_dataset_id, batch
+                        ).get('data') or [])
+                        for batch in selected
+                    ]
+                for batch, documents in results:
+                    self.show_indexing_status(batch, documents)
+            else:
+                with IndexingWatcher(self.client.documents, min_interval=1.0, max_interval=10.0) as watcher:
+                    futures = [(batch, watcher.watch(self.current_dataset_id, batch)) for batch in selected]
+                    
+                    with console.status("[bold green]Waiting for indexing...") as status:
+                        for event in watcher.progress():
+                            summary = event['summary']
+                            status.update(
+                                f"[bold green]Indexing: {summary['completed_segments']}/"
+                                f"{summary['total_segments']} segments, "
+                                f"{summary['batches'] - summary['pending']}/{summary['batches']} batches done"
+                            )
+                    
+                    for batch, future in futures:
+                        if future.exception() is not None:
+                            console.print(f"\n[red]Batch {batch}: {future.exception()}[/red]")
+                        else:
+                            self.show_indexing_status(batch, future.result())
             
-            if not response.get('data'):
-                console.print("\n[yellow]No indexing information found.[/yellow]")
-                return
+        except APIError as e:
+            console.print(f"\n[red]API Error: {e}[/red]")
+        except Exception as e:
+            console.print(f"\n[red]Error: {e}[/red]")
+        
+        Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+    
+    def show_indexing_status(self, batch: str, documents: List[Dict[str, Any]]):
+        """Print the indexing status of each document in a batch."""
+        if not documents:
+            console.print(f"\n[yellow]No indexing information found for batch {batch}.[/yellow]")
+            return
+        
+        for doc in documents:
+            status_color = "green" if doc.get('indexing_status') == 'completed' else "yellow"
             
-            for doc in response['data']:
-                status_color = "green" if doc.get('indexing_status') == 'completed' else "yellow"
-                
-                details = f"""
+            details = f"""
 [bold]Document ID:[/bold] {doc.get('id', 'N/A')}
 [bold]Status:[/bold] [{status_color}]{doc.get('indexing_status', 'N/A')}[/{status_color}]
 [bold]Progress:[/bold] {doc.get('completed_segments', 0)}/{doc.get('total_segments', 0)} segments
 [bold]Started:[/bold] {doc.get('processing_started_at', 'N/A')}
 [bold]Completed:[/bold] {doc.get('completed_at', 'N/A')}
 """
-                
-                if doc.get('error'):
-                    details += f"[bold red]Error:[/bold red] {doc['error']}"
-                
-                console.print(Panel(details, title="Indexing Status", border_style="cyan"))
             
-        except APIError as e:
-            console.print(f"\n[red]API Error: {e}[/red]")
-        except Exception as e:
-            console.print(f"\n[red]Error: {e}[/red]")
-        
-        Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+            if doc.get('error'):
+                details += f"[bold red]Error:[/bold red] {doc['error']}"
+            
+            console.print(Panel(details, title=f"Indexing Status ({batch})", border_style="cyan"))
     
     def segment_menu(self):
         """Segment/chunk management menu."""
@@ -943,6 +1004,7 @@ class DifyInteractiveCLI:
                 "3. Update Segment",
                 "4. Delete Segment",
                 "5. Manage Child Chunks",
+                "6. Bulk Edit Segments",
                 "0. Back to Main Menu"
             ]
             
@@ -950,7 +1012,7 @@ class DifyInteractiveCLI:
             for item in menu_items:
                 console.print(f"  {item}")
             
-            choice = Prompt.ask("\n[cyan]Select option[/cyan]", choices=["0", "1", "2", "3", "4", "5"])
+            choice = Prompt.ask("\n[cyan]Select option[/cyan]", choices=["0", "1", "2", "3", "4", "5", "6"])
             
             if choice == "0":
                 break
@@ -964,6 +1026,8 @@ class DifyInteractiveCLI:
                 self.delete_segment()
             elif choice == "5":
                 self.manage_child_chunks()
+            elif choice == "6":
+                self.bulk_edit_segments()
     
     def list_segments(self):
         """List segments in current document."""
@@ -1133,15 +1197,155 @@ class DifyInteractiveCLI:
         
         Prompt.ask("\n[dim]Press Enter to continue[/dim]")
     
+    def bulk_edit_segments(self):
+        """Enable, disable, re-keyword or delete many segments of the current document at once."""
+        try:
+            bulk = BulkSegments(self.client.segments, self.current_dataset_id, workers=8)
+            
+            console.print("\n[bold]Bulk Edit Segments[/bold]")
+            how = Prompt.ask("Select segments by", choices=["filter", "ids"], default="filter")
+            
+            if how == "ids":
+                ids_str = Prompt.ask("Segment IDs (comma-separated)")
+                targets = [(self.current_document_id, i.strip()) for i in ids_str.split(',') if i.strip()]
+            else:
+                keyword = Prompt.ask("Keyword (optional)", default="")
+                status = Prompt.ask("Indexing status (optional, e.g. completed, error)", default="")
+                state = Prompt.ask("Enabled state", choices=["any", "enabled", "disabled"], default="any")
+                with console.status("[bold green]Selecting segments..."):
+                    targets = list(bulk.select(
+                        [self.current_document_id],
+                        keyword=keyword or None,
+                        status=status or None,
+                        enabled=None if state == "any" else state == "enabled"
+                    ))
+            
+            if not targets:
+                console.print("\n[yellow]No segments selected.[/yellow]")
+                Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+                return
+            
+            console.print(f"\n[bold]{len(targets)} segment(s) selected.[/bold]")
+            action = Prompt.ask("Action", choices=["enable", "disable", "keywords", "delete"])
+            
+            if action == "delete":
+                if not Confirm.ask(f"\n[red]Delete {len(targets)} segment(s)?[/red]", default=False):
+                    console.print("\n[yellow]Deletion cancelled.[/yellow]")
+                    Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+                    return
+                results = bulk.iter_delete(targets)
+            elif action == "keywords":
+                keywords_str = Prompt.ask("Keywords (comma-separated)")
+                keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
+                results = bulk.iter_update(targets, {'keywords': keywords})
+            else:
+                results = bulk.iter_update(targets, {'enabled': action == "enable"})
+            
+            counts = {}
+            failures = []
+            with console.status("[bold green]Applying changes...") as status:
+                for i, result in enumerate(results, 1):
+                    counts[result['status']] = counts.get(result['status'], 0) + 1
+                    if result['status'] == 'failed':
+                        failures.append(result)
+                    status.update(f"[bold green]Applying changes: {i}/{len(targets)}")
+            
+            console.print("\n" + " | ".join(f"{name}: {count}" for name, count in counts.items()))
+            for failure in failures[:10]:
+                console.print(f"[red]{failure['segment_id']}: {failure['error']}[/red]")
+            
+        except APIError as e:
+            console.print(f"\n[red]API Error: {e}[/red]")
+        except Exception as e:
+            console.print(f"\n[red]Error: {e}[/red]")
+        
+        Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+    
     def manage_child_chunks(self):
         """Manage child chunks (hierarchical mode)."""
         console.print("\n[yellow]Child chunk management is for hierarchical mode documents.[/yellow]")
         console.print("[dim]This feature allows managing sub-segments within parent segments.[/dim]")
         
-        # This would need a submenu similar to segment management
-        # For brevity, I'll skip the full implementation
+        segment_id = Prompt.ask("\nParent segment ID (blank to go back)", default="")
+        if not segment_id:
+            return
         
-        Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+        while True:
+            self.print_header()
+            self.print_current_context()
+            console.print(f"[dim]Segment: {segment_id}[/dim]")
+            
+            menu_items = [
+                "1. List Child Chunks",
+                "2. Add Child Chunk",
+                "3. Update Child Chunk",
+                "4. Delete Child Chunk",
+                "5. Replace Child Chunks From File",
+                "0. Back"
+            ]
+            
+            console.print("\n[bold]Child Chunk Management:[/bold]")
+            for item in menu_items:
+                console.print(f"  {item}")
+            
+            choice = Prompt.ask("\n[cyan]Select option[/cyan]", choices=["0", "1", "2", "3", "4", "5"])
+            if choice == "0":
+                break
+            
+            try:
+                args = (self.current_dataset_id, self.current_document_id, segment_id)
+                if choice == "1":
+                    with console.status("[bold green]Loading child chunks..."):
+                        chunks = list(self.client.segments.iter_child_chunks(*args))
+                    if not chunks:
+                        console.print("\n[yellow]No child chunks found.[/yellow]")
+                    for chunk in chunks:
+                        console.print(f"\n[dim]ID: {chunk['id']} | Position: {chunk.get('position', 'N/A')}[/dim]")
+                        console.print(f"{chunk['content'][:200]}{'...' if len(chunk['content']) > 200 else ''}")
+                elif choice == "2":
+                    content = Prompt.ask("\nContent")
+                    with console.status("[bold green]Adding child chunk..."):
+                        self.client.segments.create_child_chunk(*args, content)
+                    console.print("\n[green]✓ Child chunk added successfully![/green]")
+                elif choice == "3":
+                    child_chunk_id = Prompt.ask("\nChild chunk ID")
+                    content = Prompt.ask("New content")
+                    with console.status("[bold green]Updating child chunk..."):
+                        self.client.segments.update_child_chunk(*args, child_chunk_id, content)
+                    console.print("\n[green]✓ Child chunk updated successfully![/green]")
+                elif choice == "4":
+                    child_chunk_id = Prompt.ask("\nChild chunk ID")
+                    if Confirm.ask("\n[red]Are you sure you want to delete this child chunk?[/red]", default=False):
+                        with console.status("[bold red]Deleting child chunk..."):
+                            self.client.segments.delete_child_chunk(*args, child_chunk_id)
+                        console.print("\n[green]✓ Child chunk deleted successfully![/green]")
+                else:
+                    self.replace_child_chunks(segment_id)
+            except APIError as e:
+                console.print(f"\n[red]API Error: {e}[/red]")
+            except Exception as e:
+                console.print(f"\n[red]Error: {e}[/red]")
+            
+            Prompt.ask("\n[dim]Press Enter to continue[/dim]")
+    
+    def replace_child_chunks(self, segment_id: str):
+        """Make a segment's child chunks match a text file, one chunk per blank-line separated block."""
+        file_path = Prompt.ask("\nText file path")
+        with open(file_path, 'r', encoding='utf-8') as f:
+            desired = [block.strip() for block in f.read().split('\n\n') if block.strip()]
+        
+        bulk = BulkSegments(self.client.segments, self.current_dataset_id)
+        with console.status("[bold green]Reconciling child chunks..."):
+            result = list(bulk.iter_reconcile_child_chunks(
+                [(self.current_document_id, segment_id, desired)]
+            ))[0]
+        
+        if result['status'] == 'failed':
+            console.print(f"\n[red]Reconcile failed: {result['error']}[/red]")
+        console.print(
+            f"\n[green]Created: {result['created']} | Updated: {result['updated']} | "
+            f"Deleted: {result['deleted']} | Unchanged: {result['unchanged']}[/green]"
+        )
     
     def retrieval_menu(self):
         """Search and retrieval menu."""
@@ -1,38 +1,338 @@
 import os
-import json
-from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import contextlib
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from dotenv import load_dotenv
 
+from .cache import READ_ONLY_ENDPOINTS, ResponseCache, RetrievalCache, dataset_of
+from .codec import JSONCodec, default_codec
+from .hedging import HedgePolicy
+from .metrics import (ClientMetrics, aiohttp_phases, aiohttp_trace_config, instrument_adapter,
+                      requests_body_size, requests_phases, start_timing)
+from .multipart import MultipartEncoder, ProgressCallback
+from .rate_limit import THROTTLE_STATUSES, ConcurrencyGovernor, TokenBucket
+from .retry import DEFAULT_RETRY_POLICY, RetryPolicy, RetryStats, parse_retry_after
+from .tracing import Tracer
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is only needed for AsyncDifyAPIClient
+    aiohttp = None
+
 load_dotenv()
 
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 300.0
+
+# Either a single number of seconds or a (connect, read) tuple, as in requests
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+# Path segments that are followed by a resource ID, and the placeholder used for it
+_ID_PLACEHOLDERS = {
+    'datasets': '{dataset_id}',
+    'documents': '{document_id}',
+    'segments': '{segment_id}',
+    'child_chunks': '{child_chunk_id}',
+    'metadata': '{metadata_id}'
+}
+
+# Literal path segments that can appear where an ID would otherwise be expected
+_LITERAL_SEGMENTS = frozenset(['metadata', 'built-in'])
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Collapse resource IDs in an endpoint, e.g. '/datasets/{dataset_id}/retrieve'."""
+    parts = endpoint.split('?', 1)[0].strip('/').split('/')
+    template = []
+    
+    for i, part in enumerate(parts):
+        placeholder = _ID_PLACEHOLDERS.get(parts[i - 1]) if i else None
+        if placeholder is None or part in _LITERAL_SEGMENTS:
+            template.append(part)
+        elif i + 1 < len(parts) and parts[i + 1] == 'indexing-status':
+            template.append('{batch}')
+        else:
+            template.append(placeholder)
+    
+    return '/' + '/'.join(template)
+
+
+def _resolve_credentials(api_key: Optional[str], base_url: Optional[str]) -> Tuple[str, str]:
+    """Resolve API key and base URL from arguments or environment."""
+    api_key = api_key or os.getenv('DIFY_API_KEY')
+    base_url = (base_url or os.getenv('DIFY_BASE_URL', '')).rstrip('/')
+    
+    if not api_key:
+        raise ValueError("API key is required. Set DIFY_API_KEY environment variable or pass it to the constructor.")
+    
+    if not base_url:
+        raise ValueError("Base URL is required. Set DIFY_BASE_URL environment variable or pass it to the constructor.")
+    
+    return api_key, base_url
+
+
+def _cap_timeout(timeout: Timeout, remaining: float) -> Tuple[float, float]:
+    """Shrink a requests-style timeout so neither phase can outlive a call's remaining deadline."""
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return (remaining if connect is None else min(connect, remaining),
+            remaining if read is None else min(read, remaining))
+
+
+def _invalidate_caches(client: Any, method: str, endpoint: str) -> None:
+    """Drop cached responses and retrieval results a mutating call may have made stale."""
+    if method == 'GET' or endpoint_template(endpoint) in READ_ONLY_ENDPOINTS:
+        return
+    
+    if client.cache is not None:
+        client.cache.invalidate(endpoint)
+    
+    dataset_id = dataset_of(endpoint)
+    if client.retrieval_cache is not None and dataset_id:
+        client.retrieval_cache.invalidate(dataset_id)
+
+
+def _attempt_span(client: Any, method: str, endpoint: str, attempt: int) -> Any:
+    """Open a span around one HTTP attempt, or do nothing when the client has no tracer."""
+    if client.tracer is None:
+        return contextlib.nullcontext()
+    template = endpoint_template(endpoint)
+    return client.tracer.span(f"{method} {template}", {
+        'http.request.method': method,
+        'url.template': template,
+        'http.request.resend_count': attempt - 1
+    })
+
+
+def _response_template(client: Any, url: str, status: int) -> Optional[str]:
+    """Endpoint template a typed codec picks the response structure by, or None for untyped decoding."""
+    if not client.codec.typed or status >= 400:
+        return None
+    return endpoint_template(url[len(client.base_url):])
+
+
+def _raise_for_error(status: int, data: Dict[str, Any], headers: Optional[Any] = None) -> None:
+    """Raise APIError for 4xx/5xx responses."""
+    if status >= 400:
+        error_msg = data.get('message', f'API error: {status}')
+        error_code = data.get('code', 'unknown_error')
+        retry_after = parse_retry_after(headers.get('Retry-After')) if headers else None
+        raise APIError(error_msg, error_code, status, retry_after=retry_after)
+
 
 class DifyAPIClient:
     """Base API client for Dify Knowledge API."""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
-        self.api_key = api_key or os.getenv('DIFY_API_KEY')
-        self.base_url = (base_url or os.getenv('DIFY_BASE_URL', '')).rstrip('/')
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 keep_alive: bool = True,
+                 connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 governor: Optional[ConcurrencyGovernor] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retrieval_cache: Optional[RetrievalCache] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 metrics: Optional[ClientMetrics] = None,
+                 tracer: Optional[Tracer] = None,
+                 codec: Optional[JSONCodec] = None):
+        """Initialize the API client.
         
-        if not self.api_key:
-            raise ValueError("API key is required. Set DIFY_API_KEY environment variable or pass it to the constructor.")
-        
-        if not self.base_url:
-            raise ValueError("Base URL is required. Set DIFY_BASE_URL environment variable or pass it to the constructor.")
+        Args:
+            api_key: API key for authentication. If not provided, will use DIFY_API_KEY env var.
+            base_url: Base URL for the API. If not provided, will use DIFY_BASE_URL env var.
+            pool_connections: Number of per-host connection pools to cache.
+            pool_maxsize: Maximum number of pooled connections kept per host. Size it to the
+                number of threads sharing this client.
+            pool_block: Block when the pool is exhausted instead of opening throwaway connections.
+            keep_alive: Reuse connections between requests. Disable to send ``Connection: close``.
+            connect_timeout: Default seconds to wait for a connection. None waits forever.
+            read_timeout: Default seconds to wait for response data. None waits forever.
+            retry_policy: Policy deciding which failed calls are retried and how long to back
+                off. None disables retries.
+            rate_limiter: Token bucket every request attempt draws from. Use a
+                FileTokenBucket or SharedMemoryTokenBucket to share one budget across processes.
+            governor: AIMD concurrency governor that caps requests in flight and backs off
+                on 429/503 responses or latency spikes.
+            cache: Response cache for read-mostly GET endpoints. None disables caching.
+            retrieval_cache: Result cache for ``retrieve_chunks``, e.g. MemoryRetrievalCache.
+            hedge_policy: Send a duplicate ``retrieve_chunks`` request when the first one
+                is slower than the policy's latency percentile. None disables hedging.
+            metrics: Collects request counts, errors, bytes and per-phase latency for
+                every attempt, keyed by endpoint template. None disables metrics.
+            tracer: Records a span per manager call and per HTTP attempt, e.g. a Tracer
+                with an InMemorySpanExporter or an OpenTelemetryTracer. None disables tracing.
+            codec: JSON codec for request and response bodies. Defaults to the fastest
+                installed of orjson, msgspec and the standard library. Use
+                ``MsgspecCodec(typed=True)`` to decode segment lists and retrieval results
+                into typed structures.
+        """
+        self.api_key, self.base_url = _resolve_credentials(api_key, base_url)
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.governor = governor
+        self.cache = cache
+        self.retrieval_cache = retrieval_cache
+        self.hedge_policy = hedge_policy
+        self.metrics = metrics
+        self.tracer = tracer
+        self.codec = codec if codec is not None else default_codec()
+        self._retry_stats = RetryStats()
         
         self.session = requests.Session()
         self.session.headers.update({
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         })
+        
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        if metrics is not None:
+            instrument_adapter(self.adapter)
+        
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Get connection-pool utilisation counters."""
+        pools = self.adapter.poolmanager.pools
+        connections_opened = 0
+        requests_sent = 0
+        idle_connections = 0
+        
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            requests_sent += pool.num_requests
+            # Idle slots hold None until a connection has been returned to the pool
+            if pool.pool is not None:
+                idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        
+        with self._stats_lock:
+            in_flight = self._in_flight
+            peak_in_flight = self._peak_in_flight
+        
+        return {
+            'pool_maxsize': self.adapter._pool_maxsize,
+            'pool_block': self.adapter._pool_block,
+            'hosts': len(pools),
+            'connections_opened': connections_opened,
+            'requests_sent': requests_sent,
+            'reused_requests': max(requests_sent - connections_opened, 0),
+            'idle_connections': idle_connections,
+            'in_flight': in_flight,
+            'peak_in_flight': peak_in_flight
+        }
+    
+    def retry_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get retry counters per endpoint template."""
+        return self._retry_stats.snapshot()
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Get response-cache hit/miss counters, or None when caching is off."""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def metrics_stats(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get request metrics per endpoint template, or None when metrics are off."""
+        return self.metrics.snapshot() if self.metrics is not None else None
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Make HTTP request to the API."""
+    def _make_request(self, method: str, endpoint: str, idempotent: Optional[bool] = None,
+                      deadline: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Make HTTP request to the API, retrying transient failures per the retry policy.
+        
+        ``deadline`` bounds the whole call, retries included, in seconds: each attempt's
+        connect and read timeouts are capped to the time left, and no retry is started
+        that could not finish in time.
+        """
         url = f"{self.base_url}{endpoint}"
         
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        timeout = kwargs['timeout']
+        
+        try:
+            started = time.monotonic()
+            expires = None if deadline is None else started + deadline
+            attempt = 0
+            
+            while True:
+                attempt += 1
+                if expires is not None:
+                    kwargs['timeout'] = _cap_timeout(timeout, max(expires - time.monotonic(), 0.001))
+                try:
+                    with _attempt_span(self, method, endpoint, attempt):
+                        return self._send_limited(method, url, **kwargs)
+                except APIError as e:
+                    if self.retry_policy is None:
+                        raise
+                    
+                    delay = self.retry_policy.get_retry_delay(method, e.status, attempt,
+                                                              time.monotonic() - started,
+                                                              retry_after=e.retry_after,
+                                                              idempotent=idempotent)
+                    if delay is not None and expires is not None and time.monotonic() + delay >= expires:
+                        delay = None
+                    key = f"{method} {endpoint_template(endpoint)}"
+                    if delay is None:
+                        if attempt > 1:
+                            self._retry_stats.record_exhausted(key)
+                        raise
+                    
+                    self._retry_stats.record_retry(key)
+                    time.sleep(delay)
+        finally:
+            _invalidate_caches(self, method, endpoint)
+    
+    def _send_limited(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Send one attempt through the rate limiter and concurrency governor."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        
+        if self.governor is None:
+            return self._send(method, url, **kwargs)
+        
+        self.governor.acquire()
+        started = time.monotonic()
+        throttled = False
+        try:
+            return self._send(method, url, **kwargs)
+        except APIError as e:
+            throttled = e.status in THROTTLE_STATUSES
+            raise
+        finally:
+            self.governor.release(time.monotonic() - started, throttled)
+    
+    def _send(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Send a single HTTP request and decode the response."""
+        with self._stats_lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        
+        if self.metrics is not None:
+            start_timing()
+        started = time.perf_counter()
+        response = None
+        error_code = None
+        
         try:
             response = self.session.request(method, url, **kwargs)
+            if self.tracer is not None:
+                self.tracer.current_span().set_attribute('http.response.status_code', response.status_code)
             
             # Handle 204 No Content responses
             if response.status_code == 204:
@@ -40,59 +340,363 @@ class DifyAPIClient:
             
             # Try to parse JSON response
             try:
-                data = response.json()
-            except json.JSONDecodeError:
+                data = self.codec.decode_response(response.content, method,
+                                                  _response_template(self, url, response.status_code))
+            except ValueError:
                 data = {"response": response.text}
             
             # Check for API errors
-            if response.status_code >= 400:
-                error_msg = data.get('message', f'API error: {response.status_code}')
-                error_code = data.get('code', 'unknown_error')
-                raise APIError(error_msg, error_code, response.status_code)
+            _raise_for_error(response.status_code, data, response.headers)
             
             return data
-            
+        
+        except APIError as e:
+            error_code = e.code
+            raise
+        
         except RequestException as e:
+            error_code = "request_error"
             raise APIError(f"Request failed: {str(e)}", "request_error", 0)
+        
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+            if self.metrics is not None:
+                elapsed = time.perf_counter() - started
+                self.metrics.observe(method, endpoint_template(url[len(self.base_url):]),
+                                     requests_phases(response, elapsed),
+                                     requests_body_size(response),
+                                     len(response.content) if response is not None else 0,
+                                     error_code)
     
-    def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make GET request."""
-        return self._make_request('GET', endpoint, params=params)
+    def get(self, endpoint: str, params: Optional[Dict] = None, timeout: Timeout = None,
+            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Make GET request, served from the response cache when it holds a fresh copy."""
+        template = endpoint_template(endpoint)
+        if self.cache is None or not self.cache.is_cacheable(template):
+            return self._make_request('GET', endpoint, params=params, timeout=timeout, deadline=deadline)
+        
+        key, response, generation = self.cache.lookup(template, endpoint, params)
+        if response is None:
+            response = self._make_request('GET', endpoint, params=params, timeout=timeout, deadline=deadline)
+            self.cache.store(template, key, response, generation)
+        return response
     
-    def post(self, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make POST request."""
-        kwargs = {}
+    def post(self, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None,
+             timeout: Timeout = None, idempotent: bool = False,
+             progress: Optional[ProgressCallback] = None,
+             deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Make POST request. Set ``idempotent`` for calls that are safe to retry.
+        
+        With ``files`` the body is streamed as multipart form data (``data`` becomes
+        plain form fields) and ``progress`` is called as it is sent. ``deadline``
+        bounds the call, retries included, in seconds.
+        """
+        kwargs = {'timeout': timeout, 'idempotent': idempotent, 'deadline': deadline}
         
         if files:
-            # For file uploads, don't set Content-Type header (let requests set it)
+            # Stream the body instead of letting requests build it in memory
+            body = MultipartEncoder(files, fields=data, progress=progress)
             headers = self.session.headers.copy()
-            headers.pop('Content-Type', None)
+            headers['Content-Type'] = body.content_type
             kwargs['headers'] = headers
-            kwargs['files'] = files
-            if data:
-                kwargs['data'] = data
-        else:
-            kwargs['json'] = data
+            kwargs['data'] = body
+        elif data is not None:
+            kwargs['data'] = self.codec.encode(data)
         
         return self._make_request('POST', endpoint, **kwargs)
     
-    def patch(self, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make PATCH request."""
-        return self._make_request('PATCH', endpoint, json=data)
+    def patch(self, endpoint: str, data: Optional[Dict] = None, timeout: Timeout = None,
+              idempotent: bool = False) -> Dict[str, Any]:
+        """Make PATCH request. Set ``idempotent`` for calls that are safe to retry."""
+        body = None if data is None else self.codec.encode(data)
+        return self._make_request('PATCH', endpoint, data=body, timeout=timeout, idempotent=idempotent)
+    
+    def delete(self, endpoint: str, timeout: Timeout = None) -> Dict[str, Any]:
+        """Make DELETE request."""
+        return self._make_request('DELETE', endpoint, timeout=timeout)
+
+
+class AsyncDifyAPIClient:
+    """Asynchronous API client for Dify Knowledge API, backed by aiohttp.
+    
+    Exposes the same ``get``/``post``/``patch``/``delete`` surface as
+    DifyAPIClient, but every call is a coroutine, so a single event loop can
+    keep many requests in flight over one pooled connector.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: int = 100, keep_alive: bool = True,
+                 connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 governor: Optional[ConcurrencyGovernor] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retrieval_cache: Optional[RetrievalCache] = None,
+                 hedge_policy: Optional[HedgePolicy] = None,
+                 metrics: Optional[ClientMetrics] = None,
+                 tracer: Optional[Tracer] = None,
+                 codec: Optional[JSONCodec] = None):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for AsyncDifyAPIClient. "
+                              "Install it with: pip install dify-knowledge-client[async]")
+        
+        self.api_key, self.base_url = _resolve_credentials(api_key, base_url)
+        self.max_connections = max_connections
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.governor = governor
+        self.cache = cache
+        self.retrieval_cache = retrieval_cache
+        self.hedge_policy = hedge_policy
+        self.metrics = metrics
+        self.tracer = tracer
+        self.codec = codec if codec is not None else default_codec()
+        self._retry_stats = RetryStats()
+        # Content-Type is set per request for JSON and multipart bodies
+        self.headers = {'Authorization': f'Bearer {self.api_key}'}
+        self._session = None
+    
+    async def __aenter__(self) -> 'AsyncDifyAPIClient':
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """Create the aiohttp session lazily, inside the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             force_close=not self.keep_alive)
+            trace_configs = [aiohttp_trace_config()] if self.metrics is not None else None
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector,
+                                                  timeout=self._client_timeout(self.timeout),
+                                                  trace_configs=trace_configs)
+        return self._session
+    
+    @staticmethod
+    def _client_timeout(timeout: Timeout, total: Optional[float] = None) -> 'aiohttp.ClientTimeout':
+        """Translate a requests-style timeout into an aiohttp ClientTimeout."""
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read)
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    def retry_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get retry counters per endpoint template."""
+        return self._retry_stats.snapshot()
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Get response-cache hit/miss counters, or None when caching is off."""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def metrics_stats(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get request metrics per endpoint template, or None when metrics are off."""
+        return self.metrics.snapshot() if self.metrics is not None else None
+    
+    async def _make_request(self, method: str, endpoint: str, idempotent: Optional[bool] = None,
+                            deadline: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Make HTTP request to the API, retrying transient failures per the retry policy.
+        
+        ``deadline`` bounds the whole call in seconds, as in DifyAPIClient.
+        """
+        url = f"{self.base_url}{endpoint}"
+        
+        timeout = kwargs.pop('timeout', None)
+        if timeout is not None:
+            kwargs['timeout'] = self._client_timeout(timeout)
+        
+        try:
+            started = time.monotonic()
+            expires = None if deadline is None else started + deadline
+            attempt = 0
+            
+            while True:
+                attempt += 1
+                if expires is not None:
+                    remaining = max(expires - time.monotonic(), 0.001)
+                    kwargs['timeout'] = self._client_timeout(_cap_timeout(timeout or self.timeout, remaining),
+                                                             total=remaining)
+                try:
+                    with _attempt_span(self, method, endpoint, attempt):
+                        return await self._send_limited(method, url, **kwargs)
+                except APIError as e:
+                    if self.retry_policy is None:
+                        raise
+                    
+                    delay = self.retry_policy.get_retry_delay(method, e.status, attempt,
+                                                              time.monotonic() - started,
+                                                              retry_after=e.retry_after,
+                                                              idempotent=idempotent)
+                    if delay is not None and expires is not None and time.monotonic() + delay >= expires:
+                        delay = None
+                    key = f"{method} {endpoint_template(endpoint)}"
+                    if delay is None:
+                        if attempt > 1:
+                            self._retry_stats.record_exhausted(key)
+                        raise
+                    
+                    self._retry_stats.record_retry(key)
+                    await asyncio.sleep(delay)
+        finally:
+            _invalidate_caches(self, method, endpoint)
+    
+    async def _send_limited(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Send one attempt through the rate limiter and concurrency governor."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        
+        if self.governor is None:
+            return await self._send(method, url, **kwargs)
+        
+        await self.governor.acquire_async()
+        started = time.monotonic()
+        throttled = False
+        try:
+            return await self._send(method, url, **kwargs)
+        except APIError as e:
+            throttled = e.status in THROTTLE_STATUSES
+            raise
+        finally:
+            self.governor.release(time.monotonic() - started, throttled)
+    
+    async def _send(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Send a single HTTP request and decode the response."""
+        session = self._get_session()
+        timings = None
+        if self.metrics is not None:
+            # Filled in by the session's trace config
+            timings = kwargs['trace_request_ctx'] = {}
+        started = time.perf_counter()
+        error_code = None
+        
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                if self.tracer is not None:
+                    self.tracer.current_span().set_attribute('http.response.status_code', response.status)
+                
+                # Handle 204 No Content responses
+                if response.status == 204:
+                    return {"success": True}
+                
+                body = await response.read()
+                
+                # Try to parse JSON response
+                try:
+                    data = self.codec.decode_response(body, method,
+                                                      _response_template(self, url, response.status))
+                except ValueError:
+                    data = {"response": body.decode('utf-8', 'replace')}
+                
+                # Check for API errors
+                _raise_for_error(response.status, data, response.headers)
+                
+                return data
+        
+        except APIError as e:
+            error_code = e.code
+            raise
+        
+        except asyncio.CancelledError:
+            # E.g. the losing request of a hedged retrieval
+            error_code = "cancelled"
+            raise
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_code = "request_error"
+            raise APIError(f"Request failed: {str(e)}", "request_error", 0)
+        
+        finally:
+            if timings is not None:
+                elapsed = time.perf_counter() - started
+                self.metrics.observe(method, endpoint_template(url[len(self.base_url):]),
+                                     aiohttp_phases(timings, elapsed),
+                                     timings.get('sent', 0), timings.get('received', 0),
+                                     error_code)
+    
+    def _json_body(self, data: Optional[Dict]) -> Dict[str, Any]:
+        """Request arguments sending ``data`` as a JSON body encoded by the client's codec."""
+        if data is None:
+            return {}
+        return {'data': self.codec.encode(data), 'headers': {'Content-Type': 'application/json'}}
+    
+    @staticmethod
+    def _encode_params(params: Optional[Dict]) -> Optional[List[Tuple[str, str]]]:
+        """Flatten query params the way requests does (lists repeat the key)."""
+        if params is None:
+            return None
+        
+        encoded = []
+        for key, value in params.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for item in values:
+                if item is not None:
+                    encoded.append((key, str(item)))
+        return encoded
+    
+    async def get(self, endpoint: str, params: Optional[Dict] = None, timeout: Timeout = None,
+                  deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Make GET request, served from the response cache when it holds a fresh copy."""
+        template = endpoint_template(endpoint)
+        if self.cache is None or not self.cache.is_cacheable(template):
+            return await self._make_request('GET', endpoint, params=self._encode_params(params),
+                                            timeout=timeout, deadline=deadline)
+        
+        key, response, generation = self.cache.lookup(template, endpoint, params)
+        if response is None:
+            response = await self._make_request('GET', endpoint, params=self._encode_params(params),
+                                                timeout=timeout, deadline=deadline)
+            self.cache.store(template, key, response, generation)
+        return response
+    
+    async def post(self, endpoint: str, data: Optional[Dict] = None, files: Optional[Dict] = None,
+                   timeout: Timeout = None, idempotent: bool = False,
+                   progress: Optional[ProgressCallback] = None,
+                   deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Make POST request. Set ``idempotent`` for calls that are safe to retry.
+        
+        With ``files`` the body is streamed as multipart form data, as in DifyAPIClient.
+        """
+        if files:
+            # aiohttp reads the encoder as an async iterable, once per attempt
+            body = MultipartEncoder(files, fields=data, progress=progress)
+            headers = {'Content-Type': body.content_type, 'Content-Length': str(len(body))}
+            return await self._make_request('POST', endpoint, data=body, headers=headers,
+                                            timeout=timeout, idempotent=idempotent, deadline=deadline)
+        
+        return await self._make_request('POST', endpoint, **self._json_body(data), timeout=timeout,
+                                        idempotent=idempotent, deadline=deadline)
+    
+    async def patch(self, endpoint: str, data: Optional[Dict] = None, timeout: Timeout = None,
+                    idempotent: bool = False) -> Dict[str, Any]:
+        """Make PATCH request. Set ``idempotent`` for calls that are safe to retry."""
+        return await self._make_request('PATCH', endpoint, **self._json_body(data), timeout=timeout,
+                                        idempotent=idempotent)
     
-    def delete(self, endpoint: str) -> Dict[str, Any]:
+    async def delete(self, endpoint: str, timeout: Timeout = None) -> Dict[str, Any]:
         """Make DELETE request."""
-        return self._make_request('DELETE', endpoint)
+        return await self._make_request('DELETE', endpoint, timeout=timeout)
 
 
 class APIError(Exception):
     """Custom exception for API errors."""
     
-    def __init__(self, message: str, code: str, status: int):
+    def __init__(self, message: str, code: str, status: int, retry_after: Optional[float] = None):
         super().__init__(message)
         self.message = message
         self.code = code
         self.status = status
+        self.retry_after = retry_after
     
     def __str__(self):
         return f"[{self.code}] {self.message} (Status: {self.status})"
\ No newline at end of file
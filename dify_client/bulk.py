@@ -0,0 +1,498 @@
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .api_client import APIError
+from .document import DocumentManager
+from .retry import RetryPolicy
+from .segment import SegmentManager
+from .tracing import ContextThreadPoolExecutor, traced
+
+# Segments sent per add_segments request
+DEFAULT_BATCH_SIZE = 100
+
+# Serialized request body per add_segments request; stays under common proxy body limits
+DEFAULT_BATCH_BYTES = 1024 * 1024
+
+# Bytes of JSON around the segment list: {"segments": [...]}
+_ENVELOPE_BYTES = len('{"segments": []}')
+
+# A segment to operate on: a segment dict with 'document_id', or a (document_id, segment_id) pair
+Target = Union[Dict[str, Any], Tuple[str, str]]
+
+# A desired child chunk: its content, or a dict with 'content' and optionally the 'id' to update
+ChildSpec = Union[str, Dict[str, Any]]
+
+
+def pack_batches(segments: Iterable[Dict[str, Any]], max_count: int = DEFAULT_BATCH_SIZE,
+                 max_bytes: int = DEFAULT_BATCH_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    """Group segments into batches bounded by count and serialized JSON size, lazily.
+    
+    A single segment larger than ``max_bytes`` is sent in a batch of its own.
+    """
+    batch, size = [], _ENVELOPE_BYTES
+    for segment in segments:
+        # Two extra bytes for the ", " separator
+        item_size = len(json.dumps(segment).encode('utf-8')) + 2
+        if batch and (len(batch) >= max_count or size + item_size > max_bytes):
+            yield batch
+            batch, size = [], _ENVELOPE_BYTES
+        batch.append(segment)
+        size += item_size
+    if batch:
+        yield batch
+
+
+def diff_child_chunks(existing: List[Dict[str, Any]],
+                      desired: Iterable[ChildSpec]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Plan the operations that turn a segment's child chunks into the desired ones.
+    
+    Returns ``(op, child_chunk_id, content)`` tuples with ``op`` one of 'keep',
+    'update', 'create' or 'delete'. Pinned IDs are honoured first, then children
+    are matched by identical content, then leftovers are reused in order.
+    """
+    by_id = {chunk['id']: chunk for chunk in existing}
+    desired = [{'content': spec} if isinstance(spec, str) else spec for spec in desired]
+    plan = [None] * len(desired)
+    
+    for i, spec in enumerate(desired):
+        chunk = by_id.pop(spec.get('id'), None) if spec.get('id') else None
+        if chunk is not None:
+            op = 'keep' if chunk.get('content') == spec['content'] else 'update'
+            plan[i] = (op, chunk['id'], spec['content'])
+    
+    free = [chunk for chunk in existing if chunk['id'] in by_id]
+    by_content = {}
+    for chunk in free:
+        by_content.setdefault(chunk.get('content'), []).append(chunk)
+    for i, spec in enumerate(desired):
+        if plan[i] is None and by_content.get(spec['content']):
+            chunk = by_content[spec['content']].pop(0)
+            free.remove(chunk)
+            plan[i] = ('keep', chunk['id'], spec['content'])
+    
+    for i, spec in enumerate(desired):
+        if plan[i] is None:
+            plan[i] = ('update', free.pop(0)['id'], spec['content']) if free else ('create', None, spec['content'])
+    
+    return plan + [('delete', chunk['id'], None) for chunk in free]
+
+
+def _unpack(target: Target) -> Tuple[str, str, Dict[str, Any]]:
+    """Get the document ID, segment ID and known segment fields of a target."""
+    if isinstance(target, dict):
+        return target['document_id'], target['id'], target
+    document_id, segment_id = target
+    return document_id, segment_id, {'id': segment_id, 'document_id': document_id}
+
+
+@traced(client='segments.client')
+class BulkSegments:
+    """Segment operations at scale: batched inserts, bulk update, enable, disable and
+    delete, and child chunk reconciliation, with bounded concurrency and retry.
+    
+    Work is read lazily and at most ``max_pending`` requests are queued at a
+    time, like BulkIngestor. Each request is retried on its own, so one failed
+    batch or segment neither stops nor repeats the others.
+    
+    Every failure is retried by one layer only. The client's retry loop owns
+    the failures its policy retries: 429s and transient errors of updates,
+    deletes and child chunk edits. This class retries the rest, which in
+    practice means resending insert batches after an error with an unknown
+    outcome, made safe by the dedupe check. With a client whose
+    ``retry_policy`` is None, this class retries everything per its own policy.
+    """
+    
+    def __init__(self, segments: SegmentManager, dataset_id: str,
+                 workers: int = 4,
+                 max_pending: Optional[int] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 dedupe: bool = True,
+                 documents: Optional[DocumentManager] = None):
+        """Initialize the bulk helper.
+        
+        Args:
+            segments: Segment manager used for the requests, e.g. ``client.segments``.
+            dataset_id: Knowledge base the segments belong to.
+            workers: Number of concurrent requests.
+            max_pending: Maximum queued requests before reading more input. Defaults to ``2 * workers``.
+            retry_policy: Backoff for retrying failures the client does not retry itself.
+                Defaults to three attempts.
+            dedupe: Before resending a batch whose outcome is unknown (timeout, 5xx), list the
+                document and match segments against the ones that appeared since the insert
+                started, by content and counting repeats, so a batch that was actually stored
+                is not inserted twice. Costs one extra listing of the document per insert.
+            documents: Document manager, e.g. ``client.documents``. Only needed to ``select``
+                segments from every document of the knowledge base.
+        """
+        self.segments = segments
+        self.dataset_id = dataset_id
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3)
+        self.dedupe = dedupe
+        self.documents = documents
+        self._lock = threading.Lock()
+    
+    def iter_insert(self, document_id: str, segments: Iterable[Dict[str, Any]],
+                    batch_size: int = DEFAULT_BATCH_SIZE,
+                    batch_bytes: int = DEFAULT_BATCH_BYTES) -> Iterator[Dict[str, Any]]:
+        """Add any number of segments to a document, yielding a result per batch as it completes.
+        
+        Args:
+            document_id: Document to add to.
+            segments: Segment dicts as for ``add_segments`` (see ``SegmentManager.create_segment``).
+            batch_size: Maximum segments per request.
+            batch_bytes: Maximum serialized size of a request.
+        
+        Yields:
+            Dicts with ``batch`` (0-based batch number), ``status`` ('created' or 'failed'),
+            ``count``, ``attempts`` and ``segment_ids`` in input order. Failed batches also
+            carry ``error`` and the ``segments`` that were not stored.
+        """
+        # IDs of segments that cannot have come from a lost response: those present before
+        # the first batch is sent, and those already accounted for by a batch
+        known = set()
+        if self.dedupe:
+            known.update(segment['id'] for segment in self.segments.iter_segments(self.dataset_id, document_id))
+        batches = enumerate(pack_batches(segments, batch_size, batch_bytes))
+        yield from self._run(lambda item: self._insert_batch(document_id, known, *item), batches)
+    
+    def insert(self, document_id: str, segments: Iterable[Dict[str, Any]],
+               batch_size: int = DEFAULT_BATCH_SIZE,
+               batch_bytes: int = DEFAULT_BATCH_BYTES) -> Dict[str, Any]:
+        """Add any number of segments to a document and return a summary.
+        
+        The summary has ``batches``, ``created`` and ``failed`` segment counts,
+        ``segment_ids`` of every created segment in input order, and ``failures``
+        (the failed batch results, which carry their segments for resubmission).
+        """
+        results = sorted(self.iter_insert(document_id, segments, batch_size, batch_bytes),
+                         key=lambda result: result['batch'])
+        failures = [result for result in results if result['status'] == 'failed']
+        segment_ids = [segment_id for result in results for segment_id in result.get('segment_ids', [])]
+        return {
+            'batches': len(results),
+            'created': len(segment_ids),
+            'failed': sum(len(result['segments']) for result in failures),
+            'segment_ids': segment_ids,
+            'failures': failures
+        }
+    
+    def _insert_batch(self, document_id: str, known: Set[str], index: int,
+                      batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        attempt = 0
+        # Segment IDs by position in the batch, including ones an attempt with a lost response stored
+        created = {}
+        to_send = list(range(len(batch)))
+        
+        while to_send:
+            attempt += 1
+            try:
+                response = self.segments.add_segments(self.dataset_id, document_id, [batch[i] for i in to_send])
+            except APIError as e:
+                # Adding segments is not idempotent; the dedupe check below makes resending safe
+                delay = self._retry_delay('POST', e, attempt, started, idempotent=True, client_idempotent=False)
+                if delay is None:
+                    return self._batch_failed(index, batch, created, to_send, attempt, e)
+                time.sleep(delay)
+                
+                if e.status != 429 and self.dedupe:
+                    try:
+                        self._claim_stored(document_id, known, batch, to_send, created)
+                    except APIError as e:
+                        return self._batch_failed(index, batch, created, to_send, attempt, e)
+                    to_send = [i for i in to_send if i not in created]
+                continue
+            
+            ids = [segment.get('id') for segment in response.get('data') or []]
+            with self._lock:
+                known.update(ids)
+            created.update(zip(to_send, ids))
+            to_send = []
+        
+        return {
+            'batch': index,
+            'status': 'created',
+            'count': len(batch),
+            'attempts': attempt,
+            'segment_ids': [created.get(i) for i in range(len(batch))]
+        }
+    
+    @staticmethod
+    def _batch_failed(index: int, batch: List[Dict[str, Any]], created: Dict[int, str], unsent: List[int],
+                      attempts: int, error: APIError) -> Dict[str, Any]:
+        return {
+            'batch': index,
+            'status': 'failed',
+            'count': len(batch),
+            'attempts': attempts,
+            'error': str(error),
+            'segment_ids': [created[i] for i in sorted(created)],
+            'segments': [batch[i] for i in unsent]
+        }
+    
+    def select(self, document_ids: Optional[Iterable[str]] = None,
+               keyword: Optional[str] = None,
+               status: Optional[str] = None,
+               enabled: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over segments matching a filter, as targets for the bulk operations.
+        
+        Args:
+            document_ids: Documents to look in. Defaults to every document of the knowledge
+                base, which needs the ``documents`` manager.
+            keyword: Only segments containing this keyword (filtered by the server).
+            status: Only segments with this indexing status, e.g. 'completed' or 'error'.
+            enabled: Only enabled (True) or disabled (False) segments.
+        
+        Yields:
+            Segment dicts, each with its ``document_id``.
+        """
+        if document_ids is None:
+            if self.documents is None:
+                raise ValueError("Selecting from every document needs the documents manager")
+            document_ids = (document['id'] for document in self.documents.iter_documents(self.dataset_id))
+        
+        for document_id in document_ids:
+            # List the whole document before yielding: deleting or disabling segments while
+            # paging through the same filter would shift later pages and skip segments
+            segments = list(self.segments.iter_segments(self.dataset_id, document_id, keyword, status))
+            for segment in segments:
+                if enabled is None or segment.get('enabled') == enabled:
+                    yield dict(segment, document_id=document_id)
+    
+    def iter_update(self, targets: Iterable[Target],
+                    changes: Union[Dict[str, Any], Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]]
+                    ) -> Iterator[Dict[str, Any]]:
+        """Update many segments, yielding a result per segment as it completes.
+        
+        Args:
+            targets: Segment dicts with ``document_id`` (as from ``select``) or
+                ``(document_id, segment_id)`` pairs.
+            changes: ``update_segment`` fields (``content``, ``answer``, ``keywords``,
+                ``enabled``, ``regenerate_child_chunks``), or a function returning them
+                for a given target, or None to leave it alone.
+        
+        Yields:
+            Dicts with ``document_id``, ``segment_id``, ``status`` ('updated', 'skipped'
+            or 'failed') and ``attempts``, plus ``error`` on failure. Segment dicts that
+            already hold the requested values are skipped without a request.
+        """
+        return self._run(lambda target: self._update_one(target, changes), targets)
+    
+    def update(self, targets: Iterable[Target],
+               changes: Union[Dict[str, Any], Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]]
+               ) -> Dict[str, Any]:
+        """Update many segments and return a summary. See ``iter_update``."""
+        return self._summarize(self.iter_update(targets, changes), ('updated', 'skipped', 'failed'))
+    
+    def enable(self, targets: Iterable[Target]) -> Dict[str, Any]:
+        """Enable many segments and return a summary."""
+        return self.update(targets, {'enabled': True})
+    
+    def disable(self, targets: Iterable[Target]) -> Dict[str, Any]:
+        """Disable many segments and return a summary."""
+        return self.update(targets, {'enabled': False})
+    
+    def iter_delete(self, targets: Iterable[Target]) -> Iterator[Dict[str, Any]]:
+        """Delete many segments, yielding a result per segment as it completes.
+        
+        Result ``status`` is 'deleted' or 'failed'. A segment that is already gone counts as deleted.
+        """
+        return self._run(self._delete_one, targets)
+    
+    def delete(self, targets: Iterable[Target]) -> Dict[str, Any]:
+        """Delete many segments and return a summary."""
+        return self._summarize(self.iter_delete(targets), ('deleted', 'failed'))
+    
+    def _update_one(self, target: Target, changes: Any) -> Dict[str, Any]:
+        document_id, segment_id, segment = _unpack(target)
+        fields = changes(segment) if callable(changes) else changes
+        if not fields or all(key in segment and segment[key] == value for key, value in fields.items()):
+            return {'document_id': document_id, 'segment_id': segment_id, 'status': 'skipped', 'attempts': 0}
+        return self._attempt('POST', 'updated', document_id, segment_id,
+                             lambda: self.segments.update_segment(self.dataset_id, document_id, segment_id, **fields))
+    
+    def _delete_one(self, target: Target) -> Dict[str, Any]:
+        document_id, segment_id, _ = _unpack(target)
+        return self._attempt('DELETE', 'deleted', document_id, segment_id,
+                             lambda: self.segments.delete_segment(self.dataset_id, document_id, segment_id))
+    
+    def _attempt(self, method: str, status: str, document_id: str, segment_id: str,
+                 call: Callable[[], Any]) -> Dict[str, Any]:
+        """Make one segment call, retried per the retry policy, and describe the outcome."""
+        # Updates set absolute values, so repeating them is safe
+        attempts, error = self._retrying(method, call, idempotent=True)
+        result = {'document_id': document_id, 'segment_id': segment_id, 'status': status, 'attempts': attempts}
+        if error is not None:
+            result.update(status='failed', error=str(error))
+        return result
+    
+    def _retrying(self, method: str, call: Callable[[], Any],
+                  idempotent: bool) -> Tuple[int, Optional[APIError]]:
+        """Make a call, retried per the retry policy. Returns the attempts made and the final error.
+        
+        A DELETE of something already gone (404) counts as success. Calls that are not
+        idempotent are only retried when the server refused them outright (429). The
+        segment manager marks the calls made here the same way, so with a client retry
+        policy every retry happens in the client.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                call()
+                return attempt, None
+            except APIError as e:
+                if method == 'DELETE' and e.status == 404:
+                    return attempt, None
+                delay = self._retry_delay(method, e, attempt, started, idempotent, idempotent)
+                if delay is None:
+                    return attempt, e
+                time.sleep(delay)
+    
+    def _retry_delay(self, method: str, error: APIError, attempt: int, started: float,
+                     idempotent: bool, client_idempotent: bool) -> Optional[float]:
+        """Seconds to wait before retrying a failed call, or None to give up.
+        
+        Failures the client already retried, judged by the idempotency the manager
+        method passed it, are not retried again.
+        """
+        client_policy = getattr(self.segments.client, 'retry_policy', None)
+        if client_policy is not None and client_policy.is_retryable(method, error.status, client_idempotent):
+            return None
+        return self.retry_policy.get_retry_delay(method, error.status, attempt, time.monotonic() - started,
+                                                 retry_after=error.retry_after, idempotent=idempotent)
+    
+    def iter_reconcile_child_chunks(self, plans: Iterable[Tuple[str, str, Iterable[ChildSpec]]]
+                                    ) -> Iterator[Dict[str, Any]]:
+        """Bring the child chunks of many segments in line with desired lists, concurrently.
+        
+        Each segment's current children are listed and diffed against its desired
+        list. Children with the same content are kept. Leftover children are
+        reused for changed content (one update instead of a delete and a create).
+        Whatever remains is created or deleted. A segment's changes run in order,
+        while different segments run in parallel. New children are appended, so
+        order is only preserved where existing children are reused.
+        
+        Args:
+            plans: ``(document_id, segment_id, desired)`` triples, read lazily. ``desired``
+                holds child chunk contents as strings, or dicts with ``content`` and an
+                optional ``id`` to pin a child to update.
+        
+        Yields:
+            A result per segment as it completes, so the iterator doubles as a progress
+            stream: ``document_id``, ``segment_id``, ``status`` ('reconciled', 'unchanged'
+            or 'failed'), counts of ``created``, ``updated``, ``deleted`` and ``unchanged``
+            children, plus ``error`` on failure.
+        """
+        return self._run(lambda plan: self._reconcile_one(*plan), plans)
+    
+    def reconcile_child_chunks(self, plans: Iterable[Tuple[str, str, Iterable[ChildSpec]]]) -> Dict[str, Any]:
+        """Reconcile the child chunks of many segments and return a summary.
+        
+        See ``iter_reconcile_child_chunks``. The summary counts segments per status
+        and adds up the child chunks created, updated and deleted.
+        """
+        totals = dict.fromkeys(('created', 'updated', 'deleted'), 0)
+        
+        def counted() -> Iterator[Dict[str, Any]]:
+            for result in self.iter_reconcile_child_chunks(plans):
+                for key in totals:
+                    totals[key] += result[key]
+                yield result
+        
+        summary = self._summarize(counted(), ('reconciled', 'unchanged', 'failed'))
+        summary['child_chunks'] = totals
+        return summary
+    
+    def _reconcile_one(self, document_id: str, segment_id: str, desired: Iterable[ChildSpec]) -> Dict[str, Any]:
+        result = {'document_id': document_id, 'segment_id': segment_id,
+                  'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        try:
+            existing = list(self.segments.iter_child_chunks(self.dataset_id, document_id, segment_id))
+        except APIError as e:
+            return dict(result, status='failed', error=str(e))
+        
+        for op, chunk_id, content in diff_child_chunks(existing, desired):
+            if op == 'keep':
+                result['unchanged'] += 1
+                continue
+            if op == 'create':
+                method, call, idempotent = 'POST', lambda: self.segments.create_child_chunk(
+                    self.dataset_id, document_id, segment_id, content), False
+            elif op == 'update':
+                method, call, idempotent = 'PATCH', lambda: self.segments.update_child_chunk(
+                    self.dataset_id, document_id, segment_id, chunk_id, content), True
+            else:
+                method, call, idempotent = 'DELETE', lambda: self.segments.delete_child_chunk(
+                    self.dataset_id, document_id, segment_id, chunk_id), True
+            
+            _, error = self._retrying(method, call, idempotent)
+            if error is not None:
+                return dict(result, status='failed', error=str(error))
+            result[op + 'd'] += 1
+        
+        changed = result['created'] or result['updated'] or result['deleted']
+        result['status'] = 'reconciled' if changed else 'unchanged'
+        return result
+    
+    @staticmethod
+    def _summarize(results: Iterable[Dict[str, Any]], statuses: Tuple[str, ...]) -> Dict[str, Any]:
+        started = time.monotonic()
+        summary = dict.fromkeys(statuses, 0)
+        summary['failures'] = []
+        for result in results:
+            summary[result['status']] += 1
+            if result['status'] == 'failed':
+                summary['failures'].append(result)
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+    
+    def _claim_stored(self, document_id: str, known: Set[str], batch: List[Dict[str, Any]],
+                      unsent: List[int], created: Dict[int, str]) -> None:
+        """Record in ``created`` the unsent segments an attempt with a lost response stored anyway.
+        
+        Only segments that are not ``known`` can have been stored by such an attempt.
+        Each one is matched to at most one segment of the batch with the same content.
+        """
+        segments = list(self.segments.iter_segments(self.dataset_id, document_id))
+        with self._lock:
+            fresh = {}
+            for segment in segments:
+                if segment['id'] not in known:
+                    fresh.setdefault(segment.get('content'), []).append(segment['id'])
+            for i in unsent:
+                ids = fresh.get(batch[i].get('content'))
+                if ids:
+                    created[i] = ids.pop(0)
+                    known.add(created[i])
+    
+    def _run(self, job: Callable[[Any], Dict[str, Any]], items: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+        """Run ``job`` over items on the worker pool, yielding results as they finish."""
+        executor = ContextThreadPoolExecutor(max_workers=max(self.workers, 1))
+        pending = set()
+        try:
+            for item in items:
+                # Backpressure: stop reading input until a slot frees up
+                while len(pending) >= self.max_pending:
+                    yield from self._drain(pending)
+                pending.add(executor.submit(job, item))
+            
+            while pending:
+                yield from self._drain(pending)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _drain(pending: Set) -> Iterator[Dict[str, Any]]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            yield future.result()
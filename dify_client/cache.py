@@ -0,0 +1,374 @@
+import abc
+import collections
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .codec import to_builtins
+
+# Seconds to cache each read-mostly endpoint for, keyed by endpoint template
+DEFAULT_TTLS = {
+    '/datasets': 30.0,
+    '/datasets/{dataset_id}': 60.0,
+    '/datasets/{dataset_id}/metadata': 60.0,
+    '/workspaces/current/models/model-types/text-embedding': 300.0
+}
+
+# Non-GET endpoints that only read, so they never invalidate cached responses
+READ_ONLY_ENDPOINTS = frozenset(['/datasets/{dataset_id}/retrieve'])
+
+_DATASET_PATH = re.compile(r'^/datasets/([^/?]+)')
+
+
+def dataset_of(endpoint: str) -> Optional[str]:
+    """Get the dataset ID an endpoint belongs to, if any."""
+    match = _DATASET_PATH.match(endpoint)
+    return match.group(1) if match else None
+
+
+def normalize_query(query: str) -> str:
+    """Normalise a query so trivially different spellings share a cache entry."""
+    return ' '.join(unicodedata.normalize('NFKC', query).casefold().split())
+
+
+def retrieval_key(dataset_id: str, query: str, retrieval_model: Optional[Dict[str, Any]] = None,
+                  external_retrieval_model: Optional[Dict[str, Any]] = None) -> str:
+    """Build the cache key of a retrieve_chunks call.
+    
+    The retrieval models are hashed as canonical JSON, so key order in the dicts
+    does not matter.
+    """
+    models = json.dumps([retrieval_model, external_retrieval_model], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha256()
+    for part in (dataset_id, normalize_query(query), models):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _freeze(params: Optional[Dict[str, Any]]) -> Tuple:
+    """Turn query params into a hashable, order-independent key."""
+    if not params:
+        return ()
+    return tuple(sorted(
+        (key, tuple(value) if isinstance(value, (list, tuple)) else value)
+        for key, value in params.items()
+        if value is not None
+    ))
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache for GET responses of read-mostly endpoints.
+    
+    Only endpoints listed in ``ttls`` are cached. Any mutating call through the
+    client drops cached responses of the dataset it touched, plus the dataset
+    list, so reads after a write through this client are never stale. Changes
+    made by other clients become visible once the TTL expires.
+    """
+    
+    def __init__(self, maxsize: int = 256, ttls: Optional[Dict[str, float]] = None):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of cached responses; the least recently used is evicted.
+            ttls: Seconds to cache each endpoint template for. Defaults to DEFAULT_TTLS.
+        """
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = collections.Counter()
+        self._misses = collections.Counter()
+        self._evictions = 0
+        self._invalidations = 0
+    
+    def is_cacheable(self, template: str) -> bool:
+        """Check whether responses of an endpoint template are cached."""
+        return template in self.ttls
+    
+    def lookup(self, template: str, endpoint: str, params: Optional[Dict[str, Any]] = None
+               ) -> Tuple[Hashable, Optional[Dict[str, Any]], int]:
+        """Look up a response.
+        
+        Returns:
+            ``(key, response, generation)``. ``response`` is None on a miss; pass the
+            key and generation to ``store`` once the response has been fetched.
+        """
+        key = (endpoint, _freeze(params))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, response = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits[template] += 1
+                    return key, copy.deepcopy(response), self._generation
+                del self._entries[key]
+            
+            self._misses[template] += 1
+            return key, None, self._generation
+    
+    def store(self, template: str, key: Hashable, response: Dict[str, Any], generation: int) -> None:
+        """Cache a response fetched after ``lookup`` returned ``generation``."""
+        with self._lock:
+            if generation != self._generation:
+                # A write went through while this read was in flight; its result may be stale
+                return
+            
+            self._entries[key] = (time.monotonic() + self.ttls[template], copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def invalidate(self, endpoint: str) -> None:
+        """Drop responses affected by a mutating call to ``endpoint``."""
+        dataset_id = dataset_of(endpoint)
+        prefix = f'/datasets/{dataset_id}' if dataset_id else None
+        
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                cached = key[0]
+                if cached == '/datasets' or (prefix and (cached == prefix or cached.startswith(prefix + '/'))):
+                    del self._entries[key]
+                    self._invalidations += 1
+    
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters, overall and per endpoint template."""
+        with self._lock:
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'endpoints': {
+                    template: {'hits': self._hits[template], 'misses': self._misses[template]}
+                    for template in set(self._hits) | set(self._misses)
+                }
+            }
+
+
+class RetrievalCache(abc.ABC):
+    """Base class for ``retrieve_chunks`` result caches.
+    
+    Results are keyed by ``retrieval_key`` and stored as JSON, so every hit
+    returns a fresh copy. Any write through the client to a dataset (documents,
+    segments, metadata or settings) drops that dataset's cached results.
+    Use MemoryRetrievalCache or SQLiteRetrievalCache; subclasses implement the
+    storage in ``_get``, ``_put``, ``_drop``, ``_clear`` and ``_size``, which are
+    always called with the cache's lock held.
+    """
+    
+    def __init__(self, ttl: float = 300.0, maxsize: int = 10000):
+        """Initialize the cache.
+        
+        Args:
+            ttl: Seconds a cached result stays valid.
+            maxsize: Maximum number of cached results; least recently used are evicted.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._generations = collections.Counter()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+    
+    def lookup(self, dataset_id: str, key: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Get ``(result, generation)``; result is None on a miss."""
+        with self._lock:
+            generation = self._generations[dataset_id]
+            raw = self._get(key, time.time())
+            if raw is None:
+                self._misses += 1
+                return None, generation
+            self._hits += 1
+        return json.loads(raw), generation
+    
+    def store(self, dataset_id: str, key: str, result: Dict[str, Any], generation: int) -> None:
+        """Cache a result fetched after ``lookup`` returned ``generation``."""
+        raw = json.dumps(result, separators=(',', ':'), default=to_builtins)
+        with self._lock:
+            # Skip results that raced a write to the same dataset
+            if self._generations[dataset_id] == generation:
+                self._put(key, dataset_id, raw, time.time() + self.ttl)
+    
+    def invalidate(self, dataset_id: str) -> None:
+        """Drop every cached result for a dataset."""
+        with self._lock:
+            self._generations[dataset_id] += 1
+            self._invalidations += self._drop(dataset_id)
+    
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            for dataset_id in list(self._generations):
+                self._generations[dataset_id] += 1
+            self._clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'size': self._size(),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'invalidations': self._invalidations
+            }
+    
+    @abc.abstractmethod
+    def _get(self, key: str, now: float) -> Optional[str]:
+        """Get the raw result stored under ``key`` unless it expired."""
+    
+    @abc.abstractmethod
+    def _put(self, key: str, dataset_id: str, raw: str, expires: float) -> None:
+        """Store a raw result, evicting the least recently used beyond ``maxsize``."""
+    
+    @abc.abstractmethod
+    def _drop(self, dataset_id: str) -> int:
+        """Drop a dataset's results and return how many were dropped."""
+    
+    @abc.abstractmethod
+    def _clear(self) -> None:
+        """Drop every result."""
+    
+    @abc.abstractmethod
+    def _size(self) -> int:
+        """Get the number of stored results."""
+
+
+class MemoryRetrievalCache(RetrievalCache):
+    """In-process LRU retrieval cache."""
+    
+    def __init__(self, ttl: float = 300.0, maxsize: int = 10000):
+        super().__init__(ttl, maxsize)
+        self._entries = collections.OrderedDict()
+    
+    def _get(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+    
+    def _put(self, key: str, dataset_id: str, raw: str, expires: float) -> None:
+        self._entries[key] = (expires, dataset_id, raw)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def _drop(self, dataset_id: str) -> int:
+        stale = [key for key, entry in self._entries.items() if entry[1] == dataset_id]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+    
+    def _clear(self) -> None:
+        self._entries.clear()
+    
+    def _size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteRetrievalCache(RetrievalCache):
+    """Retrieval cache in a memory-mapped SQLite file.
+    
+    Survives restarts and can be shared by processes on one host, though
+    invalidation only reaches other processes through the TTL. The size bound
+    is enforced every ``prune_every`` writes, so it can briefly be exceeded.
+    """
+    
+    def __init__(self, path: str, ttl: float = 300.0, maxsize: int = 100000,
+                 prune_every: int = 64, mmap_size: int = 256 * 1024 * 1024):
+        """Initialize the cache.
+        
+        Args:
+            path: SQLite database file.
+            ttl: Seconds a cached result stays valid.
+            maxsize: Maximum number of cached results; least recently used are evicted.
+            prune_every: Writes between eviction passes.
+            mmap_size: Bytes of the database SQLite may memory-map for reads.
+        """
+        super().__init__(ttl, maxsize)
+        self.path = path
+        self.prune_every = prune_every
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' key TEXT PRIMARY KEY,'
+            ' dataset_id TEXT NOT NULL,'
+            ' expires REAL NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' response TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_dataset ON results (dataset_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+    
+    def _get(self, key: str, now: float) -> Optional[str]:
+        row = self._conn.execute('SELECT response, expires FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+            return None
+        self._conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+    
+    def _put(self, key: str, dataset_id: str, raw: str, expires: float) -> None:
+        self._conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                           (key, dataset_id, expires, time.time(), raw))
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune()
+    
+    def _prune(self) -> None:
+        self._conn.execute('DELETE FROM results WHERE expires <= ?', (time.time(),))
+        excess = self._size() - self.maxsize
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)',
+                (excess,)
+            )
+    
+    def _drop(self, dataset_id: str) -> int:
+        return self._conn.execute('DELETE FROM results WHERE dataset_id = ?', (dataset_id,)).rowcount
+    
+    def _clear(self) -> None:
+        self._conn.execute('DELETE FROM results')
+    
+    def _size(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,25 +1,64 @@
-from typing import Optional
-from .api_client import DifyAPIClient
-from .knowledge_base import KnowledgeBaseManager
-from .document import DocumentManager
-from .segment import SegmentManager
-from .retrieval import RetrievalManager
+from typing import Any, Optional
+from .api_client import DifyAPIClient, AsyncDifyAPIClient
+from .knowledge_base import KnowledgeBaseManager, AsyncKnowledgeBaseManager
+from .document import DocumentManager, AsyncDocumentManager
+from .segment import SegmentManager, AsyncSegmentManager
+from .retrieval import RetrievalManager, AsyncRetrievalManager
 
 
 class DifyClient:
     """Main client for interacting with Dify Knowledge API."""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, **options: Any):
         """Initialize the Dify client.
         
         Args:
             api_key: API key for authentication. If not provided, will use DIFY_API_KEY env var.
             base_url: Base URL for the API. If not provided, will use DIFY_BASE_URL env var.
+            **options: Transport options passed to DifyAPIClient, such as ``pool_maxsize``,
+                ``keep_alive``, ``connect_timeout``, ``read_timeout`` and ``retry_policy``.
         """
-        self.api_client = DifyAPIClient(api_key, base_url)
+        self.api_client = DifyAPIClient(api_key, base_url, **options)
         
         # Initialize managers
         self.knowledge_bases = KnowledgeBaseManager(self.api_client)
         self.documents = DocumentManager(self.api_client)
         self.segments = SegmentManager(self.api_client)
-        self.retrieval = RetrievalManager(self.api_client)
\ No newline at end of file
+        self.retrieval = RetrievalManager(self.api_client)
+
+
+class AsyncDifyClient:
+    """Async client for interacting with Dify Knowledge API.
+    
+    Manager methods are coroutines. Use it as an async context manager, or call
+    ``close()`` when done, so the pooled connections are released.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: int = 100, **options: Any):
+        """Initialize the async Dify client.
+        
+        Args:
+            api_key: API key for authentication. If not provided, will use DIFY_API_KEY env var.
+            base_url: Base URL for the API. If not provided, will use DIFY_BASE_URL env var.
+            max_connections: Maximum number of concurrent connections in the pool.
+            **options: Transport options passed to AsyncDifyAPIClient, such as ``keep_alive``,
+                ``connect_timeout``, ``read_timeout`` and ``retry_policy``.
+        """
+        self.api_client = AsyncDifyAPIClient(api_key, base_url, max_connections=max_connections, **options)
+        
+        # Initialize managers
+        self.knowledge_bases = AsyncKnowledgeBaseManager(self.api_client)
+        self.documents = AsyncDocumentManager(self.api_client)
+        self.segments = AsyncSegmentManager(self.api_client)
+        self.retrieval = AsyncRetrievalManager(self.api_client)
+    
+    async def __aenter__(self) -> 'AsyncDifyClient':
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+    
+    async def close(self) -> None:
+        """Close the underlying HTTP session."""
+        await self.api_client.close()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+from typing import Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is only needed for OrjsonCodec
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is only needed for MsgspecCodec
+    msgspec = None
+
+
+def to_builtins(obj: Any) -> Any:
+    """``default`` hook for ``json.dumps`` that turns typed responses back into dicts and lists."""
+    if msgspec is not None and isinstance(obj, msgspec.Struct):
+        return msgspec.to_builtins(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class JSONCodec:
+    """Encodes request bodies and decodes responses with the standard library.
+    
+    Pass a codec as the ``codec`` client option. Decoding errors are raised as
+    ValueError by every codec. Subclasses swap in faster JSON libraries.
+    """
+    
+    name = 'json'
+    
+    # Whether responses of some endpoints are decoded into typed structures
+    typed = False
+    
+    def encode(self, obj: Any) -> bytes:
+        """Encode ``obj`` as compact UTF-8 JSON."""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, allow_nan=False,
+                          default=to_builtins).encode('utf-8')
+    
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """Decode a JSON document into dicts and lists."""
+        return json.loads(data)
+    
+    def decode_response(self, data: Union[bytes, str], method: str, template: Optional[str]) -> Any:
+        """Decode a successful response of ``method template``. Typed codecs pick a structure by endpoint."""
+        return self.decode(data)
+    
+    def convert(self, obj: Any, method: str, template: str) -> Any:
+        """Convert an already decoded response, e.g. a cache hit, to what ``decode_response`` returns."""
+        return obj
+    
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}()'
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec backed by orjson, several times faster than the standard library both ways."""
+    
+    name = 'orjson'
+    
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is required for OrjsonCodec. "
+                              "Install it with: pip install dify-knowledge-client[fast]")
+    
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=to_builtins, option=orjson.OPT_NON_STR_KEYS)
+    
+    def decode(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """Codec backed by msgspec, optionally decoding hot endpoints into typed structures.
+    
+    With ``typed`` the segment and child chunk lists and retrieval results are
+    decoded straight into the Struct types in ``dify_client.models`` instead of
+    dicts: fields the client does not model are skipped while parsing, and each
+    object takes a fraction of a dict's memory. The structures still support
+    ``obj['field']``, ``obj.get('field')``, ``in`` and ``dict(obj)``, so code
+    written against dicts keeps working. A response that does not fit its
+    structure is decoded into dicts instead.
+    """
+    
+    name = 'msgspec'
+    
+    def __init__(self, typed: bool = False):
+        """Initialize the codec.
+        
+        Args:
+            typed: Decode the endpoints in ``dify_client.models.TYPED_RESPONSES`` into
+                typed structures.
+        """
+        if msgspec is None:
+            raise ImportError("msgspec is required for MsgspecCodec. "
+                              "Install it with: pip install dify-knowledge-client[typed]")
+        self.typed = typed
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._typed_decoders = {}
+        if typed:
+            from .models import TYPED_RESPONSES
+            self._types = dict(TYPED_RESPONSES)
+            self._typed_decoders = {key: msgspec.json.Decoder(type_) for key, type_ in self._types.items()}
+    
+    def encode(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+    
+    def decode(self, data: Union[bytes, str]) -> Any:
+        return self._decoder.decode(data)
+    
+    def decode_response(self, data: Union[bytes, str], method: str, template: Optional[str]) -> Any:
+        decoder = self._typed_decoders.get((method, template))
+        if decoder is None:
+            return self._decoder.decode(data)
+        try:
+            return decoder.decode(data)
+        except msgspec.ValidationError:
+            return self._decoder.decode(data)
+    
+    def convert(self, obj: Any, method: str, template: str) -> Any:
+        type_ = self._types.get((method, template)) if self.typed else None
+        if type_ is None or isinstance(obj, type_):
+            return obj
+        try:
+            return msgspec.convert(obj, type_)
+        except msgspec.ValidationError:
+            return obj
+    
+    def __repr__(self) -> str:
+        return f'MsgspecCodec(typed={self.typed})'
+
+
+# Codecs by name, fastest first
+CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JSONCodec
+}
+
+
+def available_codecs() -> Tuple[str, ...]:
+    """Get the names of the codecs whose library is installed, fastest first."""
+    installed = {'orjson': orjson is not None, 'msgspec': msgspec is not None, 'json': True}
+    return tuple(name for name in CODECS if installed[name])
+
+
+def default_codec() -> JSONCodec:
+    """Get an untyped codec using the fastest installed JSON library."""
+    return CODECS[available_codecs()[0]]()
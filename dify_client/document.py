@@ -1,9 +1,12 @@
-import json
-from typing import Dict, List, Optional, Any, BinaryIO
+from typing import Dict, List, Optional, Any, AsyncIterator, BinaryIO, Iterator
 from pathlib import Path
-from .api_client import DifyAPIClient, APIError
+from .api_client import DifyAPIClient, AsyncDifyAPIClient, APIError
+from .multipart import ProgressCallback
+from .pagination import MAX_PAGE_SIZE, iter_items, aiter_items
+from .tracing import traced
 
 
+@traced
 class DocumentManager:
     """Manager for document operations."""
     
@@ -23,6 +26,17 @@ class DocumentManager:
         
         return self.client.get(f'/datasets/{dataset_id}/documents', params=params)
     
+    def iter_documents(self, dataset_id: str, keyword: Optional[str] = None,
+                       limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                       workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """Iterate over all documents in a knowledge base, fetching pages lazily.
+        
+        With ``workers`` > 1, pages after the first are fetched by a bounded pool of
+        threads as soon as the total is known.
+        """
+        return iter_items(lambda page: self.list_documents(dataset_id, keyword, page=page, limit=limit),
+                          limit, prefetch=prefetch, workers=workers)
+    
     def create_document_from_text(self, dataset_id: str, name: str, text: str,
                                  indexing_technique: str = 'high_quality',
                                  doc_form: Optional[str] = None,
@@ -70,9 +84,14 @@ class DocumentManager:
                                  process_rule: Optional[Dict[str, Any]] = None,
                                  retrieval_model: Optional[Dict[str, Any]] = None,
                                  embedding_model: Optional[str] = None,
-                                 embedding_model_provider: Optional[str] = None) -> Dict[str, Any]:
-        """Create a document from a file."""
-        # Prepare data as JSON string for multipart upload
+                                 embedding_model_provider: Optional[str] = None,
+                                 progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Create a document from a file.
+        
+        The file is streamed rather than loaded into memory. ``progress`` is called with
+        ``(bytes_sent, total_bytes, bytes_per_second)`` during the upload.
+        """
+        # Prepare the data part of the multipart upload
         data_dict = {
             'indexing_technique': indexing_technique
         }
@@ -102,17 +121,8 @@ class DocumentManager:
         if embedding_model_provider:
             data_dict['embedding_model_provider'] = embedding_model_provider
         
-        # Convert to JSON string
-        data_json = json.dumps(data_dict)
-        
-        # Prepare files for upload
-        with open(file_path, 'rb') as f:
-            files = {
-                'data': ('data', data_json, 'text/plain'),
-                'file': (Path(file_path).name, f, 'application/octet-stream')
-            }
-            
-            return self.client.post(f'/datasets/{dataset_id}/document/create-by-file', files=files)
+        return self._upload_file(f'/datasets/{dataset_id}/document/create-by-file', file_path, data_dict,
+                                 progress=progress)
     
     def update_document_by_text(self, dataset_id: str, document_id: str,
                                name: Optional[str] = None,
@@ -135,9 +145,10 @@ class DocumentManager:
     def update_document_by_file(self, dataset_id: str, document_id: str,
                                file_path: str,
                                name: Optional[str] = None,
-                               process_rule: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Update a document with a file."""
-        # Prepare data as JSON string for multipart upload
+                               process_rule: Optional[Dict[str, Any]] = None,
+                               progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Update a document with a file, streaming it as in ``create_document_from_file``."""
+        # Prepare the data part of the multipart upload
         data_dict = {}
         
         if name:
@@ -146,17 +157,21 @@ class DocumentManager:
         if process_rule:
             data_dict['process_rule'] = process_rule
         
-        # Convert to JSON string
-        data_json = json.dumps(data_dict)
-        
+        return self._upload_file(f'/datasets/{dataset_id}/documents/{document_id}/update-by-file',
+                                 file_path, data_dict, progress=progress)
+    
+    def _upload_file(self, endpoint: str, file_path: str, data: Dict[str, Any],
+                     progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Upload a file with its JSON data part as multipart form data."""
         # Prepare files for upload
         with open(file_path, 'rb') as f:
             files = {
-                'data': ('data', data_json, 'text/plain'),
+                # Encoded straight to bytes by the client's codec
+                'data': ('data', self.client.codec.encode(data), 'text/plain'),
                 'file': (Path(file_path).name, f, 'application/octet-stream')
             }
             
-            return self.client.post(f'/datasets/{dataset_id}/documents/{document_id}/update-by-file', files=files)
+            return self.client.post(endpoint, files=files, progress=progress)
     
     def delete_document(self, dataset_id: str, document_id: str) -> Dict[str, Any]:
         """Delete a document."""
@@ -213,4 +228,35 @@ class DocumentManager:
             if rules:
                 process_rule['rules'] = rules
         
-        return process_rule
\ No newline at end of file
+        return process_rule
+
+
+@traced
+class AsyncDocumentManager(DocumentManager):
+    """Async manager for document operations.
+    
+    API methods return awaitables from the underlying AsyncDifyAPIClient;
+    ``create_process_rule`` stays a plain helper.
+    """
+    
+    def __init__(self, client: AsyncDifyAPIClient):
+        self.client = client
+    
+    def iter_documents(self, dataset_id: str, keyword: Optional[str] = None,
+                       limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                       workers: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over all documents with ``async for``, fetching pages lazily."""
+        return aiter_items(lambda page: self.list_documents(dataset_id, keyword, page=page, limit=limit),
+                           limit, prefetch=prefetch, workers=workers)
+    
+    async def _upload_file(self, endpoint: str, file_path: str, data: Dict[str, Any],
+                           progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Upload a file, keeping it open until the request completes."""
+        with open(file_path, 'rb') as f:
+            files = {
+                # Encoded straight to bytes by the client's codec
+                'data': ('data', self.client.codec.encode(data), 'text/plain'),
+                'file': (Path(file_path).name, f, 'application/octet-stream')
+            }
+            
+            return await self.client.post(endpoint, files=files, progress=progress)
\ No newline at end of file
@@ -0,0 +1,147 @@
+from typing import Any, Callable, Dict, List, Optional
+
+# Rank offset from the reciprocal rank fusion paper; damps the weight of the top ranks
+RRF_K = 60
+
+
+def _tag(dataset_id: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy records, adding the dataset they came from and their rank within it."""
+    return [
+        dict(record, dataset_id=dataset_id, dataset_rank=rank)
+        for rank, record in enumerate(records, 1)
+    ]
+
+
+def _score(record: Dict[str, Any]) -> float:
+    return record.get('score') or 0.0
+
+
+def merge_by_score(results: Dict[str, List[Dict[str, Any]]], top_k: int, **options: Any) -> List[Dict[str, Any]]:
+    """Min-max normalise scores within each dataset, then rank everything together.
+    
+    Normalising first stops a dataset whose scores run high (e.g. a different
+    embedding model) from crowding out the others.
+    """
+    merged = []
+    for dataset_id, records in results.items():
+        scores = [_score(record) for record in records]
+        low, high = min(scores, default=0.0), max(scores, default=0.0)
+        for record in _tag(dataset_id, records):
+            record['fused_score'] = (_score(record) - low) / (high - low) if high > low else 1.0
+            merged.append(record)
+    
+    merged.sort(key=lambda record: (-record['fused_score'], -_score(record)))
+    return merged[:top_k]
+
+
+def merge_by_rrf(results: Dict[str, List[Dict[str, Any]]], top_k: int, rrf_k: int = RRF_K,
+                 **options: Any) -> List[Dict[str, Any]]:
+    """Reciprocal rank fusion: score each record 1 / (rrf_k + rank), ignoring raw scores.
+    
+    A segment returned by more than one dataset (e.g. mirrored content) has its
+    contributions summed and keeps the provenance of its best rank.
+    """
+    fused = {}
+    for dataset_id, records in results.items():
+        for record in _tag(dataset_id, records):
+            segment_id = (record.get('segment') or {}).get('id') or id(record)
+            contribution = 1.0 / (rrf_k + record['dataset_rank'])
+            best = fused.get(segment_id)
+            if best is None:
+                record['fused_score'] = contribution
+                fused[segment_id] = record
+            else:
+                best['fused_score'] += contribution
+    
+    merged = sorted(fused.values(), key=lambda record: (-record['fused_score'], record['dataset_rank']))
+    return merged[:top_k]
+
+
+def merge_by_quota(results: Dict[str, List[Dict[str, Any]]], top_k: int,
+                   quotas: Optional[Dict[str, int]] = None, **options: Any) -> List[Dict[str, Any]]:
+    """Take each dataset's best records up to its quota, then fill spare slots by score.
+    
+    Without ``quotas`` the slots are split evenly. Slots a dataset cannot fill
+    (too few results, or it failed) go to the best remaining records overall.
+    """
+    dataset_ids = list(results)
+    if quotas is None:
+        share, extra = divmod(top_k, max(len(dataset_ids), 1))
+        quotas = {dataset_id: share + (i < extra) for i, dataset_id in enumerate(dataset_ids)}
+    
+    picked, leftovers = [], []
+    for dataset_id in dataset_ids:
+        records = sorted(_tag(dataset_id, results[dataset_id]), key=lambda record: -_score(record))
+        quota = quotas.get(dataset_id, 0)
+        picked.extend(records[:quota])
+        leftovers.extend(records[quota:])
+    
+    picked.sort(key=lambda record: -_score(record))
+    picked = picked[:top_k]
+    leftovers.sort(key=lambda record: -_score(record))
+    picked.extend(leftovers[:top_k - len(picked)])
+    
+    for record in picked:
+        record['fused_score'] = _score(record)
+    picked.sort(key=lambda record: -record['fused_score'])
+    return picked
+
+
+MERGE_STRATEGIES: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    'score': merge_by_score,
+    'rrf': merge_by_rrf,
+    'quota': merge_by_quota
+}
+
+
+def merge_results(results: Dict[str, List[Dict[str, Any]]], top_k: int, strategy: str = 'rrf',
+                  **options: Any) -> List[Dict[str, Any]]:
+    """Merge per-dataset retrieval records into one ranked top-k list.
+    
+    Args:
+        results: Records of each dataset, keyed by dataset ID, best first.
+        top_k: Number of records to return.
+        strategy: 'score', 'rrf' or 'quota'.
+        **options: Strategy options, ``rrf_k`` for 'rrf' and ``quotas`` for 'quota'.
+    
+    Returns:
+        Copies of the records with ``dataset_id``, ``dataset_rank`` and ``fused_score`` added.
+    """
+    if strategy not in MERGE_STRATEGIES:
+        raise ValueError(f"Strategy must be one of {', '.join(MERGE_STRATEGIES)}")
+    return MERGE_STRATEGIES[strategy](results, top_k, **options)
+
+
+def federated_response(query: str, dataset_ids: List[str], outcomes: Dict[str, Dict[str, Any]],
+                       top_k: int, strategy: str = 'rrf', **options: Any) -> Dict[str, Any]:
+    """Build a federated retrieval response from per-dataset outcomes.
+    
+    Args:
+        query: The query that was sent.
+        dataset_ids: Every dataset that was queried.
+        outcomes: Finished calls keyed by dataset ID, each with ``latency`` and either
+            ``result`` or ``error``. Datasets missing here missed the deadline.
+        top_k: Number of merged records to return.
+        strategy: Merge strategy, see ``merge_results``.
+        **options: Strategy options.
+    """
+    results = {}
+    datasets = {}
+    for dataset_id in dataset_ids:
+        outcome = outcomes.get(dataset_id)
+        if outcome is None:
+            datasets[dataset_id] = {'status': 'timeout'}
+        elif 'error' in outcome:
+            datasets[dataset_id] = {'status': 'error', 'error': str(outcome['error']),
+                                    'latency': outcome['latency']}
+        else:
+            records = outcome['result'].get('records') or []
+            results[dataset_id] = records
+            datasets[dataset_id] = {'status': 'ok', 'count': len(records), 'latency': outcome['latency']}
+    
+    return {
+        'query': {'content': query},
+        'records': merge_results(results, top_k, strategy, **options),
+        'datasets': datasets,
+        'partial': len(results) < len(dataset_ids)
+    }
@@ -0,0 +1,82 @@
+import collections
+import threading
+from typing import Any, Dict, Optional
+
+
+class HedgePolicy:
+    """Decides when a slow retrieval gets a duplicate ("hedged") request.
+    
+    The policy keeps a rolling window of observed latencies. Once a call has
+    been waiting longer than the chosen percentile (p95 by default), a second
+    identical request is sent and whichever answers first wins. ``budget`` caps
+    hedges at a fraction of calls, so an overloaded server is not hit with
+    twice the traffic. Only use it for read-only calls.
+    """
+    
+    def __init__(self, percentile: float = 95.0, window: int = 500, min_samples: int = 20,
+                 initial_delay: Optional[float] = None, min_delay: float = 0.005,
+                 budget: float = 0.1):
+        """Initialize the policy.
+        
+        Args:
+            percentile: Latency percentile after which the duplicate is sent.
+            window: Number of recent latencies the percentile is computed over.
+            min_samples: Latencies needed before the percentile is trusted.
+            initial_delay: Hedge delay used until ``min_samples`` are collected. None
+                disables hedging while warming up.
+            min_delay: Lower bound for the hedge delay.
+            budget: Maximum fraction of calls that may be hedged.
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.budget = budget
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+    
+    def record(self, latency: float) -> None:
+        """Record the latency of a successful request."""
+        with self._lock:
+            self._latencies.append(latency)
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Start a call and get how long to wait before hedging it, or None to not hedge."""
+        with self._lock:
+            self._calls += 1
+            delay = self._percentile_delay()
+        return self.initial_delay if delay is None else delay
+    
+    def allow_hedge(self) -> bool:
+        """Claim a hedge from the budget. Returns False if the budget is used up."""
+        with self._lock:
+            if self._hedges >= self.budget * self._calls:
+                return False
+            self._hedges += 1
+            return True
+    
+    def record_hedge_win(self) -> None:
+        """Record that the duplicate request answered first."""
+        with self._lock:
+            self._hedge_wins += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get call, hedge and win counters plus the current hedge delay."""
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+                'samples': len(self._latencies),
+                'delay': self._percentile_delay()
+            }
+    
+    def _percentile_delay(self) -> Optional[float]:
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * self.percentile / 100.0), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
@@ -0,0 +1,485 @@
+import asyncio
+import collections
+import functools
+import heapq
+import inspect
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .api_client import APIError
+from .document import DocumentManager
+from .tracing import traced
+
+# Indexing statuses after which a document will not make further progress
+TERMINAL_STATUSES = frozenset(['completed', 'error', 'stopped'])
+
+# Poll failures worth trying again on the next tick rather than failing the batch
+_TRANSIENT_STATUSES = frozenset([0, 408, 429, 500, 502, 503, 504])
+
+
+def is_batch_done(documents: List[Dict[str, Any]]) -> bool:
+    """Check whether every document of an indexing-status response has finished."""
+    return bool(documents) and all(doc.get('indexing_status') in TERMINAL_STATUSES for doc in documents)
+
+
+def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Resolve a caller's future, unless the caller already cancelled it."""
+    # Moving to running first means a concurrent cancel() can no longer slip in
+    if future.done() or not future.set_running_or_notify_cancel():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class _WatchedBatch:
+    """Polling state for one (dataset_id, batch) pair.
+    
+    ``future`` is internal and never handed out; every caller gets a future of
+    its own in ``waiters`` or ``document_futures``, so a caller cancelling its
+    future leaves the others alone.
+    """
+    
+    def __init__(self, dataset_id: str, batch: str, interval: float):
+        self.dataset_id = dataset_id
+        self.batch = batch
+        self.interval = interval
+        self.future = Future()
+        self.waiters = []
+        self.document_futures = collections.defaultdict(list)
+        self.documents = []
+        self.completed_segments = None
+        self.polled_at = None
+        self.errors = 0
+    
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.dataset_id, self.batch
+
+
+@traced(client='documents.client')
+class IndexingWatcher:
+    """Track the indexing of many upload batches from one background polling thread.
+    
+    Each batch is polled on its own schedule, starting at ``min_interval`` and
+    backing off by ``backoff`` after every poll up to ``max_interval``. Once a
+    batch reports segment progress, the next poll is pulled in to when the
+    remaining segments are expected to finish, so a nearly indexed batch is not
+    left waiting out a long backoff. Results are delivered as futures (``watch``,
+    ``watch_document``), asyncio awaitables (``watch_async``) and a single
+    progress stream covering every batch (``progress``). Every call gets a future
+    of its own: cancelling it only stops that wait, and a batch stops being
+    polled once every future waiting on it has been cancelled.
+    """
+    
+    def __init__(self, documents: DocumentManager,
+                 min_interval: float = 0.5,
+                 max_interval: float = 30.0,
+                 backoff: float = 1.5,
+                 max_errors: int = 5,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Initialize the watcher.
+        
+        Args:
+            documents: Document manager used for polling, e.g. ``client.documents``.
+            min_interval: Seconds before the first poll of a batch, and the shortest interval.
+            max_interval: Longest interval between two polls of a batch.
+            backoff: Multiplier applied to a batch's interval after each poll.
+            max_errors: Consecutive transient poll failures before a batch is failed.
+            on_progress: Called from the polling thread with every progress event.
+        """
+        self.documents = documents
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self.on_progress = on_progress
+        
+        self._batches = {}
+        self._schedule = []
+        self._counter = itertools.count()
+        self._subscribers = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._loop = None
+    
+    def watch(self, dataset_id: str, batch: str) -> Future:
+        """Start tracking a batch.
+        
+        Returns:
+            Future resolving to the batch's final list of document statuses once every
+            document is 'completed', 'error' or 'stopped'. Documents that failed to
+            index resolve normally; check their ``indexing_status`` and ``error``.
+        """
+        future = Future()
+        with self._cond:
+            state = self._state(dataset_id, batch)
+            if state.future.done():
+                self._resolve_batch(state, future)
+            else:
+                state.waiters.append(future)
+                future.add_done_callback(functools.partial(self._cancelled, state))
+        return future
+    
+    def watch_document(self, dataset_id: str, batch: str, document_id: str) -> Future:
+        """Start tracking a batch and get a future for one of its documents.
+        
+        The future resolves to the document's status dict as soon as that document
+        finishes, without waiting for the rest of the batch.
+        """
+        future = Future()
+        with self._cond:
+            state = self._state(dataset_id, batch)
+            if state.future.done():
+                self._resolve_document(state, document_id, future)
+                return future
+            
+            # Resolve straight away if the last poll already saw it finish
+            for doc in state.documents:
+                if doc.get('id') == document_id and doc.get('indexing_status') in TERMINAL_STATUSES:
+                    _settle(future, doc)
+                    return future
+            state.document_futures[document_id].append(future)
+            future.add_done_callback(functools.partial(self._cancelled, state))
+        return future
+    
+    def watch_async(self, dataset_id: str, batch: str,
+                    document_id: Optional[str] = None) -> 'asyncio.Future':
+        """Awaitable variant of ``watch`` / ``watch_document`` for use inside an event loop.
+        
+        The manager may be an ``AsyncDocumentManager``; its polls are then run on
+        the calling event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            self._loop = loop
+        
+        if document_id is None:
+            future = self.watch(dataset_id, batch)
+        else:
+            future = self.watch_document(dataset_id, batch, document_id)
+        return asyncio.wrap_future(future, loop=loop)
+    
+    def progress(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over progress events of every watched batch until all have finished.
+        
+        Each event has ``dataset_id``, ``batch``, the batch's latest ``documents``,
+        ``done`` and a ``summary`` of all batches (see ``summary``). Failed polls
+        carry an ``error`` message instead of documents. Batches added while
+        iterating are included.
+        
+        Args:
+            timeout: Stop after this many seconds without an event. None waits indefinitely.
+        """
+        events = queue.Queue()
+        with self._cond:
+            if not self._pending():
+                return
+            self._subscribers.append(events)
+        
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=timeout)
+                except queue.Empty:
+                    return
+                if event is None:
+                    return
+                yield event
+        finally:
+            with self._cond:
+                self._subscribers.remove(events)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Get totals across every watched batch.
+        
+        Returns:
+            Dict with ``batches``, ``pending`` (unfinished batches), ``documents``,
+            ``statuses`` (document count per indexing status) and the summed
+            ``completed_segments`` / ``total_segments``.
+        """
+        with self._cond:
+            return self._summary()
+    
+    def wait(self, timeout: Optional[float] = None) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Block until every watched batch has finished.
+        
+        Returns:
+            Final document statuses keyed by ``(dataset_id, batch)``. Batches whose
+            polling failed are omitted.
+        
+        Raises:
+            TimeoutError: If the batches did not finish in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Indexing did not finish in time")
+                self._cond.wait(remaining)
+            states = list(self._batches.values())
+        
+        return {
+            state.key: state.future.result()
+            for state in states
+            if not state.future.cancelled() and state.future.exception() is None
+        }
+    
+    def close(self) -> None:
+        """Stop polling. Batches still pending have their futures cancelled."""
+        with self._cond:
+            self._closed = True
+            for state in list(self._batches.values()):
+                if not state.future.done():
+                    state.future.cancel()
+                    for future in self._waiting(state):
+                        future.cancel()
+            self._broadcast(None)
+            self._cond.notify_all()
+            thread = self._thread
+        
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def __enter__(self) -> 'IndexingWatcher':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    def _pending(self) -> int:
+        return sum(1 for state in self._batches.values() if not state.future.done())
+    
+    def _state(self, dataset_id: str, batch: str) -> _WatchedBatch:
+        """Get the state of a batch, starting to poll it if it is new. Caller holds the lock."""
+        if self._closed:
+            raise RuntimeError("IndexingWatcher is closed")
+        
+        state = self._batches.get((dataset_id, batch))
+        if state is None:
+            state = _WatchedBatch(dataset_id, batch, self.min_interval)
+            self._batches[state.key] = state
+            self._push(state, time.monotonic() + self.min_interval)
+            self._ensure_thread()
+            self._cond.notify_all()
+        return state
+    
+    @staticmethod
+    def _waiting(state: _WatchedBatch) -> List[Future]:
+        return state.waiters + [future for futures in state.document_futures.values() for future in futures]
+    
+    def _cancelled(self, state: _WatchedBatch, future: Future) -> None:
+        """Done-callback of a caller's future: forget it, and the batch once nobody waits on it."""
+        if not future.cancelled():
+            return
+        with self._cond:
+            if future in state.waiters:
+                state.waiters.remove(future)
+            for futures in state.document_futures.values():
+                if future in futures:
+                    futures.remove(future)
+            if self._closed or state.future.done() or self._waiting(state):
+                return
+            
+            state.future.cancel()
+            if self._batches.get(state.key) is state:
+                del self._batches[state.key]
+            self._schedule = [entry for entry in self._schedule if entry[2] is not state]
+            heapq.heapify(self._schedule)
+            # Progress streams end once nothing is pending
+            if not self._pending():
+                for events in self._subscribers:
+                    events.put(None)
+            self._cond.notify_all()
+    
+    def _push(self, state: _WatchedBatch, due: float) -> None:
+        heapq.heappush(self._schedule, (due, next(self._counter), state))
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='dify-indexing-watcher', daemon=True)
+            self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._schedule:
+                        delay = self._schedule[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                _, _, state = heapq.heappop(self._schedule)
+                if state.future.done():
+                    continue
+            
+            try:
+                self._poll(state)
+            except Exception as e:
+                # One bad batch must not stop the thread that polls all the others
+                self._poll_failed(state, e, fatal=True)
+    
+    def _fetch(self, state: _WatchedBatch) -> Dict[str, Any]:
+        response = self.documents.get_document_indexing_status(state.dataset_id, state.batch)
+        if inspect.isawaitable(response):
+            # Async managers return coroutines bound to the caller's event loop
+            if self._loop is None:
+                raise RuntimeError("Use watch_async() to watch batches with an async client")
+            response = asyncio.run_coroutine_threadsafe(response, self._loop).result()
+        return response
+    
+    def _poll(self, state: _WatchedBatch) -> None:
+        try:
+            response = self._fetch(state)
+        except APIError as e:
+            self._poll_failed(state, e)
+            return
+        except Exception as e:
+            self._poll_failed(state, e, fatal=True)
+            return
+        
+        now = time.monotonic()
+        documents = response.get('data') or []
+        
+        with self._cond:
+            if self._closed or state.future.done():
+                return
+            
+            state.errors = 0
+            state.documents = documents
+            for doc in documents:
+                if doc.get('indexing_status') in TERMINAL_STATUSES:
+                    for future in state.document_futures.pop(doc.get('id'), []):
+                        _settle(future, doc)
+            
+            done = is_batch_done(documents)
+            if done:
+                state.future.set_result(documents)
+                for future in state.waiters:
+                    _settle(future, documents)
+                state.waiters = []
+                for document_id in list(state.document_futures):
+                    for future in state.document_futures.pop(document_id):
+                        self._resolve_document(state, document_id, future)
+            else:
+                self._push(state, now + self._next_interval(state, documents, now))
+            
+            self._broadcast({
+                'dataset_id': state.dataset_id,
+                'batch': state.batch,
+                'documents': documents,
+                'done': done,
+                'summary': self._summary()
+            })
+            self._cond.notify_all()
+    
+    def _next_interval(self, state: _WatchedBatch, documents: List[Dict[str, Any]], now: float) -> float:
+        interval = min(self.max_interval, state.interval * self.backoff)
+        
+        completed = sum(doc.get('completed_segments') or 0 for doc in documents)
+        total = sum(doc.get('total_segments') or 0 for doc in documents)
+        if (state.completed_segments is not None and completed > state.completed_segments
+                and total > completed and now > state.polled_at):
+            # Expect the rest at the observed rate; don't poll much later than that
+            rate = (completed - state.completed_segments) / (now - state.polled_at)
+            interval = max(self.min_interval, min(interval, (total - completed) / rate))
+        
+        state.interval = interval
+        state.completed_segments = completed
+        state.polled_at = now
+        return interval
+    
+    def _poll_failed(self, state: _WatchedBatch, error: Exception, fatal: bool = False) -> None:
+        with self._cond:
+            if self._closed or state.future.done():
+                return
+            
+            state.errors += 1
+            status = getattr(error, 'status', None)
+            if fatal or status not in _TRANSIENT_STATUSES or state.errors >= self.max_errors:
+                state.future.set_exception(error)
+                for future in self._waiting(state):
+                    _settle(future, error=error)
+                state.waiters = []
+                state.document_futures.clear()
+                done = True
+            else:
+                state.interval = min(self.max_interval, state.interval * self.backoff)
+                self._push(state, time.monotonic() + state.interval)
+                done = False
+            
+            self._broadcast({
+                'dataset_id': state.dataset_id,
+                'batch': state.batch,
+                'error': str(error),
+                'done': done,
+                'summary': self._summary()
+            })
+            self._cond.notify_all()
+    
+    @staticmethod
+    def _resolve_batch(state: _WatchedBatch, future: Future) -> None:
+        """Give a caller's future the outcome of a finished batch."""
+        if state.future.cancelled():
+            future.cancel()
+        elif state.future.exception() is not None:
+            _settle(future, error=state.future.exception())
+        else:
+            _settle(future, state.future.result())
+    
+    def _resolve_document(self, state: _WatchedBatch, document_id: str, future: Future) -> None:
+        if state.future.cancelled():
+            future.cancel()
+            return
+        if state.future.exception() is not None:
+            _settle(future, error=state.future.exception())
+            return
+        
+        for doc in state.future.result():
+            if doc.get('id') == document_id:
+                _settle(future, doc)
+                return
+        _settle(future, error=KeyError(f"Document {document_id} is not part of batch {state.batch}"))
+    
+    def _summary(self) -> Dict[str, Any]:
+        statuses = collections.Counter()
+        completed_segments = total_segments = documents = 0
+        for state in self._batches.values():
+            for doc in state.documents:
+                documents += 1
+                statuses[doc.get('indexing_status')] += 1
+                completed_segments += doc.get('completed_segments') or 0
+                total_segments += doc.get('total_segments') or 0
+        
+        return {
+            'batches': len(self._batches),
+            'pending': self._pending(),
+            'documents': documents,
+            'statuses': dict(statuses),
+            'completed_segments': completed_segments,
+            'total_segments': total_segments
+        }
+    
+    def _broadcast(self, event: Optional[Dict[str, Any]]) -> None:
+        # Called with the lock held; subscriber queues are unbounded so this never blocks
+        if event is not None and self.on_progress is not None:
+            try:
+                self.on_progress(event)
+            except Exception:
+                pass
+        
+        for events in self._subscribers:
+            events.put(event)
+            if event is not None and not self._pending():
+                events.put(None)
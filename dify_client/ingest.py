@@ -0,0 +1,194 @@
+import glob
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Union
+
+from .api_client import APIError
+from .document import DocumentManager
+from .tracing import ContextThreadPoolExecutor, traced
+
+# A file path, or a dict with 'name' and 'text' keys for a text document
+Source = Union[str, Path, Dict[str, Any]]
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def expand_sources(sources: Union[Source, Iterable[Source]]) -> Iterator[Source]:
+    """Expand a directory, glob pattern or iterable into individual sources, lazily."""
+    if isinstance(sources, (str, Path)):
+        path = Path(sources)
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield Path(root) / name
+        elif _GLOB_CHARS.intersection(str(sources)):
+            for match in sorted(glob.iglob(str(sources), recursive=True)):
+                if os.path.isfile(match):
+                    yield Path(match)
+        else:
+            yield path
+        return
+    
+    if isinstance(sources, dict):
+        yield sources
+        return
+    
+    for source in sources:
+        yield from expand_sources(source)
+
+
+def source_key(source: Source) -> str:
+    """Get the stable key used to checkpoint a source."""
+    if isinstance(source, dict):
+        return f"text:{source['name']}"
+    return str(Path(source).resolve())
+
+
+class IngestCheckpoint:
+    """Append-only JSON-lines record of sources that were uploaded successfully."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.completed = {}
+        
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a truncated last line
+                        continue
+                    self.completed[entry['source']] = entry
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+    
+    def record(self, result: Dict[str, Any]) -> None:
+        """Persist a successful upload so a restart can skip it."""
+        entry = {
+            'source': result['source'],
+            'document_id': result.get('document_id'),
+            'batch': result.get('batch')
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed[entry['source']] = entry
+
+
+@traced(client='documents.client')
+class BulkIngestor:
+    """Upload many files and texts to a knowledge base with bounded concurrency.
+    
+    Sources are read lazily and at most ``max_pending`` uploads are queued at a
+    time, so a 100k-file import does not materialise its work list in memory.
+    Results are yielded as uploads finish. With a checkpoint file, successful
+    uploads are recorded immediately and skipped when the import is re-run.
+    """
+    
+    # Every status a result can have, used to build the ``ingest`` summary
+    statuses = ('uploaded', 'skipped', 'failed')
+    
+    def __init__(self, documents: DocumentManager, dataset_id: str,
+                 workers: int = 4,
+                 max_pending: Optional[int] = None,
+                 checkpoint_path: Optional[str] = None,
+                 **upload_options: Any):
+        """Initialize the ingestor.
+        
+        Args:
+            documents: Document manager used for uploads, e.g. ``client.documents``.
+            dataset_id: Target knowledge base.
+            workers: Number of concurrent uploads.
+            max_pending: Maximum queued uploads before reading more sources. Defaults to ``2 * workers``.
+            checkpoint_path: JSON-lines file recording completed uploads, for resuming.
+            **upload_options: Passed to ``create_document_from_file`` / ``create_document_from_text``,
+                e.g. ``indexing_technique`` or ``process_rule``.
+        """
+        self.documents = documents
+        self.dataset_id = dataset_id
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        self.checkpoint = IngestCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.upload_options = upload_options
+    
+    def _upload(self, source: Source) -> Dict[str, Any]:
+        key = source_key(source)
+        try:
+            if isinstance(source, dict):
+                response = self.documents.create_document_from_text(
+                    self.dataset_id, source['name'], source['text'], **self.upload_options
+                )
+            else:
+                response = self.documents.create_document_from_file(
+                    self.dataset_id, str(source), **self.upload_options
+                )
+        except (APIError, OSError) as e:
+            return {'source': key, 'status': 'failed', 'error': str(e)}
+        
+        document = response.get('document') or {}
+        return {
+            'source': key,
+            'status': 'uploaded',
+            'document_id': document.get('id'),
+            'batch': response.get('batch')
+        }
+    
+    def run(self, sources: Union[Source, Iterable[Source]]) -> Iterator[Dict[str, Any]]:
+        """Upload sources, yielding a result dict per source as it completes.
+        
+        Each result has ``source`` and ``status`` ('uploaded', 'skipped' or 'failed'),
+        plus ``document_id``/``batch`` on success or ``error`` on failure.
+        """
+        executor = ContextThreadPoolExecutor(max_workers=self.workers)
+        pending = set()
+        try:
+            for source in expand_sources(sources):
+                key = source_key(source)
+                if self.checkpoint is not None and key in self.checkpoint:
+                    entry = self.checkpoint.completed[key]
+                    yield {'source': key, 'status': 'skipped',
+                           'document_id': entry.get('document_id'), 'batch': entry.get('batch')}
+                    continue
+                
+                # Backpressure: stop reading sources until a slot frees up
+                while len(pending) >= self.max_pending:
+                    yield from self._drain(pending)
+                
+                pending.add(executor.submit(self._upload, source))
+            
+            while pending:
+                yield from self._drain(pending)
+        finally:
+            # If the caller stops early, uploads already in flight still finish;
+            # checkpoint them so a re-run does not upload them twice
+            executor.shutdown(wait=True)
+            for future in pending:
+                self._record(future.result())
+    
+    def _drain(self, pending: Set) -> Iterator[Dict[str, Any]]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            result = future.result()
+            self._record(result)
+            yield result
+    
+    def _record(self, result: Dict[str, Any]) -> None:
+        if result['status'] == 'uploaded' and self.checkpoint is not None:
+            self.checkpoint.record(result)
+    
+    def ingest(self, sources: Union[Source, Iterable[Source]]) -> Dict[str, Any]:
+        """Upload sources and return a summary with counts and the failed results."""
+        summary = dict.fromkeys(self.statuses, 0)
+        summary['failures'] = []
+        for result in self.run(sources):
+            summary[result['status']] += 1
+            if result['status'] == 'failed':
+                summary['failures'].append(result)
+        return summary
\ No newline at end of file
@@ -1,7 +1,10 @@
-from typing import Dict, List, Optional, Any
-from .api_client import DifyAPIClient, APIError
+from typing import Dict, List, Optional, Any, AsyncIterator, Iterator
+from .api_client import DifyAPIClient, AsyncDifyAPIClient, APIError
+from .pagination import MAX_PAGE_SIZE, iter_items, aiter_items
+from .tracing import traced
 
 
+@traced
 class KnowledgeBaseManager:
     """Manager for knowledge base operations."""
     
@@ -25,6 +28,14 @@ class KnowledgeBaseManager:
         
         return self.client.get('/datasets', params=params)
     
+    def iter_datasets(self, keyword: Optional[str] = None, tag_ids: Optional[List[str]] = None,
+                      include_all: bool = False, limit: int = MAX_PAGE_SIZE,
+                      prefetch: bool = False, workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """Iterate over all knowledge bases, fetching pages lazily."""
+        return iter_items(lambda page: self.list_datasets(keyword, tag_ids, page=page, limit=limit,
+                                                          include_all=include_all),
+                          limit, prefetch=prefetch, workers=workers)
+    
     def get_dataset(self, dataset_id: str) -> Dict[str, Any]:
         """Get knowledge base details."""
         return self.client.get(f'/datasets/{dataset_id}')
@@ -104,7 +115,7 @@ class KnowledgeBaseManager:
         if partial_member_list is not None:
             data['partial_member_list'] = partial_member_list
         
-        return self.client.patch(f'/datasets/{dataset_id}', data=data)
+        return self.client.patch(f'/datasets/{dataset_id}', data=data, idempotent=True)
     
     def delete_dataset(self, dataset_id: str) -> Dict[str, Any]:
         """Delete a knowledge base."""
@@ -152,4 +163,24 @@ class KnowledgeBaseManager:
         else:
             retrieval_model['score_threshold'] = None
         
-        return retrieval_model
\ No newline at end of file
+        return retrieval_model
+
+
+@traced
+class AsyncKnowledgeBaseManager(KnowledgeBaseManager):
+    """Async manager for knowledge base operations.
+    
+    API methods return awaitables from the underlying AsyncDifyAPIClient;
+    ``create_retrieval_model`` stays a plain helper.
+    """
+    
+    def __init__(self, client: AsyncDifyAPIClient):
+        self.client = client
+    
+    def iter_datasets(self, keyword: Optional[str] = None, tag_ids: Optional[List[str]] = None,
+                      include_all: bool = False, limit: int = MAX_PAGE_SIZE,
+                      prefetch: bool = False, workers: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over all knowledge bases with ``async for``, fetching pages lazily."""
+        return aiter_items(lambda page: self.list_datasets(keyword, tag_ids, page=page, limit=limit,
+                                                           include_all=include_all),
+                           limit, prefetch=prefetch, workers=workers)
\ No newline at end of file
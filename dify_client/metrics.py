@@ -0,0 +1,366 @@
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is only needed to time AsyncDifyAPIClient requests
+    aiohttp = None
+
+# Histogram upper bounds in seconds; covers sub-millisecond cache-warm calls up to slow uploads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Latency phases. They do not overlap: connect, tls and dns are only seen on a new
+# connection, ttfb is the wait from sending the request to the response headers,
+# and download is the time spent reading the body. total covers the whole attempt.
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download', 'total')
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Connection phase timings of the request running on the current thread
+_local = threading.local()
+
+
+def _record_phase(name: str, seconds: float) -> None:
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _EndpointMetrics:
+    __slots__ = ('requests', 'errors', 'bytes_sent', 'bytes_received', 'histograms')
+    
+    def __init__(self):
+        self.requests = 0
+        self.errors = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.histograms = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ClientMetrics:
+    """Request metrics keyed by method and endpoint template, e.g. ``POST /datasets/{dataset_id}/retrieve``.
+    
+    Counts attempts (retries included), errors by ``APIError.code`` and body
+    bytes in each direction, and keeps a fixed-bucket latency histogram per
+    phase (see PHASES). Recording is a dict lookup, a bisect and a few
+    additions under one lock, so it can stay on in production. Export with
+    ``to_prometheus`` or ``to_openmetrics``.
+    """
+    
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, namespace: str = 'dify_client'):
+        """Initialize the metrics.
+        
+        Args:
+            buckets: Histogram upper bounds in seconds, ascending.
+            namespace: Prefix of every exported metric name.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._endpoints = {}
+    
+    def observe(self, method: str, endpoint: str, phases: Dict[str, float],
+                bytes_sent: int = 0, bytes_received: int = 0,
+                error_code: Optional[str] = None) -> None:
+        """Record one request attempt.
+        
+        Args:
+            method: HTTP method.
+            endpoint: Endpoint template, not the raw path.
+            phases: Seconds per phase, at least ``total``.
+            bytes_sent: Request body size.
+            bytes_received: Response body size.
+            error_code: ``APIError.code`` if the attempt failed.
+        """
+        key = (method, endpoint)
+        with self._lock:
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = _EndpointMetrics()
+            metrics.requests += 1
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+            if error_code is not None:
+                metrics.errors[error_code] = metrics.errors.get(error_code, 0) + 1
+            
+            for phase, seconds in phases.items():
+                histogram = metrics.histograms.get(phase)
+                if histogram is None:
+                    histogram = metrics.histograms[phase] = _Histogram(len(self.buckets) + 1)
+                histogram.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+                histogram.sum += seconds
+                histogram.count += 1
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get a copy of the counters, keyed by "METHOD /endpoint/template".
+        
+        Each entry has ``requests``, ``errors`` ({code: count}), ``bytes_sent``,
+        ``bytes_received`` and ``latency`` ({phase: {'count', 'sum', 'buckets'}}),
+        where ``buckets`` maps each upper bound to its cumulative count.
+        """
+        with self._lock:
+            return {f'{method} {endpoint}': self._entry(metrics)
+                    for (method, endpoint), metrics in self._endpoints.items()}
+    
+    def _entry(self, metrics: _EndpointMetrics) -> Dict[str, Any]:
+        latency = {}
+        for phase, histogram in metrics.histograms.items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                buckets[bound] = cumulative
+            latency[phase] = {'count': histogram.count, 'sum': histogram.sum, 'buckets': buckets}
+        return {
+            'requests': metrics.requests,
+            'errors': dict(metrics.errors),
+            'bytes_sent': metrics.bytes_sent,
+            'bytes_received': metrics.bytes_received,
+            'latency': latency
+        }
+    
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._endpoints.clear()
+    
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format (0.0.4)."""
+        return self._render(openmetrics=False)
+    
+    def to_openmetrics(self) -> str:
+        """Render the metrics in the OpenMetrics text format."""
+        return self._render(openmetrics=True)
+    
+    def _render(self, openmetrics: bool) -> str:
+        snapshot = self.snapshot()
+        prefix = self.namespace
+        lines = []
+        
+        def family(name: str, kind: str, help_text: str, unit: Optional[str] = None) -> None:
+            # OpenMetrics names counter families without the _total sample suffix
+            family_name = name[:-len('_total')] if openmetrics and kind == 'counter' else name
+            lines.append(f'# HELP {family_name} {help_text}')
+            lines.append(f'# TYPE {family_name} {kind}')
+            if openmetrics and unit:
+                lines.append(f'# UNIT {family_name} {unit}')
+        
+        def labels_of(key: str) -> List[Tuple[str, str]]:
+            method, endpoint = key.split(' ', 1)
+            return [('method', method), ('endpoint', endpoint)]
+        
+        counters = (
+            ('requests_total', 'requests', 'HTTP request attempts, retries included.', None),
+            ('request_bytes_total', 'bytes_sent', 'Request body bytes sent.', 'bytes'),
+            ('response_bytes_total', 'bytes_received', 'Response body bytes received.', 'bytes')
+        )
+        for suffix, field, help_text, unit in counters:
+            name = f'{prefix}_{suffix}'
+            family(name, 'counter', help_text, unit)
+            for key, entry in snapshot.items():
+                lines.append(f'{name}{_labels(labels_of(key))} {entry[field]}')
+        
+        name = f'{prefix}_errors_total'
+        family(name, 'counter', 'Failed request attempts by APIError code.')
+        for key, entry in snapshot.items():
+            for code, count in entry['errors'].items():
+                lines.append(f'{name}{_labels(labels_of(key) + [("code", code)])} {count}')
+        
+        name = f'{prefix}_request_duration_seconds'
+        family(name, 'histogram', 'Request attempt latency by phase.', 'seconds')
+        for key, entry in snapshot.items():
+            for phase in PHASES:
+                histogram = entry['latency'].get(phase)
+                if histogram is None:
+                    continue
+                base = labels_of(key) + [('phase', phase)]
+                for bound, count in histogram['buckets'].items():
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{name}_bucket{_labels(base + [("le", le)])} {count}')
+                lines.append(f'{name}_sum{_labels(base)} {_number(histogram["sum"])}')
+                lines.append(f'{name}_count{_labels(base)} {histogram["count"]}')
+        
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class _TimedConnection:
+    """Records how long opening the socket takes, for the connect phase."""
+    
+    def _new_conn(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _record_phase('connect', time.perf_counter() - started)
+
+
+class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    def connect(self) -> None:
+        started = time.perf_counter()
+        before = getattr(_local, 'timings', {}).get('connect', 0.0)
+        super().connect()
+        socket_time = getattr(_local, 'timings', {}).get('connect', 0.0) - before
+        # Whatever connect() spent beyond opening the socket was the TLS handshake
+        _record_phase('tls', time.perf_counter() - started - socket_time)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def instrument_adapter(adapter: Any) -> None:
+    """Make a requests HTTPAdapter's new connections report connect and TLS time."""
+    adapter.poolmanager.pool_classes_by_scheme = {
+        'http': _TimedHTTPConnectionPool,
+        'https': _TimedHTTPSConnectionPool
+    }
+
+
+def start_timing() -> None:
+    """Start collecting connection phases for a request on this thread."""
+    _local.timings = {}
+
+
+def requests_phases(response: Any, total: float) -> Dict[str, float]:
+    """Split a requests attempt into phases, using the connection timings collected on this thread.
+    
+    requests resolves names inside the socket connect, so DNS time is part of ``connect``.
+    """
+    phases = getattr(_local, 'timings', None) or {}
+    _local.timings = None
+    if response is not None:
+        to_headers = response.elapsed.total_seconds()
+        phases['ttfb'] = max(to_headers - phases.get('connect', 0.0) - phases.get('tls', 0.0), 0.0)
+        phases['download'] = max(total - to_headers, 0.0)
+    phases['total'] = total
+    return phases
+
+
+def requests_body_size(response: Any) -> int:
+    """Get the size of the request body a requests response was sent with."""
+    if response is None:
+        return 0
+    length = response.request.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    body = response.request.body
+    try:
+        return len(body) if body is not None else 0
+    except TypeError:
+        # A streamed body without Content-Length has no known size
+        return 0
+
+
+def aiohttp_trace_config() -> 'aiohttp.TraceConfig':
+    """Build a TraceConfig that fills the ``trace_request_ctx`` dict of each request.
+    
+    Keys set: ``dns``, ``connect`` (TCP and TLS; aiohttp does not separate them),
+    ``headers_at`` (seconds from start to the response headers), ``sent`` and
+    ``received`` body bytes.
+    """
+    config = aiohttp.TraceConfig()
+    
+    def ctx(trace_config_ctx: Any) -> Optional[Dict[str, Any]]:
+        return trace_config_ctx.trace_request_ctx if isinstance(trace_config_ctx.trace_request_ctx, dict) else None
+    
+    async def on_request_start(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None:
+            timings['started'] = time.perf_counter()
+    
+    async def on_dns_start(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None:
+            timings['dns_started'] = time.perf_counter()
+    
+    async def on_dns_end(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None and 'dns_started' in timings:
+            timings['dns'] = time.perf_counter() - timings.pop('dns_started')
+    
+    async def on_connection_start(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None:
+            timings['connect_started'] = time.perf_counter()
+    
+    async def on_connection_end(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None and 'connect_started' in timings:
+            timings['connect'] = time.perf_counter() - timings.pop('connect_started')
+    
+    async def on_chunk_sent(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None:
+            timings['sent'] = timings.get('sent', 0) + len(params.chunk)
+    
+    async def on_request_end(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None and 'started' in timings:
+            timings['headers_at'] = time.perf_counter() - timings['started']
+    
+    async def on_chunk_received(session, trace_config_ctx, params):
+        timings = ctx(trace_config_ctx)
+        if timings is not None:
+            timings['received'] = timings.get('received', 0) + len(params.chunk)
+    
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connection_start)
+    config.on_connection_create_end.append(on_connection_end)
+    config.on_request_chunk_sent.append(on_chunk_sent)
+    config.on_request_end.append(on_request_end)
+    config.on_response_chunk_received.append(on_chunk_received)
+    return config
+
+
+def aiohttp_phases(timings: Dict[str, Any], total: float) -> Dict[str, float]:
+    """Split an aiohttp attempt into phases from the dict filled by ``aiohttp_trace_config``."""
+    phases = {'total': total}
+    dns = timings.get('dns', 0.0)
+    if 'dns' in timings:
+        phases['dns'] = dns
+    if 'connect' in timings:
+        # The connection callbacks wrap name resolution too
+        phases['connect'] = max(timings['connect'] - dns, 0.0)
+    headers_at = timings.get('headers_at')
+    if headers_at is not None:
+        phases['ttfb'] = max(headers_at - timings.get('connect', 0.0), 0.0)
+        phases['download'] = max(total - headers_at, 0.0)
+    return phases
@@ -0,0 +1,605 @@
+import collections
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .api_client import APIError
+from .cache import normalize_query
+from .codec import to_builtins
+from .document import DocumentManager
+from .segment import SegmentManager
+from .tracing import ContextThreadPoolExecutor, traced
+
+# Local search methods and the indexed field each one matches against
+SEARCH_FIELDS = {
+    'keyword_search': 'keywords',
+    'full_text_search': 'content'
+}
+
+# BM25 parameters, the same for both index backends
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalised word tokens (NFKC, case-folded)."""
+    return _TOKEN.findall(normalize_query(text))
+
+
+def segment_hash(segment: Dict[str, Any], child_chunks: Iterable[Dict[str, Any]] = ()) -> str:
+    """Hash the searchable parts of a segment and its child chunks, to tell whether they changed."""
+    payload = json.dumps([segment.get('content'), segment.get('answer'), segment.get('keywords'),
+                          segment.get('enabled'), segment.get('status'), segment.get('position'),
+                          [(chunk.get('id'), chunk.get('content')) for chunk in child_chunks]],
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _version(document: Dict[str, Any]) -> Tuple[Any, Any]:
+    """The fields that change whenever a document's segments do."""
+    return document.get('updated_at') or document.get('created_at'), document.get('word_count')
+
+
+def _dump(item: Dict[str, Any]) -> str:
+    return json.dumps(item, ensure_ascii=False, sort_keys=True, default=to_builtins)
+
+
+def _change(op: str, kind: str, item_id: str, document_id: str) -> Dict[str, Any]:
+    return {'op': op, 'type': kind, 'id': item_id, 'document_id': document_id}
+
+
+def _searchable(document: Dict[str, Any], segment: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether ``retrieve_chunks`` can return the segment: it and its document are enabled and not archived."""
+    if document.get('enabled') is False or document.get('archived'):
+        return False
+    return segment is None or segment.get('enabled') is not False
+
+
+def bm25(postings: Dict[str, List[Tuple[str, int, int]]], total: int, average: float,
+         limit: int) -> List[Tuple[str, float]]:
+    """Rank segments with BM25, best first.
+    
+    Args:
+        postings: For each query term, ``(segment_id, term_frequency, field_length)`` of
+            every segment whose field contains it.
+        total: Number of segments with the field indexed.
+        average: Average field length in tokens.
+        limit: Maximum number of segments returned.
+    """
+    scores = {}
+    for rows in postings.values():
+        idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+        for segment_id, tf, length in rows:
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (average or 1))
+            scores[segment_id] = scores.get(segment_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+    # Break ties by ID so both backends return equal scores in the same order
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def _create_field_lengths(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS field_lengths ('
+        ' segment_id TEXT NOT NULL, field TEXT NOT NULL, length INTEGER NOT NULL,'
+        ' PRIMARY KEY (segment_id, field)) WITHOUT ROWID'
+    )
+
+
+def _add_field_lengths(conn: sqlite3.Connection, segment_id: str, fields: Dict[str, str]) -> None:
+    conn.executemany('INSERT OR REPLACE INTO field_lengths VALUES (?, ?, ?)',
+                     [(segment_id, field, len(tokenize(text))) for field, text in fields.items()])
+
+
+def _field_stats(conn: sqlite3.Connection, field: str) -> Tuple[int, float]:
+    """Number of indexed segments and their average length in ``field``."""
+    return conn.execute('SELECT COUNT(*), AVG(length) FROM field_lengths WHERE field = ?', (field,)).fetchone()
+
+
+def _fields(segment: Dict[str, Any], child_chunks: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Text of each indexed field. Child chunk text is searchable as part of its segment."""
+    content = [segment.get('content') or '', segment.get('answer') or '']
+    content.extend(chunk.get('content') or '' for chunk in child_chunks)
+    return {
+        'content': '\n'.join(part for part in content if part),
+        'keywords': ' '.join(segment.get('keywords') or [])
+    }
+
+
+class _FTS5Index:
+    """Inverted index kept in an SQLite FTS5 table.
+    
+    FTS5 only finds the segments containing a query term. They are scored with
+    ``bm25`` like the postings index, since FTS5's own ``bm25()`` uses a
+    different idf and the scores, and so ``score_threshold``, would otherwise
+    depend on how SQLite was built.
+    """
+    
+    name = 'fts5'
+    
+    @staticmethod
+    def create(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5('
+            ' segment_id UNINDEXED, content, keywords,'
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        _create_field_lengths(conn)
+        # Mirrors created before field lengths were tracked
+        missing = conn.execute(
+            'SELECT segment_id, content, keywords FROM segments_fts'
+            ' WHERE segment_id NOT IN (SELECT segment_id FROM field_lengths)'
+        ).fetchall()
+        for segment_id, content, keywords in missing:
+            _add_field_lengths(conn, segment_id, {'content': content, 'keywords': keywords})
+    
+    @staticmethod
+    def add(conn: sqlite3.Connection, segment_id: str, fields: Dict[str, str]) -> None:
+        conn.execute('INSERT INTO segments_fts (segment_id, content, keywords) VALUES (?, ?, ?)',
+                     (segment_id, fields['content'], fields['keywords']))
+        _add_field_lengths(conn, segment_id, fields)
+    
+    @staticmethod
+    def remove(conn: sqlite3.Connection, segment_ids: List[str]) -> None:
+        params = [(i,) for i in segment_ids]
+        conn.executemany('DELETE FROM segments_fts WHERE segment_id = ?', params)
+        conn.executemany('DELETE FROM field_lengths WHERE segment_id = ?', params)
+    
+    @staticmethod
+    def search(conn: sqlite3.Connection, terms: List[str], field: str, limit: int) -> List[Tuple[str, float]]:
+        total, average = _field_stats(conn, field)
+        if not total:
+            return []
+        
+        # Quote every term so FTS5 query syntax in user input is matched literally
+        match = '{%s} : (%s)' % (field, ' OR '.join('"%s"' % term.replace('"', '""') for term in terms))
+        # field is one of SEARCH_FIELDS' column names, never user input
+        rows = conn.execute(f'SELECT segment_id, {field} FROM segments_fts WHERE segments_fts MATCH ?', (match,))
+        
+        wanted = set(terms)
+        postings = {}
+        for segment_id, text in rows:
+            tokens = tokenize(text)
+            counts = collections.Counter(token for token in tokens if token in wanted)
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((segment_id, tf, len(tokens)))
+        return bm25(postings, total, average, limit)
+
+
+class _PostingsIndex:
+    """Inverted index in plain tables, for SQLite builds without FTS5. Scored with BM25."""
+    
+    name = 'postings'
+    
+    @staticmethod
+    def create(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS postings ('
+            ' term TEXT NOT NULL, field TEXT NOT NULL, segment_id TEXT NOT NULL, tf INTEGER NOT NULL,'
+            ' PRIMARY KEY (term, field, segment_id)) WITHOUT ROWID'
+        )
+        _create_field_lengths(conn)
+        conn.execute('CREATE INDEX IF NOT EXISTS postings_segment ON postings (segment_id)')
+    
+    @staticmethod
+    def add(conn: sqlite3.Connection, segment_id: str, fields: Dict[str, str]) -> None:
+        for field, text in fields.items():
+            tokens = tokenize(text)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            conn.executemany('INSERT INTO postings VALUES (?, ?, ?, ?)',
+                             [(term, field, segment_id, tf) for term, tf in counts.items()])
+        _add_field_lengths(conn, segment_id, fields)
+    
+    @staticmethod
+    def remove(conn: sqlite3.Connection, segment_ids: List[str]) -> None:
+        params = [(i,) for i in segment_ids]
+        conn.executemany('DELETE FROM postings WHERE segment_id = ?', params)
+        conn.executemany('DELETE FROM field_lengths WHERE segment_id = ?', params)
+    
+    @staticmethod
+    def search(conn: sqlite3.Connection, terms: List[str], field: str, limit: int) -> List[Tuple[str, float]]:
+        total, average = _field_stats(conn, field)
+        if not total:
+            return []
+        
+        postings = {}
+        for term in set(terms):
+            postings[term] = conn.execute(
+                'SELECT p.segment_id, p.tf, l.length FROM postings p'
+                ' JOIN field_lengths l ON l.segment_id = p.segment_id AND l.field = p.field'
+                ' WHERE p.term = ? AND p.field = ?', (term, field)
+            ).fetchall()
+        return bm25(postings, total, average, limit)
+
+
+@traced(client='documents.client')
+class LocalMirror:
+    """On-disk copy of a knowledge base that answers keyword and full-text queries locally.
+    
+    ``pull`` walks ``list_documents``, ``list_segments`` and ``list_child_chunks``
+    and stores every document, segment and child chunk in SQLite, indexed with
+    FTS5 when the SQLite build has it and with a BM25-scored postings table
+    otherwise. ``refresh`` keeps it current, fetching only changed documents.
+    Searches never touch the network and return the same shape as
+    ``retrieve_chunks``, so a mirror can stand in for the API where embeddings
+    are not needed. Only one pull or refresh should run at a time.
+    """
+    
+    def __init__(self, documents: DocumentManager, segments: SegmentManager, dataset_id: str,
+                 path: str, workers: int = 4, child_chunks: bool = True):
+        """Initialize the mirror, opening or creating its database.
+        
+        Args:
+            documents: Document manager used to list documents, e.g. ``client.documents``.
+            segments: Segment manager used to list segments, e.g. ``client.segments``.
+            dataset_id: Knowledge base to mirror.
+            path: SQLite file holding the mirror. One file per knowledge base.
+            workers: Number of documents fetched concurrently.
+            child_chunks: Also fetch child chunks of parent-child documents.
+        """
+        self.documents = documents
+        self.segments = segments
+        self.dataset_id = dataset_id
+        self.path = path
+        self.workers = workers
+        self.child_chunks = child_chunks
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' id TEXT PRIMARY KEY, name TEXT, updated_at INTEGER, word_count INTEGER,'
+                ' data TEXT NOT NULL, pulled_at REAL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS segments ('
+                ' id TEXT PRIMARY KEY, document_id TEXT NOT NULL, position INTEGER,'
+                ' hash TEXT NOT NULL, data TEXT NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS segments_document ON segments (document_id)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS child_chunks ('
+                ' id TEXT PRIMARY KEY, segment_id TEXT NOT NULL, position INTEGER, data TEXT NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS child_chunks_segment ON child_chunks (segment_id)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS mirror (key TEXT PRIMARY KEY, value TEXT)')
+            self.index = self._open_index()
+    
+    def _open_index(self) -> Any:
+        tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'postings' in tables:
+            return _PostingsIndex
+        try:
+            _FTS5Index.create(self._conn)
+            return _FTS5Index
+        except sqlite3.OperationalError:
+            # SQLite was built without FTS5
+            _PostingsIndex.create(self._conn)
+            return _PostingsIndex
+    
+    def pull(self) -> Dict[str, Any]:
+        """Fetch the whole knowledge base and bring the mirror in line with it.
+        
+        Every document's segments are fetched, but only segments whose hash
+        changed are rewritten. A document that fails to fetch keeps its previous
+        copy. Documents deleted on the server are dropped. Disabled segments and
+        the segments of disabled or archived documents are stored but not
+        searchable, since ``retrieve_chunks`` never returns them.
+        
+        Returns:
+            Summary with ``documents``, ``segments`` and ``child_chunks`` counts,
+            ``failed`` ({document_id: error}) and ``elapsed`` seconds.
+        """
+        started = time.monotonic()
+        summary = {'documents': 0, 'segments': 0, 'child_chunks': 0, 'failed': {}}
+        listed = set()
+        
+        def documents() -> Iterator[Dict[str, Any]]:
+            for document in self.documents.iter_documents(self.dataset_id):
+                listed.add(document['id'])
+                yield document
+        
+        for document, fetched, error in self._fetch_all(documents()):
+            if error is not None:
+                summary['failed'][document['id']] = str(error)
+                continue
+            self._apply_document(document, fetched)
+            summary['documents'] += 1
+            summary['segments'] += len(fetched)
+            summary['child_chunks'] += sum(len(children) for _, children in fetched)
+        
+        self._remove_documents(set(self._snapshot()) - listed)
+        self._set_meta('pulled_at', str(time.time()))
+        
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+    
+    def refresh(self, changelog: Optional[str] = None) -> Dict[str, Any]:
+        """Update the mirror, re-fetching segments only of documents that changed.
+        
+        One walk of ``list_documents`` is compared with the stored snapshot: a
+        document is re-fetched when it is new or its ``updated_at`` or
+        ``word_count`` moved, and within it only segments whose content hash
+        changed are rewritten. Documents whose other fields changed (name,
+        enabled, ...) are updated without fetching their segments.
+        
+        Args:
+            changelog: JSON-lines file every change is appended to, with a timestamp,
+                as soon as it is committed. If the walk fails partway, the changes
+                already applied are logged before the error propagates.
+        
+        Returns:
+            Summary with document counts (``added``, ``updated``, ``removed``,
+            ``unchanged``), ``changes`` (the change log: dicts with ``op`` of 'added',
+            'updated' or 'removed', ``type`` of 'document' or 'segment', ``id`` and
+            ``document_id``), ``failed`` ({document_id: error}) and ``elapsed`` seconds.
+        """
+        started = time.monotonic()
+        snapshot = self._snapshot()
+        summary = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'changes': [], 'failed': {}}
+        listed = set()
+        log = open(changelog, 'a', encoding='utf-8') if changelog else None
+        
+        def record(changes: List[Dict[str, Any]]) -> None:
+            # Log changes as soon as they are committed, so a walk that fails partway still reports them
+            summary['changes'].extend(changes)
+            if log is not None and changes:
+                now = time.time()
+                log.writelines(json.dumps(dict(change, at=now)) + '\n' for change in changes)
+                log.flush()
+        
+        def changed_documents() -> Iterator[Dict[str, Any]]:
+            for document in self.documents.iter_documents(self.dataset_id):
+                listed.add(document['id'])
+                stored = snapshot.get(document['id'])
+                if stored is None or stored[:2] != _version(document):
+                    yield document
+                elif stored[2] != _dump(document):
+                    record(self._apply_document(document, None))
+                    summary['updated'] += 1
+                else:
+                    summary['unchanged'] += 1
+        
+        try:
+            for document, fetched, error in self._fetch_all(changed_documents()):
+                if error is not None:
+                    summary['failed'][document['id']] = str(error)
+                    continue
+                record(self._apply_document(document, fetched))
+                summary['added' if document['id'] not in snapshot else 'updated'] += 1
+            
+            removed = set(snapshot) - listed
+            record(self._remove_documents(removed))
+            summary['removed'] = len(removed)
+        finally:
+            if log is not None:
+                log.close()
+        self._set_meta('pulled_at', str(time.time()))
+        
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+    
+    def _fetch_all(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Any, Any]]:
+        """Fetch segments of many documents concurrently, yielding (document, segments, error)."""
+        executor = ContextThreadPoolExecutor(max_workers=max(self.workers, 1))
+        pending = {}
+        try:
+            for document in documents:
+                pending[executor.submit(self._fetch_document, document)] = document
+                # Bound the segments held in memory to a couple of documents per worker
+                while len(pending) >= self.workers * 2:
+                    yield from self._collect(pending)
+            while pending:
+                yield from self._collect(pending)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _collect(pending: Dict[Any, Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Any, Any]]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            document = pending.pop(future)
+            try:
+                yield document, future.result(), None
+            except APIError as e:
+                yield document, None, e
+    
+    def _fetch_document(self, document: Dict[str, Any]) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Fetch a document's segments, each paired with its child chunks."""
+        hierarchical = self.child_chunks and document.get('doc_form') == 'hierarchical_model'
+        fetched = []
+        for segment in self.segments.iter_segments(self.dataset_id, document['id']):
+            children = segment.get('child_chunks')
+            if children is None and hierarchical:
+                children = list(self.segments.iter_child_chunks(self.dataset_id, document['id'], segment['id']))
+            fetched.append((segment, children or []))
+        return fetched
+    
+    def _snapshot(self) -> Dict[str, Tuple[Any, Any, str]]:
+        """Map every stored document to its (updated_at, word_count, data)."""
+        with self._lock:
+            rows = self._conn.execute('SELECT id, updated_at, word_count, data FROM documents').fetchall()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+    
+    def _apply_document(self, document: Dict[str, Any],
+                        fetched: Optional[List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]]) -> List[Dict[str, Any]]:
+        """Store a document and diff its segments against the stored ones, in one transaction.
+        
+        With ``fetched`` None only the document row is updated. Returns the changes made.
+        """
+        document_id = document['id']
+        changes = []
+        with self._lock, self._conn:
+            exists = self._conn.execute('SELECT data FROM documents WHERE id = ?', (document_id,)).fetchone()
+            updated_at, word_count = _version(document)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                (document_id, document.get('name'), updated_at, word_count, _dump(document), time.time())
+            )
+            changes.append(_change('updated' if exists else 'added', 'document', document_id, document_id))
+            searchable = _searchable(document)
+            if exists and _searchable(json.loads(exists[0])) != searchable:
+                # Enabling, disabling or archiving a document does not touch its segments
+                self._reindex_document(document_id, searchable)
+            if fetched is None:
+                return changes
+            
+            stored = dict(self._conn.execute('SELECT id, hash FROM segments WHERE document_id = ?', (document_id,)))
+            for segment, children in fetched:
+                digest = segment_hash(segment, children)
+                previous = stored.pop(segment['id'], None)
+                if previous == digest:
+                    continue
+                if previous is not None:
+                    self._drop_segments([segment['id']])
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?)',
+                    (segment['id'], document_id, segment.get('position'), digest, _dump(segment))
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO child_chunks VALUES (?, ?, ?, ?)',
+                    [(chunk['id'], segment['id'], chunk.get('position'), _dump(chunk)) for chunk in children]
+                )
+                if searchable and _searchable(document, segment):
+                    self.index.add(self._conn, segment['id'], _fields(segment, children))
+                changes.append(_change('updated' if previous else 'added', 'segment', segment['id'], document_id))
+            
+            self._drop_segments(list(stored))
+            changes.extend(_change('removed', 'segment', segment_id, document_id) for segment_id in stored)
+        return changes
+    
+    def _reindex_document(self, document_id: str, searchable: bool) -> None:
+        """Rebuild the index entries of a document's stored segments. Caller holds the lock."""
+        rows = self._conn.execute('SELECT id, data FROM segments WHERE document_id = ?', (document_id,)).fetchall()
+        self.index.remove(self._conn, [row[0] for row in rows])
+        if not searchable:
+            return
+        for segment_id, data in rows:
+            segment = json.loads(data)
+            if segment.get('enabled') is False:
+                continue
+            children = [json.loads(row[0]) for row in self._conn.execute(
+                'SELECT data FROM child_chunks WHERE segment_id = ? ORDER BY position', (segment_id,)
+            )]
+            self.index.add(self._conn, segment_id, _fields(segment, children))
+    
+    def _drop_segments(self, segment_ids: List[str]) -> None:
+        """Delete segments with their child chunks and index entries. Caller holds the lock."""
+        params = [(i,) for i in segment_ids]
+        self.index.remove(self._conn, segment_ids)
+        self._conn.executemany('DELETE FROM child_chunks WHERE segment_id = ?', params)
+        self._conn.executemany('DELETE FROM segments WHERE id = ?', params)
+    
+    def _remove_documents(self, document_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Delete documents and everything under them. Returns the changes made."""
+        changes = []
+        with self._lock, self._conn:
+            for document_id in document_ids:
+                segment_ids = [row[0] for row in self._conn.execute(
+                    'SELECT id FROM segments WHERE document_id = ?', (document_id,)
+                )]
+                self._drop_segments(segment_ids)
+                self._conn.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+                changes.extend(_change('removed', 'segment', segment_id, document_id) for segment_id in segment_ids)
+                changes.append(_change('removed', 'document', document_id, document_id))
+        return changes
+    
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO mirror VALUES (?, ?)', (key, value))
+    
+    def keyword_search(self, query: str, top_k: int = 10,
+                       score_threshold: Optional[float] = None) -> Dict[str, Any]:
+        """Match query words against segment keywords. Same shape as ``retrieve_chunks``."""
+        return self._search(query, 'keyword_search', top_k, score_threshold)
+    
+    def full_text_search(self, query: str, top_k: int = 10,
+                         score_threshold: Optional[float] = None) -> Dict[str, Any]:
+        """Match query words against segment content, answers and child chunks, ranked by BM25.
+        
+        Returns the same shape as ``retrieve_chunks``.
+        """
+        return self._search(query, 'full_text_search', top_k, score_threshold)
+    
+    def retrieve_chunks(self, query: str, retrieval_model: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Answer a ``retrieve_chunks`` call locally.
+        
+        Honours ``search_method`` ('keyword_search' or 'full_text_search', the
+        default), ``top_k`` and ``score_threshold`` of the retrieval model.
+        """
+        retrieval_model = retrieval_model or {}
+        method = retrieval_model.get('search_method') or 'full_text_search'
+        if method not in SEARCH_FIELDS:
+            raise ValueError(f"Local search method must be one of {', '.join(SEARCH_FIELDS)}")
+        threshold = retrieval_model.get('score_threshold') if retrieval_model.get('score_threshold_enabled') else None
+        return self._search(query, method, retrieval_model.get('top_k') or 10, threshold)
+    
+    def _search(self, query: str, method: str, top_k: int, score_threshold: Optional[float]) -> Dict[str, Any]:
+        terms = tokenize(query)
+        records = []
+        if terms:
+            with self._lock:
+                hits = self.index.search(self._conn, terms, SEARCH_FIELDS[method], top_k)
+                for segment_id, rank in hits:
+                    # Squash the unbounded BM25 rank into 0..1; both index backends score alike
+                    score = rank / (1.0 + rank)
+                    if score_threshold is not None and score < score_threshold:
+                        break
+                    records.append(self._record(segment_id, score))
+        return {'query': {'content': query}, 'records': records}
+    
+    def _record(self, segment_id: str, score: float) -> Dict[str, Any]:
+        """Build a retrieval record for a segment. Caller holds the lock."""
+        segment_data, document_data = self._conn.execute(
+            'SELECT s.data, d.data FROM segments s JOIN documents d ON d.id = s.document_id WHERE s.id = ?',
+            (segment_id,)
+        ).fetchone()
+        segment = json.loads(segment_data)
+        document = json.loads(document_data)
+        segment['document'] = {
+            'id': document['id'],
+            'data_source_type': document.get('data_source_type'),
+            'name': document.get('name')
+        }
+        record = {'segment': segment, 'score': score, 'tsne_position': None}
+        
+        children = [json.loads(row[0]) for row in self._conn.execute(
+            'SELECT data FROM child_chunks WHERE segment_id = ? ORDER BY position', (segment_id,)
+        )]
+        if children:
+            record['child_chunks'] = children
+        return record
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get document, segment and child chunk counts, the index backend and the last pull time."""
+        with self._lock:
+            counts = {table: self._conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('documents', 'segments', 'child_chunks')}
+            row = self._conn.execute("SELECT value FROM mirror WHERE key = 'pulled_at'").fetchone()
+        counts['index'] = self.index.name
+        counts['pulled_at'] = float(row[0]) if row else None
+        return counts
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self) -> 'LocalMirror':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,1283 @@
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+from .api_client import endpoint_template
+from .mirror import BM25_B, BM25_K1, SEARCH_FIELDS, tokenize
+
+# Bytes of an uploaded file kept as document text; the rest is only counted
+MAX_FILE_TEXT = 1024 * 1024
+
+# Words per segment when a process rule does not say otherwise
+DEFAULT_MAX_TOKENS = 500
+
+# Words per child chunk for hierarchical documents
+DEFAULT_CHILD_MAX_TOKENS = 200
+
+# Largest page size the list endpoints accept, as in Dify
+MAX_LIMIT = 100
+
+# Bytes read from the socket at a time when parsing uploads
+_READ_SIZE = 64 * 1024
+
+# Error code sent with each injected or HTTP-level error status
+ERROR_CODES = {
+    400: 'invalid_param',
+    401: 'unauthorized',
+    404: 'not_found',
+    405: 'method_not_allowed',
+    409: 'conflict',
+    429: 'too_many_requests',
+    500: 'internal_server_error',
+    502: 'bad_gateway',
+    503: 'service_unavailable',
+    504: 'gateway_timeout'
+}
+
+# Account shown as the creator of every resource
+MOCK_USER = 'mock-user'
+
+# Retrieval settings of a new dataset
+DEFAULT_RETRIEVAL_MODEL = {
+    'search_method': 'semantic_search',
+    'reranking_enable': False,
+    'reranking_mode': None,
+    'reranking_model': {'reranking_provider_name': '', 'reranking_model_name': ''},
+    'weights': None,
+    'top_k': 2,
+    'score_threshold_enabled': False,
+    'score_threshold': None
+}
+
+# Handler method per (HTTP method, endpoint template)
+ROUTES = {
+    ('GET', '/datasets'): '_list_datasets',
+    ('POST', '/datasets'): '_create_dataset',
+    ('GET', '/datasets/{dataset_id}'): '_get_dataset',
+    ('PATCH', '/datasets/{dataset_id}'): '_update_dataset',
+    ('DELETE', '/datasets/{dataset_id}'): '_delete_dataset',
+    ('GET', '/workspaces/current/models/model-types/text-embedding'): '_embedding_models',
+    ('GET', '/datasets/{dataset_id}/documents'): '_list_documents',
+    ('POST', '/datasets/{dataset_id}/document/create-by-text'): '_create_by_text',
+    ('POST', '/datasets/{dataset_id}/document/create-by-file'): '_create_by_file',
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/update-by-text'): '_update_by_text',
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/update-by-file'): '_update_by_file',
+    ('DELETE', '/datasets/{dataset_id}/documents/{document_id}'): '_delete_document',
+    ('GET', '/datasets/{dataset_id}/documents/{batch}/indexing-status'): '_indexing_status',
+    ('GET', '/datasets/{dataset_id}/documents/{document_id}/upload-file'): '_upload_file',
+    ('POST', '/datasets/{dataset_id}/documents/metadata'): '_update_documents_metadata',
+    ('GET', '/datasets/{dataset_id}/documents/{document_id}/segments'): '_list_segments',
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/segments'): '_add_segments',
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}'): '_update_segment',
+    ('DELETE', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}'): '_delete_segment',
+    ('GET', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks'): '_list_child_chunks',
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks'): '_create_child_chunk',
+    ('PATCH', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks/{child_chunk_id}'):
+        '_update_child_chunk',
+    ('DELETE', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks/{child_chunk_id}'):
+        '_delete_child_chunk',
+    ('POST', '/datasets/{dataset_id}/retrieve'): '_retrieve',
+    ('GET', '/datasets/{dataset_id}/metadata'): '_list_metadata',
+    ('POST', '/datasets/{dataset_id}/metadata'): '_create_metadata',
+    ('PATCH', '/datasets/{dataset_id}/metadata/{metadata_id}'): '_update_metadata',
+    ('DELETE', '/datasets/{dataset_id}/metadata/{metadata_id}'): '_delete_metadata',
+    ('POST', '/datasets/{dataset_id}/metadata/built-in/enable'): '_enable_builtin_metadata',
+    ('POST', '/datasets/{dataset_id}/metadata/built-in/disable'): '_disable_builtin_metadata'
+}
+
+
+class MockError(Exception):
+    """An error response, raised by request handlers."""
+    
+    def __init__(self, status: int, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.code = code or ERROR_CODES.get(status, 'error')
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+def _tokens(text: str) -> int:
+    # Roughly what a BPE tokenizer makes of English text
+    return math.ceil(_word_count(text) * 4 / 3)
+
+
+def split_text(text: str, separator: str = '\n\n', max_tokens: int = DEFAULT_MAX_TOKENS) -> List[str]:
+    """Split text into chunks the way a segmentation rule does.
+    
+    The text is cut at ``separator`` and the pieces are packed into chunks of at
+    most ``max_tokens`` words. A piece longer than that is cut into word windows.
+    """
+    chunks, current, count = [], [], 0
+    for piece in text.split(separator):
+        words = piece.split()
+        if not words:
+            continue
+        if len(words) > max_tokens:
+            if current:
+                chunks.append(separator.join(current))
+                current, count = [], 0
+            chunks.extend(' '.join(words[i:i + max_tokens]) for i in range(0, len(words), max_tokens))
+            continue
+        if current and count + len(words) > max_tokens:
+            chunks.append(separator.join(current))
+            current, count = [], 0
+        current.append(piece.strip())
+        count += len(words)
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def _rule_separator(segmentation: Optional[Dict[str, Any]], default: str) -> Tuple[str, int]:
+    segmentation = segmentation or {}
+    separator = (segmentation.get('separator') or default).replace('\\n', '\n')
+    return separator, int(segmentation.get('max_tokens') or 0)
+
+
+class _LexicalIndex:
+    """BM25 index over the enabled segments of one dataset, rebuilt when they change."""
+    
+    def __init__(self, segments: Iterable[Tuple[Dict[str, Any], List[Dict[str, Any]]]]):
+        self.postings = {field: {} for field in SEARCH_FIELDS.values()}
+        self.lengths = {field: {} for field in SEARCH_FIELDS.values()}
+        
+        for segment, children in segments:
+            text = [segment.get('content') or '', segment.get('answer') or '']
+            text.extend(chunk['content'] for chunk in children)
+            fields = {'content': '\n'.join(text), 'keywords': ' '.join(segment.get('keywords') or [])}
+            for field, value in fields.items():
+                terms = tokenize(value)
+                self.lengths[field][segment['id']] = len(terms)
+                for term in terms:
+                    postings = self.postings[field].setdefault(term, {})
+                    postings[segment['id']] = postings.get(segment['id'], 0) + 1
+    
+    def search(self, query: str, field: str) -> List[Tuple[str, float]]:
+        """Get (segment id, BM25 score) pairs matching ``query``, best first."""
+        lengths = self.lengths[field]
+        if not lengths:
+            return []
+        average = sum(lengths.values()) / len(lengths)
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings[field].get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(lengths) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for segment_id, tf in postings.items():
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[segment_id] / (average or 1))
+                scores[segment_id] = scores.get(segment_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class _ChunkedReader:
+    """File-like view of a chunked transfer-encoded request body."""
+    
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self.left = 0
+        self.done = False
+    
+    def read(self, size: int) -> bytes:
+        if self.done:
+            return b''
+        if self.left == 0:
+            self.left = int(self.stream.readline().split(b';', 1)[0].strip() or b'0', 16)
+            if self.left == 0:
+                # Skip trailers up to the blank line that ends the body
+                while self.stream.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                self.done = True
+                return b''
+        data = self.stream.read(min(size, self.left))
+        self.left -= len(data)
+        if self.left == 0:
+            self.stream.readline()
+        return data
+
+
+class _BoundedReader:
+    """File-like view of a Content-Length delimited request body."""
+    
+    def __init__(self, stream: Any, length: int):
+        self.stream = stream
+        self.left = length
+    
+    def read(self, size: int) -> bytes:
+        if self.left <= 0:
+            return b''
+        data = self.stream.read(min(size, self.left))
+        self.left -= len(data)
+        return data
+
+
+def parse_multipart(read: Callable[[int], bytes], boundary: bytes,
+                    keep: int = MAX_FILE_TEXT) -> Dict[str, Dict[str, Any]]:
+    """Parse a multipart/form-data body incrementally.
+    
+    Only the first ``keep`` bytes of each part are held in memory, so a
+    multi-gigabyte upload costs a fixed amount of memory.
+    
+    Returns:
+        Parts by field name, each with ``filename``, ``size`` and ``data`` (bytes).
+    """
+    delimiter = b'\r\n--' + boundary
+    # A leading CRLF lets the first boundary match the same delimiter as the others
+    buffer = b'\r\n'
+    parts, current, state = {}, None, 'preamble'
+    eof = False
+    
+    def append(part: Optional[Dict[str, Any]], data: bytes) -> None:
+        if part is None or not data:
+            return
+        part['size'] += len(data)
+        room = keep - len(part['data'])
+        if room > 0:
+            part['data'] += data[:room]
+    
+    while True:
+        if state in ('preamble', 'body'):
+            index = buffer.find(delimiter)
+            if index >= 0:
+                append(current, buffer[:index])
+                buffer = buffer[index + len(delimiter):]
+                current, state = None, 'delimiter'
+                continue
+            # Keep a possible partial delimiter at the end for the next read
+            cut = max(len(buffer) - len(delimiter), 0)
+            append(current, buffer[:cut])
+            buffer = buffer[cut:]
+        elif state == 'delimiter':
+            if buffer.startswith(b'--'):
+                break
+            if buffer.startswith(b'\r\n'):
+                buffer, state = buffer[2:], 'headers'
+                continue
+            if len(buffer) >= 2:
+                raise MockError(400, 'Malformed multipart body')
+        elif state == 'headers':
+            index = buffer.find(b'\r\n\r\n')
+            if index >= 0:
+                headers = {}
+                for line in buffer[:index].decode('utf-8', 'replace').split('\r\n'):
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                buffer = buffer[index + 4:]
+                disposition = dict(
+                    (key.strip(), value.strip().strip('"'))
+                    for key, _, value in (item.partition('=') for item in headers.get('content-disposition', '').split(';'))
+                )
+                current = {'filename': disposition.get('filename'), 'size': 0, 'data': bytearray()}
+                parts[disposition.get('name', '')] = current
+                state = 'body'
+                continue
+        
+        if eof:
+            raise MockError(400, 'Multipart body ended early')
+        chunk = read(_READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+    
+    for part in parts.values():
+        part['data'] = bytes(part['data'])
+    return parts
+
+
+class MockDifyServer:
+    """In-process stand-in for the Dify Knowledge API, for tests and load testing.
+    
+    Implements every endpoint the managers call, keeping datasets, documents,
+    segments, child chunks and metadata in memory. Documents are split into
+    segments by their process rule, ``/retrieve`` ranks segments with BM25 over
+    their words whatever the search method, and indexing finishes after
+    ``indexing_delay`` seconds.
+    
+    Latency and failures can be injected, at a fixed rate or for the next few
+    requests (``fail_next``). With a ``seed`` the ids and injected faults repeat
+    from run to run.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, api_key: Optional[str] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 endpoint_latency: Optional[Dict[str, float]] = None,
+                 error_rate: float = 0.0, error_status: int = 503,
+                 throttle_rate: float = 0.0, retry_after: Optional[float] = 1.0,
+                 fault_endpoints: Optional[Iterable[str]] = None,
+                 indexing_delay: float = 0.0, seed: Optional[int] = None,
+                 verbose: bool = False):
+        """Initialize the server. Call ``start`` to begin serving.
+        
+        Args:
+            host: Interface to listen on.
+            port: Port to listen on. 0 picks a free one.
+            api_key: Bearer token to require. None accepts any.
+            latency: Seconds added to every response.
+            latency_jitter: Up to this many random extra seconds per response.
+            endpoint_latency: Seconds added per endpoint template instead of ``latency``,
+                e.g. ``{'POST /datasets/{dataset_id}/retrieve': 0.2}``.
+            error_rate: Fraction of requests answered with ``error_status``.
+            error_status: Status of injected errors, e.g. 500, 502 or 503.
+            throttle_rate: Fraction of requests answered with 429.
+            retry_after: Retry-After seconds sent with injected 429s. None omits the header.
+            fault_endpoints: Endpoint keys ("METHOD /template") that random faults apply
+                to. None applies them everywhere.
+            indexing_delay: Seconds a new or updated document spends indexing.
+            seed: Seed for ids and injected faults.
+            verbose: Log every request to stderr.
+        """
+        self.host = host
+        self.port = port
+        self.api_key = api_key
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.endpoint_latency = dict(endpoint_latency or {})
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.fault_endpoints = set(fault_endpoints) if fault_endpoints is not None else None
+        self.indexing_delay = indexing_delay
+        self.verbose = verbose
+        
+        self._lock = threading.RLock()
+        self._faults = random.Random(seed)
+        self._ids = random.Random(seed)
+        self._scheduled = []
+        self._httpd = None
+        self._thread = None
+        self.reset()
+    
+    @property
+    def base_url(self) -> str:
+        """API base URL to give the client, e.g. ``http://127.0.0.1:5001/v1``."""
+        return f'http://{self.host}:{self.port}/v1'
+    
+    def start(self) -> 'MockDifyServer':
+        """Start serving on a background thread."""
+        self._bind()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-dify', daemon=True)
+        self._thread.start()
+        return self
+    
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        self._bind()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+    
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def __enter__(self) -> 'MockDifyServer':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+    
+    def _bind(self) -> None:
+        self._httpd = _HTTPServer((self.host, self.port), _Handler)
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+    
+    def reset(self) -> None:
+        """Drop all data, scheduled faults and request counters."""
+        with self._lock:
+            self.datasets = {}
+            self.documents = {}
+            self.segments = {}
+            self.child_chunks = {}
+            self.metadata = {}
+            self.builtin_metadata = {}
+            self.batches = {}
+            self.upload_files = {}
+            self._indexing = {}
+            self._indexes = {}
+            self._versions = {}
+            self._scheduled = []
+            self._requests = {}
+            self._injected = {}
+    
+    def fail_next(self, count: int = 1, status: int = 503, endpoint: Optional[str] = None) -> None:
+        """Fail the next ``count`` requests, optionally only those to ``endpoint`` ("METHOD /template")."""
+        with self._lock:
+            self._scheduled.append([count, status, endpoint])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get request counts per endpoint and injected failures per status."""
+        with self._lock:
+            return {
+                'requests': dict(self._requests),
+                'total_requests': sum(self._requests.values()),
+                'injected': dict(self._injected)
+            }
+    
+    # Seeding helpers, for setting up data without going through HTTP
+    
+    def create_dataset(self, name: str, **fields: Any) -> Dict[str, Any]:
+        """Create a dataset directly and return it."""
+        with self._lock:
+            return self._new_dataset(dict(fields, name=name))
+    
+    def create_document(self, dataset_id: str, name: str, text: str,
+                        process_rule: Optional[Dict[str, Any]] = None,
+                        doc_form: Optional[str] = None) -> Dict[str, Any]:
+        """Create a document directly, already indexed, and return it."""
+        with self._lock:
+            self._dataset(dataset_id)
+            document, _ = self._new_document(dataset_id, name, text,
+                                             {'process_rule': process_rule, 'doc_form': doc_form})
+            self._indexing.pop(document['id'], None)
+            self._refresh_document(document)
+            return document
+    
+    # Request handling
+    
+    def handle(self, method: str, path: str, query: Dict[str, List[str]], headers: Any,
+               read_body: Callable[[], Any]) -> Tuple[int, Optional[bytes], Dict[str, str]]:
+        """Answer one request. Returns the status, the JSON body (None for 204) and extra headers."""
+        if path.startswith('/v1/'):
+            path = path[3:]
+        template = endpoint_template(path)
+        key = f'{method} {template}'
+        
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            fault = self._pick_fault(key)
+        
+        delay = self.endpoint_latency.get(key, self.latency)
+        if self.latency_jitter:
+            with self._lock:
+                delay += self._faults.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+        
+        try:
+            if self.api_key is not None and headers.get('Authorization') != f'Bearer {self.api_key}':
+                raise MockError(401, 'Access token is invalid')
+            if fault is not None:
+                # Drain the body so the connection can be reused
+                read_body()
+                raise MockError(fault, 'Injected failure')
+            
+            handler = ROUTES.get((method, template))
+            if handler is None:
+                known = any(route[1] == template for route in ROUTES)
+                raise MockError(405 if known else 404, f'No route for {key}')
+            
+            params = {name[1:-1]: value
+                      for name, value in zip(template.strip('/').split('/'), path.strip('/').split('/'))
+                      if name.startswith('{')}
+            body = read_body()
+            with self._lock:
+                payload = getattr(self, handler)(params, query, body)
+                if payload is None:
+                    return 204, None, {}
+                return 200, json.dumps(payload).encode('utf-8'), {}
+        
+        except MockError as e:
+            extra = {}
+            if e.status == 429 and self.retry_after is not None:
+                extra['Retry-After'] = str(self.retry_after)
+            body = {'code': e.code, 'message': e.message, 'status': e.status}
+            return e.status, json.dumps(body).encode('utf-8'), extra
+    
+    def _pick_fault(self, key: str) -> Optional[int]:
+        """Decide whether a request fails. Caller holds the lock."""
+        for entry in self._scheduled:
+            count, status, endpoint = entry
+            if endpoint is None or endpoint == key:
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    self._scheduled.remove(entry)
+                self._injected[status] = self._injected.get(status, 0) + 1
+                return status
+        
+        if self.fault_endpoints is not None and key not in self.fault_endpoints:
+            return None
+        roll = self._faults.random()
+        if roll < self.throttle_rate:
+            status = 429
+        elif roll < self.throttle_rate + self.error_rate:
+            status = self.error_status
+        else:
+            return None
+        self._injected[status] = self._injected.get(status, 0) + 1
+        return status
+    
+    # State helpers; callers hold the lock
+    
+    def _new_id(self) -> str:
+        return str(uuid.UUID(int=self._ids.getrandbits(128), version=4))
+    
+    def _dataset(self, dataset_id: str) -> Dict[str, Any]:
+        dataset = self.datasets.get(dataset_id)
+        if dataset is None:
+            raise MockError(404, 'Dataset not found')
+        return dataset
+    
+    def _document(self, dataset_id: str, document_id: str) -> Dict[str, Any]:
+        self._dataset(dataset_id)
+        document = self.documents[dataset_id].get(document_id)
+        if document is None:
+            raise MockError(404, 'Document not found')
+        return document
+    
+    def _segment(self, params: Dict[str, str]) -> Dict[str, Any]:
+        self._document(params['dataset_id'], params['document_id'])
+        segment = self.segments[params['document_id']].get(params['segment_id'])
+        if segment is None:
+            raise MockError(404, 'Segment not found')
+        return segment
+    
+    def _touch(self, dataset_id: str, document: Optional[Dict[str, Any]] = None) -> None:
+        """Record that a dataset's segments changed, refreshing the document's counters."""
+        self._versions[dataset_id] = self._versions.get(dataset_id, 0) + 1
+        if document is not None:
+            segments = self.segments[document['id']].values()
+            document['word_count'] = sum(segment['word_count'] for segment in segments)
+            document['tokens'] = sum(segment['tokens'] for segment in segments)
+            document['updated_at'] = int(time.time())
+    
+    def _new_dataset(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        name = (data.get('name') or '').strip()
+        if not name:
+            raise MockError(400, 'name is required')
+        if any(dataset['name'] == name for dataset in self.datasets.values()):
+            raise MockError(409, 'Dataset name already exists', 'dataset_name_duplicate')
+        
+        now = int(time.time())
+        dataset = {
+            'id': self._new_id(),
+            'name': name,
+            'description': data.get('description'),
+            'provider': data.get('provider', 'vendor'),
+            'permission': data.get('permission', 'only_me'),
+            'data_source_type': None,
+            'indexing_technique': data.get('indexing_technique'),
+            'app_count': 0,
+            'document_count': 0,
+            'word_count': 0,
+            'created_by': MOCK_USER,
+            'created_at': now,
+            'updated_by': MOCK_USER,
+            'updated_at': now,
+            'embedding_model': data.get('embedding_model'),
+            'embedding_model_provider': data.get('embedding_model_provider'),
+            'embedding_available': True,
+            'retrieval_model_dict': dict(data.get('retrieval_model') or DEFAULT_RETRIEVAL_MODEL),
+            'tags': [],
+            'doc_form': None
+        }
+        self.datasets[dataset['id']] = dataset
+        self.documents[dataset['id']] = {}
+        self.metadata[dataset['id']] = {}
+        self.builtin_metadata[dataset['id']] = False
+        return dataset
+    
+    def _refresh_dataset(self, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        documents = self.documents[dataset['id']].values()
+        dataset['document_count'] = len(documents)
+        dataset['word_count'] = sum(document['word_count'] for document in documents)
+        return dataset
+    
+    def _refresh_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a document to 'completed' once its indexing time has passed."""
+        started = self._indexing.get(document['id'])
+        if started is not None and time.monotonic() - started < self.indexing_delay:
+            document['indexing_status'] = 'indexing'
+            document['display_status'] = 'indexing'
+        else:
+            self._indexing.pop(document['id'], None)
+            if document['indexing_status'] != 'completed':
+                document['indexing_status'] = 'completed'
+                document['display_status'] = 'available'
+                document['completed_at'] = int(time.time())
+        return document
+    
+    def _new_document(self, dataset_id: str, name: str, text: str,
+                      data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        dataset = self.datasets[dataset_id]
+        if dataset['indexing_technique'] is None and data.get('indexing_technique'):
+            dataset['indexing_technique'] = data['indexing_technique']
+        
+        now = int(time.time())
+        documents = self.documents[dataset_id]
+        document = {
+            'id': self._new_id(),
+            'position': len(documents) + 1,
+            'data_source_type': 'upload_file',
+            'data_source_info': None,
+            'dataset_process_rule_id': None,
+            'name': name,
+            'created_from': 'api',
+            'created_by': MOCK_USER,
+            'created_at': now,
+            'updated_at': now,
+            'tokens': 0,
+            'indexing_status': 'waiting',
+            'completed_at': None,
+            'error': None,
+            'enabled': True,
+            'disabled_at': None,
+            'disabled_by': None,
+            'archived': False,
+            'display_status': 'queuing',
+            'word_count': 0,
+            'hit_count': 0,
+            'doc_form': data.get('doc_form') or dataset.get('doc_form') or 'text_model',
+            'doc_language': data.get('doc_language'),
+            'doc_metadata': []
+        }
+        documents[document['id']] = document
+        self.segments[document['id']] = {}
+        batch = self._write_text(dataset_id, document, text, data.get('process_rule'))
+        return document, batch
+    
+    def _write_text(self, dataset_id: str, document: Dict[str, Any], text: str,
+                    process_rule: Optional[Dict[str, Any]]) -> str:
+        """Replace a document's segments with ``text`` split by its process rule, and start indexing it."""
+        process_rule = process_rule or {'mode': 'automatic'}
+        rules = process_rule.get('rules') or {}
+        hierarchical = process_rule.get('mode') == 'hierarchical' or document['doc_form'] == 'hierarchical_model'
+        if hierarchical:
+            document['doc_form'] = 'hierarchical_model'
+        
+        separator, max_tokens = _rule_separator(rules.get('segmentation'), '\n\n')
+        child_separator, child_max_tokens = _rule_separator(rules.get('subchunk_segmentation'), '\n')
+        
+        for segment_id in self.segments[document['id']]:
+            self.child_chunks.pop(segment_id, None)
+        self.segments[document['id']] = {}
+        
+        for content in split_text(text, separator, max_tokens or DEFAULT_MAX_TOKENS):
+            segment = self._new_segment(document, {'content': content})
+            if hierarchical:
+                for child in split_text(content, child_separator, child_max_tokens or DEFAULT_CHILD_MAX_TOKENS):
+                    self._new_child_chunk(segment, child)
+        
+        batch = self._new_id().replace('-', '')
+        self.batches.setdefault(batch, []).append((dataset_id, document['id']))
+        document['indexing_status'] = 'indexing'
+        document['completed_at'] = None
+        self._indexing[document['id']] = time.monotonic()
+        self._touch(dataset_id, document)
+        self._refresh_document(document)
+        return batch
+    
+    def _new_segment(self, document: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+        content = data.get('content')
+        if not isinstance(content, str) or not content.strip():
+            raise MockError(400, 'Segment content is required')
+        
+        segments = self.segments[document['id']]
+        now = int(time.time())
+        segment = {
+            'id': self._new_id(),
+            'position': max((s['position'] for s in segments.values()), default=0) + 1,
+            'document_id': document['id'],
+            'content': content,
+            'answer': data.get('answer'),
+            'word_count': 0,
+            'tokens': 0,
+            'keywords': list(data.get('keywords') or []),
+            'index_node_id': self._new_id(),
+            'index_node_hash': None,
+            'hit_count': 0,
+            'enabled': True,
+            'disabled_at': None,
+            'disabled_by': None,
+            'status': 'completed',
+            'created_by': MOCK_USER,
+            'created_at': now,
+            'indexing_at': now,
+            'completed_at': now,
+            'error': None,
+            'stopped_at': None
+        }
+        self._count_words(segment)
+        segments[segment['id']] = segment
+        self.child_chunks[segment['id']] = {}
+        return segment
+    
+    @staticmethod
+    def _count_words(item: Dict[str, Any]) -> None:
+        text = (item.get('content') or '') + ' ' + (item.get('answer') or '')
+        item['word_count'] = _word_count(text)
+        item['tokens'] = _tokens(text)
+    
+    def _new_child_chunk(self, segment: Dict[str, Any], content: str) -> Dict[str, Any]:
+        if not isinstance(content, str) or not content.strip():
+            raise MockError(400, 'Child chunk content is required')
+        chunks = self.child_chunks[segment['id']]
+        now = int(time.time())
+        chunk = {
+            'id': self._new_id(),
+            'segment_id': segment['id'],
+            'content': content,
+            'position': max((c['position'] for c in chunks.values()), default=0) + 1,
+            'word_count': _word_count(content),
+            'tokens': _tokens(content),
+            'index_node_id': self._new_id(),
+            'index_node_hash': None,
+            'status': 'completed',
+            'created_by': MOCK_USER,
+            'created_at': now,
+            'indexing_at': now,
+            'completed_at': now,
+            'error': None,
+            'stopped_at': None
+        }
+        chunks[chunk['id']] = chunk
+        return chunk
+    
+    @staticmethod
+    def _page(items: List[Dict[str, Any]], query: Dict[str, List[str]]) -> Dict[str, Any]:
+        try:
+            page = max(int(query.get('page', ['1'])[0]), 1)
+            limit = min(max(int(query.get('limit', ['20'])[0]), 1), MAX_LIMIT)
+        except ValueError:
+            raise MockError(400, 'page and limit must be integers')
+        start = (page - 1) * limit
+        return {
+            'data': items[start:start + limit],
+            'has_more': start + limit < len(items),
+            'limit': limit,
+            'total': len(items),
+            'page': page
+        }
+    
+    @staticmethod
+    def _keyword(query: Dict[str, List[str]]) -> Optional[str]:
+        keyword = query.get('keyword', [''])[0].strip().lower()
+        return keyword or None
+    
+    @staticmethod
+    def _json(body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict):
+            raise MockError(400, 'Expected a JSON object body')
+        return body
+    
+    def _upload_fields(self, body: Any) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+        """Split a multipart upload into its data JSON, the file's text and the file record."""
+        if not isinstance(body, dict) or 'file' not in body:
+            raise MockError(400, 'Expected a multipart body with a file part', 'no_file_uploaded')
+        try:
+            data = json.loads(body['data']['data'].decode('utf-8')) if 'data' in body else {}
+        except ValueError:
+            raise MockError(400, 'data part is not valid JSON')
+        
+        upload = body['file']
+        name = upload['filename'] or 'upload'
+        record = {
+            'id': self._new_id(),
+            'name': name,
+            'size': upload['size'],
+            'extension': name.rsplit('.', 1)[-1] if '.' in name else '',
+            'url': None,
+            'download_url': None,
+            'mime_type': 'application/octet-stream',
+            'created_by': MOCK_USER,
+            'created_at': int(time.time())
+        }
+        return data, upload['data'].decode('utf-8', 'replace'), record
+    
+    # Datasets
+    
+    def _list_datasets(self, params, query, body):
+        datasets = sorted(self.datasets.values(), key=lambda dataset: -dataset['created_at'])
+        keyword = self._keyword(query)
+        if keyword:
+            datasets = [dataset for dataset in datasets if keyword in dataset['name'].lower()]
+        return self._page([self._refresh_dataset(dataset) for dataset in datasets], query)
+    
+    def _create_dataset(self, params, query, body):
+        return self._new_dataset(self._json(body))
+    
+    def _get_dataset(self, params, query, body):
+        return self._refresh_dataset(self._dataset(params['dataset_id']))
+    
+    def _update_dataset(self, params, query, body):
+        dataset = self._dataset(params['dataset_id'])
+        for field, value in self._json(body).items():
+            if field == 'retrieval_model':
+                dataset['retrieval_model_dict'] = value
+            elif field in dataset or field == 'partial_member_list':
+                dataset[field] = value
+        dataset['updated_at'] = int(time.time())
+        return self._refresh_dataset(dataset)
+    
+    def _delete_dataset(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        for document_id in self.documents.pop(params['dataset_id']):
+            for segment_id in self.segments.pop(document_id):
+                self.child_chunks.pop(segment_id, None)
+            self.upload_files.pop(document_id, None)
+        del self.datasets[params['dataset_id']]
+        self.metadata.pop(params['dataset_id'], None)
+        self._indexes.pop(params['dataset_id'], None)
+        return None
+    
+    def _embedding_models(self, params, query, body):
+        return {'data': [{
+            'provider': 'mock',
+            'label': {'en_US': 'Mock', 'zh_Hans': 'Mock'},
+            'icon_small': None,
+            'icon_large': None,
+            'status': 'active',
+            'models': [{
+                'model': 'mock-embedding',
+                'label': {'en_US': 'mock-embedding', 'zh_Hans': 'mock-embedding'},
+                'model_type': 'text-embedding',
+                'features': None,
+                'fetch_from': 'predefined-model',
+                'model_properties': {'context_size': 8192},
+                'deprecated': False,
+                'status': 'active',
+                'load_balancing_enabled': False
+            }]
+        }]}
+    
+    # Documents
+    
+    def _list_documents(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        documents = list(self.documents[params['dataset_id']].values())
+        keyword = self._keyword(query)
+        if keyword:
+            documents = [document for document in documents if keyword in document['name'].lower()]
+        return self._page([self._refresh_document(document) for document in documents], query)
+    
+    def _create_by_text(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        data = self._json(body)
+        if not data.get('name') or not isinstance(data.get('text'), str):
+            raise MockError(400, 'name and text are required')
+        document, batch = self._new_document(params['dataset_id'], data['name'], data['text'], data)
+        return {'document': document, 'batch': batch}
+    
+    def _create_by_file(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        data, text, record = self._upload_fields(body)
+        original = data.get('original_document_id')
+        if original:
+            document = self._document(params['dataset_id'], original)
+            batch = self._write_text(params['dataset_id'], document, text, data.get('process_rule'))
+        else:
+            document, batch = self._new_document(params['dataset_id'], record['name'], text, data)
+        document['data_source_info'] = {'upload_file_id': record['id']}
+        self.upload_files[document['id']] = record
+        return {'document': document, 'batch': batch}
+    
+    def _update_by_text(self, params, query, body):
+        document = self._document(params['dataset_id'], params['document_id'])
+        data = self._json(body)
+        if data.get('name'):
+            document['name'] = data['name']
+        batch = None
+        if data.get('text'):
+            batch = self._write_text(params['dataset_id'], document, data['text'], data.get('process_rule'))
+        return {'document': self._refresh_document(document), 'batch': batch}
+    
+    def _update_by_file(self, params, query, body):
+        document = self._document(params['dataset_id'], params['document_id'])
+        data, text, record = self._upload_fields(body)
+        if data.get('name'):
+            document['name'] = data['name']
+        batch = self._write_text(params['dataset_id'], document, text, data.get('process_rule'))
+        document['data_source_info'] = {'upload_file_id': record['id']}
+        self.upload_files[document['id']] = record
+        return {'document': document, 'batch': batch}
+    
+    def _delete_document(self, params, query, body):
+        self._document(params['dataset_id'], params['document_id'])
+        del self.documents[params['dataset_id']][params['document_id']]
+        for segment_id in self.segments.pop(params['document_id']):
+            self.child_chunks.pop(segment_id, None)
+        self.upload_files.pop(params['document_id'], None)
+        self._touch(params['dataset_id'])
+        return {'result': 'success'}
+    
+    def _indexing_status(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        entries = self.batches.get(params['batch'])
+        if not entries:
+            raise MockError(404, 'Batch not found')
+        
+        statuses = []
+        for dataset_id, document_id in entries:
+            document = self.documents.get(dataset_id, {}).get(document_id)
+            if document is None:
+                continue
+            self._refresh_document(document)
+            total = len(self.segments[document_id])
+            started = self._indexing.get(document_id)
+            if started is None:
+                completed = total
+            else:
+                completed = int(total * (time.monotonic() - started) / self.indexing_delay)
+            statuses.append({
+                'id': document_id,
+                'indexing_status': document['indexing_status'],
+                'processing_started_at': document['updated_at'],
+                'parsing_completed_at': document['updated_at'],
+                'cleaning_completed_at': document['updated_at'],
+                'splitting_completed_at': document['updated_at'],
+                'completed_at': document['completed_at'],
+                'paused_at': None,
+                'error': None,
+                'stopped_at': None,
+                'completed_segments': completed,
+                'total_segments': total
+            })
+        return {'data': statuses}
+    
+    def _upload_file(self, params, query, body):
+        self._document(params['dataset_id'], params['document_id'])
+        record = self.upload_files.get(params['document_id'])
+        if record is None:
+            raise MockError(404, 'Document has no uploaded file')
+        return record
+    
+    def _update_documents_metadata(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        for operation in self._json(body).get('operation_data') or []:
+            document = self._document(params['dataset_id'], operation.get('document_id'))
+            document['doc_metadata'] = list(operation.get('metadata_list') or [])
+        return {'result': 'success'}
+    
+    # Segments
+    
+    def _list_segments(self, params, query, body):
+        self._document(params['dataset_id'], params['document_id'])
+        segments = sorted(self.segments[params['document_id']].values(), key=lambda segment: segment['position'])
+        keyword = self._keyword(query)
+        if keyword:
+            segments = [segment for segment in segments if keyword in segment['content'].lower()]
+        status = query.get('status', [None])[0]
+        if status:
+            segments = [segment for segment in segments if segment['status'] == status]
+        response = self._page(segments, query)
+        response['doc_form'] = self.documents[params['dataset_id']][params['document_id']]['doc_form']
+        return response
+    
+    def _add_segments(self, params, query, body):
+        document = self._document(params['dataset_id'], params['document_id'])
+        items = self._json(body).get('segments')
+        if not isinstance(items, list) or not items:
+            raise MockError(400, 'segments must be a non-empty list')
+        # Validate everything first so a bad item does not leave a partial insert
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get('content'), str) or not item['content'].strip():
+                raise MockError(400, 'Segment content is required')
+        created = [self._new_segment(document, item) for item in items]
+        self._touch(params['dataset_id'], document)
+        return {'data': created, 'doc_form': document['doc_form']}
+    
+    def _update_segment(self, params, query, body):
+        segment = self._segment(params)
+        document = self.documents[params['dataset_id']][params['document_id']]
+        changes = self._json(body).get('segment')
+        if not isinstance(changes, dict):
+            raise MockError(400, 'segment is required')
+        
+        for field in ('content', 'answer', 'keywords', 'enabled'):
+            if field in changes:
+                segment[field] = changes[field]
+        segment['disabled_at'] = None if segment['enabled'] else int(time.time())
+        segment['disabled_by'] = None if segment['enabled'] else MOCK_USER
+        self._count_words(segment)
+        
+        if changes.get('regenerate_child_chunks') and document['doc_form'] == 'hierarchical_model':
+            self.child_chunks[segment['id']] = {}
+            for child in split_text(segment['content'], '\n', DEFAULT_CHILD_MAX_TOKENS):
+                self._new_child_chunk(segment, child)
+        
+        self._touch(params['dataset_id'], document)
+        return {'data': segment, 'doc_form': document['doc_form']}
+    
+    def _delete_segment(self, params, query, body):
+        self._segment(params)
+        del self.segments[params['document_id']][params['segment_id']]
+        self.child_chunks.pop(params['segment_id'], None)
+        self._touch(params['dataset_id'], self.documents[params['dataset_id']][params['document_id']])
+        return None
+    
+    # Child chunks
+    
+    def _list_child_chunks(self, params, query, body):
+        self._segment(params)
+        chunks = sorted(self.child_chunks[params['segment_id']].values(), key=lambda chunk: chunk['position'])
+        keyword = self._keyword(query)
+        if keyword:
+            chunks = [chunk for chunk in chunks if keyword in chunk['content'].lower()]
+        response = self._page(chunks, query)
+        response['total_pages'] = max(math.ceil(response['total'] / response['limit']), 1)
+        del response['has_more']
+        return response
+    
+    def _create_child_chunk(self, params, query, body):
+        segment = self._segment(params)
+        chunk = self._new_child_chunk(segment, self._json(body).get('content'))
+        self._touch(params['dataset_id'], self.documents[params['dataset_id']][params['document_id']])
+        return {'data': chunk}
+    
+    def _child_chunk(self, params: Dict[str, str]) -> Dict[str, Any]:
+        self._segment(params)
+        chunk = self.child_chunks[params['segment_id']].get(params['child_chunk_id'])
+        if chunk is None:
+            raise MockError(404, 'Child chunk not found')
+        return chunk
+    
+    def _update_child_chunk(self, params, query, body):
+        chunk = self._child_chunk(params)
+        content = self._json(body).get('content')
+        if not isinstance(content, str) or not content.strip():
+            raise MockError(400, 'Child chunk content is required')
+        chunk['content'] = content
+        chunk['word_count'] = _word_count(content)
+        chunk['tokens'] = _tokens(content)
+        self._touch(params['dataset_id'], self.documents[params['dataset_id']][params['document_id']])
+        return {'data': chunk}
+    
+    def _delete_child_chunk(self, params, query, body):
+        self._child_chunk(params)
+        del self.child_chunks[params['segment_id']][params['child_chunk_id']]
+        self._touch(params['dataset_id'], self.documents[params['dataset_id']][params['document_id']])
+        return None
+    
+    # Retrieval
+    
+    def _index(self, dataset_id: str) -> _LexicalIndex:
+        version = self._versions.get(dataset_id, 0)
+        cached = self._indexes.get(dataset_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        searchable = []
+        for document in self.documents[dataset_id].values():
+            if not document['enabled'] or document['archived']:
+                continue
+            for segment in self.segments[document['id']].values():
+                if segment['enabled']:
+                    searchable.append((segment, list(self.child_chunks[segment['id']].values())))
+        index = _LexicalIndex(searchable)
+        self._indexes[dataset_id] = (version, index)
+        return index
+    
+    def _retrieve(self, params, query, body):
+        dataset = self._dataset(params['dataset_id'])
+        data = self._json(body)
+        text = data.get('query')
+        if not isinstance(text, str) or not text.strip():
+            raise MockError(400, 'query is required')
+        
+        model = data.get('retrieval_model') or dataset['retrieval_model_dict'] or {}
+        field = SEARCH_FIELDS.get(model.get('search_method'), 'content')
+        threshold = model.get('score_threshold') if model.get('score_threshold_enabled') else None
+        
+        top_k = model.get('top_k') or 2
+        records = []
+        for segment_id, rank in self._index(params['dataset_id']).search(text, field):
+            # Squash the BM25 rank into 0..1, as LocalMirror does
+            score = rank / (1.0 + rank)
+            if len(records) >= top_k or (threshold is not None and score < threshold):
+                break
+            segment = self._find_segment(params['dataset_id'], segment_id)
+            document = self.documents[params['dataset_id']][segment['document_id']]
+            # Documents still indexing are not searchable yet
+            if self._refresh_document(document)['indexing_status'] != 'completed':
+                continue
+            segment['hit_count'] += 1
+            record = {
+                'segment': dict(segment, document={
+                    'id': document['id'],
+                    'data_source_type': document['data_source_type'],
+                    'name': document['name']
+                }),
+                'score': score,
+                'tsne_position': None
+            }
+            children = sorted(self.child_chunks[segment_id].values(), key=lambda chunk: chunk['position'])
+            if children:
+                record['child_chunks'] = children
+            records.append(record)
+        return {'query': {'content': text}, 'records': records}
+    
+    def _find_segment(self, dataset_id: str, segment_id: str) -> Dict[str, Any]:
+        for document_id in self.documents[dataset_id]:
+            segment = self.segments[document_id].get(segment_id)
+            if segment is not None:
+                return segment
+        raise MockError(404, 'Segment not found')
+    
+    # Metadata
+    
+    def _list_metadata(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        fields = []
+        for field in self.metadata[params['dataset_id']].values():
+            use_count = sum(
+                1 for document in self.documents[params['dataset_id']].values()
+                if any(item.get('id') == field['id'] for item in document['doc_metadata'])
+            )
+            fields.append(dict(field, use_count=use_count))
+        return {'doc_metadata': fields, 'built_in_field_enabled': self.builtin_metadata[params['dataset_id']]}
+    
+    def _create_metadata(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        data = self._json(body)
+        if data.get('type') not in ('string', 'number', 'time') or not data.get('name'):
+            raise MockError(400, "type must be 'string', 'number' or 'time' and name is required")
+        field = {'id': self._new_id(), 'type': data['type'], 'name': data['name']}
+        self.metadata[params['dataset_id']][field['id']] = field
+        return field
+    
+    def _metadata_field(self, params: Dict[str, str]) -> Dict[str, Any]:
+        self._dataset(params['dataset_id'])
+        field = self.metadata[params['dataset_id']].get(params['metadata_id'])
+        if field is None:
+            raise MockError(404, 'Metadata field not found')
+        return field
+    
+    def _update_metadata(self, params, query, body):
+        field = self._metadata_field(params)
+        name = self._json(body).get('name')
+        if not name:
+            raise MockError(400, 'name is required')
+        field['name'] = name
+        return field
+    
+    def _delete_metadata(self, params, query, body):
+        self._metadata_field(params)
+        del self.metadata[params['dataset_id']][params['metadata_id']]
+        return None
+    
+    def _enable_builtin_metadata(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        self.builtin_metadata[params['dataset_id']] = True
+        return {'result': 'success'}
+    
+    def _disable_builtin_metadata(self, params, query, body):
+        self._dataset(params['dataset_id'])
+        self.builtin_metadata[params['dataset_id']] = False
+        return {'result': 'success'}
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Room for a burst of connections from a high-concurrency benchmark
+    request_queue_size = 256
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockDify/1.0'
+    # Headers and body go out in separate writes; without this, delayed ACKs add 40ms per response
+    disable_nagle_algorithm = True
+    
+    def _read_body(self) -> Any:
+        if getattr(self, '_body_read', False):
+            return self._body
+        self._body_read = True
+        
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            reader = _ChunkedReader(self.rfile)
+        else:
+            reader = _BoundedReader(self.rfile, int(self.headers.get('Content-Length') or 0))
+        
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            boundary = content_type.split('boundary=', 1)[-1].split(';', 1)[0].strip().strip('"')
+            self._body = parse_multipart(reader.read, boundary.encode('latin-1'))
+            return self._body
+        
+        raw = b''.join(iter(lambda: reader.read(_READ_SIZE), b''))
+        if not raw:
+            self._body = None
+        else:
+            try:
+                self._body = json.loads(raw)
+            except ValueError:
+                raise MockError(400, 'Request body is not valid JSON')
+        return self._body
+    
+    def _dispatch(self) -> None:
+        self._body_read = False
+        url = urlsplit(self.path)
+        try:
+            status, body, headers = self.server.mock.handle(self.command, url.path, parse_qs(url.query),
+                                                            self.headers, self._read_body)
+        except Exception as e:
+            status, headers = 500, {}
+            body = json.dumps({'code': 'internal_server_error', 'message': str(e), 'status': 500}).encode('utf-8')
+        
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body or b'')))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+    
+    do_GET = do_POST = do_PATCH = do_DELETE = do_PUT = _dispatch
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.mock.verbose:
+            super().log_message(format, *args)
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on.')
+@click.option('--port', default=5001, show_default=True, help='Port to listen on.')
+@click.option('--api-key', default=None, help='Bearer token to require. Any token is accepted if unset.')
+@click.option('--latency', default=0.0, show_default=True, help='Seconds added to every response.')
+@click.option('--jitter', default=0.0, show_default=True, help='Up to this many random extra seconds.')
+@click.option('--error-rate', default=0.0, show_default=True, help='Fraction of requests failed with --error-status.')
+@click.option('--error-status', default=503, show_default=True, help='Status of injected errors.')
+@click.option('--throttle-rate', default=0.0, show_default=True, help='Fraction of requests answered with 429.')
+@click.option('--indexing-delay', default=0.0, show_default=True, help='Seconds documents spend indexing.')
+@click.option('--seed', default=None, type=int, help='Seed for ids and injected faults.')
+@click.option('--verbose', is_flag=True, help='Log every request.')
+def main(host, port, api_key, latency, jitter, error_rate, error_status, throttle_rate,
+         indexing_delay, seed, verbose):
+    """Run a local Dify Knowledge API stand-in."""
+    server = MockDifyServer(host=host, port=port, api_key=api_key, latency=latency, latency_jitter=jitter,
+                            error_rate=error_rate, error_status=error_status, throttle_rate=throttle_rate,
+                            indexing_delay=indexing_delay, seed=seed, verbose=verbose)
+    server._bind()
+    click.echo(f'Mock Dify API listening on {server.base_url}')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+from typing import Any, Iterator, List, Union
+
+import msgspec
+from msgspec import UNSET, UnsetType
+
+# Field types: a missing key stays UNSET, so it reads as absent rather than None
+_Str = Union[str, None, UnsetType]
+_Int = Union[int, None, UnsetType]
+_Float = Union[float, None, UnsetType]
+_Bool = Union[bool, None, UnsetType]
+_StrList = Union[List[str], None, UnsetType]
+_Any = Union[Any, UnsetType]
+
+
+class Record(msgspec.Struct, gc=False, repr_omit_defaults=True):
+    """Base of the typed response structures, readable like the dict it replaces.
+    
+    Fields missing from the response are UNSET and behave like absent keys:
+    ``'answer' in segment`` is False and ``segment.get('answer')`` returns the
+    default. ``dict(record)`` and ``to_dict()`` give plain dicts back.
+    """
+    
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, UNSET) if key in self.__struct_fields__ else UNSET
+        if value is UNSET:
+            raise KeyError(key)
+        return value
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, UNSET) if key in self.__struct_fields__ else UNSET
+        return default if value is UNSET else value
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__struct_fields__ and getattr(self, key) is not UNSET
+    
+    def keys(self) -> List[str]:
+        return [field for field in self.__struct_fields__ if getattr(self, field) is not UNSET]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+    
+    def __len__(self) -> int:
+        return len(self.keys())
+    
+    def to_dict(self) -> dict:
+        """Convert to plain dicts and lists, recursively."""
+        return msgspec.to_builtins(self)
+
+
+class ChildChunk(Record):
+    id: _Str = UNSET
+    segment_id: _Str = UNSET
+    content: _Str = UNSET
+    position: _Int = UNSET
+    word_count: _Int = UNSET
+    type: _Str = UNSET
+    score: _Float = UNSET
+    status: _Str = UNSET
+    created_at: _Int = UNSET
+    updated_at: _Int = UNSET
+    indexing_at: _Int = UNSET
+    completed_at: _Int = UNSET
+    error: _Str = UNSET
+
+
+class RecordDocument(Record):
+    id: _Str = UNSET
+    data_source_type: _Str = UNSET
+    name: _Str = UNSET
+    doc_type: _Str = UNSET
+    doc_metadata: _Any = UNSET
+
+
+class Segment(Record):
+    id: _Str = UNSET
+    position: _Int = UNSET
+    document_id: _Str = UNSET
+    content: _Str = UNSET
+    sign_content: _Str = UNSET
+    answer: _Str = UNSET
+    word_count: _Int = UNSET
+    tokens: _Int = UNSET
+    keywords: _StrList = UNSET
+    index_node_id: _Str = UNSET
+    index_node_hash: _Str = UNSET
+    hit_count: _Int = UNSET
+    enabled: _Bool = UNSET
+    disabled_at: _Int = UNSET
+    disabled_by: _Str = UNSET
+    status: _Str = UNSET
+    created_by: _Str = UNSET
+    created_at: _Int = UNSET
+    updated_at: _Int = UNSET
+    indexing_at: _Int = UNSET
+    completed_at: _Int = UNSET
+    error: _Str = UNSET
+    stopped_at: _Int = UNSET
+    child_chunks: Union[List[ChildChunk], None, UnsetType] = UNSET
+    # Only set on retrieval results
+    document: Union[RecordDocument, None, UnsetType] = UNSET
+
+
+class SegmentPage(Record):
+    data: Union[List[Segment], UnsetType] = UNSET
+    doc_form: _Str = UNSET
+    has_more: _Bool = UNSET
+    limit: _Int = UNSET
+    total: _Int = UNSET
+    page: _Int = UNSET
+
+
+class SegmentResult(Record):
+    data: Union[Segment, List[Segment], None, UnsetType] = UNSET
+    doc_form: _Str = UNSET
+
+
+class ChildChunkPage(Record):
+    data: Union[List[ChildChunk], UnsetType] = UNSET
+    total: _Int = UNSET
+    total_pages: _Int = UNSET
+    page: _Int = UNSET
+    limit: _Int = UNSET
+
+
+class RetrievalRecord(Record):
+    segment: Union[Segment, UnsetType] = UNSET
+    child_chunks: Union[List[ChildChunk], None, UnsetType] = UNSET
+    score: _Float = UNSET
+    tsne_position: _Any = UNSET
+
+
+class RetrievalQuery(Record):
+    content: _Str = UNSET
+
+
+class RetrievalResult(Record):
+    query: Union[RetrievalQuery, UnsetType] = UNSET
+    records: Union[List[RetrievalRecord], UnsetType] = UNSET
+
+
+# Structure each endpoint's successful response is decoded into, by (method, endpoint template)
+TYPED_RESPONSES = {
+    ('GET', '/datasets/{dataset_id}/documents/{document_id}/segments'): SegmentPage,
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/segments'): SegmentResult,
+    ('POST', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}'): SegmentResult,
+    ('GET', '/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks'): ChildChunkPage,
+    ('POST', '/datasets/{dataset_id}/retrieve'): RetrievalResult
+}
@@ -0,0 +1,183 @@
+import asyncio
+import io
+import mmap
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+# Bytes handed to the socket per write when streaming file contents
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Called with (bytes_sent, total_bytes, bytes_per_second) as the body is streamed
+ProgressCallback = Callable[[int, int, float], None]
+
+# madvise flag for releasing mapped pages once sent; not available on every platform
+_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None)
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+def _remaining_size(f: Any) -> Tuple[int, int]:
+    """Get the current position of a seekable file object and the bytes left after it."""
+    offset = f.tell()
+    try:
+        size = os.fstat(f.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        size = f.seek(0, os.SEEK_END)
+        f.seek(offset)
+    return offset, max(size - offset, 0)
+
+
+class MultipartEncoder:
+    """Streaming multipart/form-data body.
+    
+    Takes a requests-style ``files`` mapping (``{field: (filename, content, content_type)}``)
+    and plain form ``fields``. The length is known up front so the request is sent
+    with Content-Length rather than chunked, but the body is only produced while
+    iterating: file parts are sliced from an mmap of the file (or read in chunks
+    when it cannot be mapped), so memory use stays at one chunk regardless of the
+    file size. Every iteration starts from the beginning, so retries can resend it.
+    """
+    
+    def __init__(self, files: Dict[str, Any], fields: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress: Optional[ProgressCallback] = None,
+                 boundary: Optional[str] = None):
+        """Initialize the encoder.
+        
+        Args:
+            files: Parts as ``{field: (filename, content[, content_type])}`` or ``{field: content}``.
+                Content is str, bytes or a seekable binary file object, which is read from its
+                current position and must stay open while the body is sent.
+            fields: Plain form fields sent before the files.
+            chunk_size: Bytes per chunk when streaming file contents.
+            progress: Called with ``(bytes_sent, total_bytes, bytes_per_second)`` after every chunk.
+            boundary: Multipart boundary. Random by default.
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._parts = []
+        
+        for name, value in (fields or {}).items():
+            self._add_part(name, None, _to_bytes(value), None)
+        
+        for name, spec in files.items():
+            if isinstance(spec, tuple):
+                filename, content = spec[0], spec[1]
+                content_type = spec[2] if len(spec) > 2 else None
+            else:
+                filename, content, content_type = getattr(spec, 'name', name), spec, None
+            
+            if hasattr(content, 'read'):
+                self._add_part(name, filename, content, content_type or 'application/octet-stream')
+            else:
+                self._add_part(name, filename, _to_bytes(content), content_type)
+        
+        self._closing = f'--{self.boundary}--\r\n'.encode('ascii')
+        self._length = len(self._closing) + sum(
+            len(header) + size + 2 for header, _, _, size in self._parts
+        )
+    
+    def _add_part(self, name: str, filename: Optional[str], content: Any, content_type: Optional[str]) -> None:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{os.path.basename(str(filename))}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type:
+            header += f'Content-Type: {content_type}\r\n'
+        header = (header + '\r\n').encode('utf-8')
+        
+        if isinstance(content, bytes):
+            self._parts.append((header, content, 0, len(content)))
+        else:
+            offset, size = _remaining_size(content)
+            self._parts.append((header, content, offset, size))
+    
+    @property
+    def content_type(self) -> str:
+        """Content-Type header value, including the boundary."""
+        return f'multipart/form-data; boundary={self.boundary}'
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __iter__(self) -> Iterator[bytes]:
+        sent = 0
+        started = time.monotonic()
+        for chunk in self._iter_raw():
+            yield chunk
+            sent += len(chunk)
+            if self.progress is not None:
+                elapsed = time.monotonic() - started
+                self.progress(sent, self._length, sent / elapsed if elapsed > 0 else 0.0)
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # File reads can block on disk, so produce each chunk on the default executor
+        loop = asyncio.get_running_loop()
+        chunks = iter(self)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            try:
+                chunks.close()
+            except ValueError:
+                # Cancelled while the executor was still producing a chunk
+                pass
+    
+    def _iter_raw(self) -> Iterator[bytes]:
+        for header, content, offset, size in self._parts:
+            yield header
+            if isinstance(content, bytes):
+                if content:
+                    yield content
+            else:
+                yield from self._iter_file(content, offset, size)
+            yield b'\r\n'
+        yield self._closing
+    
+    def _iter_file(self, f: Any, offset: int, size: int) -> Iterator[bytes]:
+        mapped = self._map(f)
+        if mapped is None:
+            f.seek(offset)
+            remaining = size
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    raise OSError(f"File {getattr(f, 'name', '')} shrank while uploading")
+                remaining -= len(chunk)
+                yield chunk
+            return
+        
+        with mapped:
+            end = offset + size
+            if len(mapped) < end:
+                raise OSError(f"File {getattr(f, 'name', '')} shrank while uploading")
+            for start in range(offset, end, self.chunk_size):
+                stop = min(start + self.chunk_size, end)
+                yield mapped[start:stop]
+                if _DONTNEED is not None:
+                    # Unmap pages already sent so resident memory stays at one chunk
+                    page_start = start - start % mmap.PAGESIZE
+                    mapped.madvise(_DONTNEED, page_start, stop - page_start)
+    
+    @staticmethod
+    def _map(f: Any) -> Optional[mmap.mmap]:
+        """Map a file read-only, or return None for empty files, pipes and in-memory streams."""
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            return None
+        
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        return mapped
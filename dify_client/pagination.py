@@ -0,0 +1,198 @@
+import asyncio
+import collections
+import math
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from .tracing import ContextThreadPoolExecutor
+
+# Largest page size the Dify list endpoints accept
+MAX_PAGE_SIZE = 100
+
+
+def has_next_page(response: Dict[str, Any], page: int, limit: int) -> bool:
+    """Check whether a list response has more pages after ``page``."""
+    if 'has_more' in response:
+        return bool(response['has_more'])
+    
+    if response.get('total_pages') is not None:
+        return page < response['total_pages']
+    
+    if response.get('total') is not None:
+        return page * limit < response['total']
+    
+    # No paging metadata: a full page may be followed by another one
+    return len(response.get('data') or []) >= limit
+
+
+def last_page(response: Dict[str, Any], limit: int) -> Optional[int]:
+    """Get the last page number from a list response, or None if it reports no total."""
+    if response.get('total_pages') is not None:
+        return int(response['total_pages'])
+    
+    if response.get('total') is not None:
+        return max(math.ceil(response['total'] / limit), 1)
+    
+    return None
+
+
+def iter_pages(fetch_page: Callable[[int], Dict[str, Any]], limit: int,
+               start_page: int = 1, prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+    """Iterate over list responses page by page.
+    
+    With ``prefetch`` the next page is requested on a background thread while
+    the caller works through the current one. At most two pages are held in
+    memory either way.
+    """
+    page = start_page
+    
+    if not prefetch:
+        while True:
+            response = fetch_page(page)
+            yield response
+            if not response.get('data') or not has_next_page(response, page, limit):
+                return
+            page += 1
+    
+    executor = ContextThreadPoolExecutor(max_workers=1)
+    try:
+        pending = executor.submit(fetch_page, page)
+        while pending is not None:
+            response = pending.result()
+            pending = None
+            if response.get('data') and has_next_page(response, page, limit):
+                pending = executor.submit(fetch_page, page + 1)
+            yield response
+            page += 1
+    finally:
+        executor.shutdown(wait=False)
+
+
+def scan_pages(fetch_page: Callable[[int], Dict[str, Any]], limit: int,
+               start_page: int = 1, workers: int = 8) -> Iterator[Dict[str, Any]]:
+    """Fetch pages concurrently once the first page reports the total, yielding them in order.
+    
+    Up to ``workers`` pages are in flight at a time, so memory stays bounded by the
+    window rather than the collection size. Falls back to prefetching one page at a
+    time when the endpoint does not report a total.
+    """
+    first = fetch_page(start_page)
+    yield first
+    
+    if not first.get('data') or not has_next_page(first, start_page, limit):
+        return
+    
+    end_page = last_page(first, limit)
+    if end_page is None:
+        yield from iter_pages(fetch_page, limit, start_page=start_page + 1, prefetch=True)
+        return
+    
+    pages = iter(range(start_page + 1, end_page + 1))
+    executor = ContextThreadPoolExecutor(max_workers=workers)
+    window = collections.deque()
+    try:
+        for page in pages:
+            window.append(executor.submit(fetch_page, page))
+            if len(window) >= workers:
+                break
+        
+        while window:
+            response = window.popleft().result()
+            next_page = next(pages, None)
+            if next_page is not None:
+                window.append(executor.submit(fetch_page, next_page))
+            yield response
+    finally:
+        for future in window:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def iter_items(fetch_page: Callable[[int], Dict[str, Any]], limit: int,
+               start_page: int = 1, prefetch: bool = False, workers: int = 1) -> Iterator[Dict[str, Any]]:
+    """Iterate over the items of every page of a list endpoint.
+    
+    ``workers`` > 1 switches to ``scan_pages`` for full-collection scans.
+    """
+    if workers > 1:
+        pages = scan_pages(fetch_page, limit, start_page=start_page, workers=workers)
+    else:
+        pages = iter_pages(fetch_page, limit, start_page=start_page, prefetch=prefetch)
+    
+    for response in pages:
+        for item in response.get('data') or []:
+            yield item
+
+
+async def aiter_pages(fetch_page: Callable[[int], Awaitable[Dict[str, Any]]], limit: int,
+                      start_page: int = 1, prefetch: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of ``iter_pages``; prefetching runs the next request as a task."""
+    page = start_page
+    
+    if not prefetch:
+        while True:
+            response = await fetch_page(page)
+            yield response
+            if not response.get('data') or not has_next_page(response, page, limit):
+                return
+            page += 1
+    
+    pending = asyncio.ensure_future(fetch_page(page))
+    try:
+        while pending is not None:
+            response = await pending
+            pending = None
+            if response.get('data') and has_next_page(response, page, limit):
+                pending = asyncio.ensure_future(fetch_page(page + 1))
+            yield response
+            page += 1
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def ascan_pages(fetch_page: Callable[[int], Awaitable[Dict[str, Any]]], limit: int,
+                      start_page: int = 1, workers: int = 8) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of ``scan_pages``; up to ``workers`` page requests run as tasks."""
+    first = await fetch_page(start_page)
+    yield first
+    
+    if not first.get('data') or not has_next_page(first, start_page, limit):
+        return
+    
+    end_page = last_page(first, limit)
+    if end_page is None:
+        async for response in aiter_pages(fetch_page, limit, start_page=start_page + 1, prefetch=True):
+            yield response
+        return
+    
+    pages = iter(range(start_page + 1, end_page + 1))
+    window = collections.deque()
+    try:
+        for page in pages:
+            window.append(asyncio.ensure_future(fetch_page(page)))
+            if len(window) >= workers:
+                break
+        
+        while window:
+            response = await window.popleft()
+            next_page = next(pages, None)
+            if next_page is not None:
+                window.append(asyncio.ensure_future(fetch_page(next_page)))
+            yield response
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def aiter_items(fetch_page: Callable[[int], Awaitable[Dict[str, Any]]], limit: int,
+                      start_page: int = 1, prefetch: bool = False,
+                      workers: int = 1) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of ``iter_items``."""
+    if workers > 1:
+        pages = ascan_pages(fetch_page, limit, start_page=start_page, workers=workers)
+    else:
+        pages = aiter_pages(fetch_page, limit, start_page=start_page, prefetch=prefetch)
+    
+    async for response in pages:
+        for item in response.get('data') or []:
+            yield item
\ No newline at end of file
@@ -0,0 +1,275 @@
+import asyncio
+import collections
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; FileTokenBucket is POSIX-only
+    fcntl = None
+
+# Responses that mean the server wants us to slow down
+THROTTLE_STATUSES = frozenset([429, 503])
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter.
+    
+    Tokens refill continuously at ``rate`` per second up to ``burst``. Callers
+    reserve tokens and sleep for the returned delay, so waiting callers queue up
+    fairly instead of spinning. Subclasses override ``_locked``, ``_load`` and
+    ``_store`` to keep the bucket state somewhere other processes can see it.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Initialize the bucket.
+        
+        Args:
+            rate: Sustained requests per second.
+            burst: Maximum tokens that can accumulate while idle. Defaults to ``rate``, but
+                at least 1 so that rates below one per second can still admit a request.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1.0))
+        self._lock = threading.Lock()
+        self._state = (self.burst, time.monotonic())
+    
+    def _clock(self) -> float:
+        return time.monotonic()
+    
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            yield
+    
+    def _load(self) -> Tuple[float, float]:
+        return self._state
+    
+    def _store(self, tokens: float, updated: float) -> None:
+        self._state = (tokens, updated)
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket and get the seconds to wait before using them."""
+        with self._locked():
+            now = self._clock()
+            available, updated = self._load()
+            available = min(self.burst, available + max(now - updated, 0.0) * self.rate)
+            available -= tokens
+            self._store(available, now)
+        
+        # A negative balance is debt owed by callers already queued ahead of us
+        return -available / self.rate if available < 0 else 0.0
+    
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available. Returns the seconds waited."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Wait until tokens are available without blocking the event loop."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class SharedMemoryTokenBucket(TokenBucket):
+    """Token bucket kept in shared memory, for processes started by multiprocessing.
+    
+    Create it in the parent before starting workers and pass it to them (or let
+    them inherit it on fork); every process then draws from the same budget.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self._shared = multiprocessing.Array('d', 2)
+        super().__init__(rate, burst)
+    
+    def _clock(self) -> float:
+        return time.time()
+    
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._shared.get_lock():
+            yield
+    
+    def _load(self) -> Tuple[float, float]:
+        return self._shared[0], self._shared[1]
+    
+    def _store(self, tokens: float, updated: float) -> None:
+        self._shared[0] = tokens
+        self._shared[1] = updated
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # The thread lock is per process; only the shared array needs to travel
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket persisted in a local file and guarded by ``flock``.
+    
+    Any process on the host that points at the same path shares the budget, so
+    unrelated services using one API key can stay under its limit together.
+    """
+    
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None):
+        if fcntl is None:
+            raise RuntimeError("FileTokenBucket requires fcntl (POSIX)")
+        
+        self.path = path
+        self._fd = None
+        super().__init__(rate, burst)
+    
+    def _clock(self) -> float:
+        return time.time()
+    
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._fd = fd
+                yield
+            finally:
+                self._fd = None
+                os.close(fd)
+    
+    def _load(self) -> Tuple[float, float]:
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        raw = os.read(self._fd, 64).decode('ascii', 'ignore').split()
+        try:
+            return float(raw[0]), float(raw[1])
+        except (IndexError, ValueError):
+            # New or unreadable file: start with a full bucket
+            return self.burst, self._clock()
+    
+    def _store(self, tokens: float, updated: float) -> None:
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, f"{tokens:.6f} {updated:.6f}".encode('ascii'))
+
+
+class ConcurrencyGovernor:
+    """AIMD governor for the number of requests in flight.
+    
+    The limit grows by ``increase`` per window of successful calls and is cut by
+    ``decrease_factor`` when the server throttles (429/503) or the smoothed
+    latency exceeds ``latency_target``. Decreases happen at most once per
+    ``cooldown`` so one burst of 429s does not collapse the limit to the floor.
+    Works from threads (``acquire``) and asyncio tasks (``acquire_async``).
+    """
+    
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 increase: float = 1.0, decrease_factor: float = 0.5,
+                 latency_target: Optional[float] = None, cooldown: float = 1.0):
+        """Initialize the governor.
+        
+        Args:
+            initial: Starting number of concurrent requests.
+            min_limit: Floor for the limit.
+            max_limit: Ceiling for the limit.
+            increase: Slots added after a full window of successful calls.
+            decrease_factor: Multiplier applied to the limit on overload.
+            latency_target: Seconds of smoothed latency treated as overload. None disables.
+            cooldown: Minimum seconds between two decreases.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._latency_ewma = None
+        self._last_decrease = 0.0
+        self._decreases = 0
+        self._cond = threading.Condition()
+        self._async_waiters = collections.deque()
+    
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return max(int(self._limit), self.min_limit)
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a slot is free. Returns False if the timeout expired."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < self.limit, timeout):
+                return False
+            self._in_flight += 1
+            return True
+    
+    async def acquire_async(self) -> None:
+        """Wait for a free slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+    
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """Free a slot and feed the call outcome into the AIMD controller."""
+        with self._cond:
+            self._in_flight -= 1
+            self._record(latency, throttled)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, collections.deque()
+        
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+    
+    def _record(self, latency: Optional[float], throttled: bool) -> None:
+        if latency is not None:
+            if self._latency_ewma is None:
+                self._latency_ewma = latency
+            else:
+                self._latency_ewma += 0.1 * (latency - self._latency_ewma)
+        
+        slow = (self.latency_target is not None and self._latency_ewma is not None
+                and self._latency_ewma > self.latency_target)
+        
+        if throttled or slow:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                self._last_decrease = now
+                self._decreases += 1
+        else:
+            # Additive increase: +increase once per limit's worth of successes
+            self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the current limit, load and latency estimate."""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'latency_ewma': self._latency_ewma,
+                'decreases': self._decreases
+            }
+
+
+def _wake(waiter: 'asyncio.Future') -> None:
+    if not waiter.done():
+        waiter.set_result(None)
\ No newline at end of file
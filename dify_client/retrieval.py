@@ -1,7 +1,47 @@
-from typing import Dict, List, Optional, Any
-from .api_client import DifyAPIClient, APIError
+import asyncio
+import collections
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Iterable, List, Optional, Any, AsyncIterator, Iterator, Tuple
+from .api_client import DifyAPIClient, AsyncDifyAPIClient, APIError
+from .cache import normalize_query, retrieval_key
+from .federation import MERGE_STRATEGIES, federated_response
+from .hedging import HedgePolicy
+from .tracing import ContextThreadPoolExecutor, traced
 
+# Endpoint template of retrieve_chunks, for converting cached results with the client's codec
+RETRIEVE_TEMPLATE = '/datasets/{dataset_id}/retrieve'
 
+
+def _group_queries(queries: List[str]) -> Dict[str, List[int]]:
+    """Map each normalised query to the input positions it appears at, in first-seen order."""
+    positions = collections.OrderedDict()
+    for index, query in enumerate(queries):
+        positions.setdefault(normalize_query(query), []).append(index)
+    return positions
+
+
+def _fan_out(outcome: Dict[str, Any], queries: List[str], indices: List[int]) -> Iterator[Dict[str, Any]]:
+    """Give every input position that shares a query its own copy of the outcome."""
+    for index in indices:
+        yield dict(outcome, index=index, query=queries[index])
+
+
+class _InOrder:
+    """Buffer out-of-order results and release them in input order."""
+    
+    def __init__(self):
+        self.next_index = 0
+        self.buffered = {}
+    
+    def push(self, result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        self.buffered[result['index']] = result
+        while self.next_index in self.buffered:
+            yield self.buffered.pop(self.next_index)
+            self.next_index += 1
+
+
+@traced
 class RetrievalManager:
     """Manager for retrieval and metadata operations."""
     
@@ -10,8 +50,139 @@ class RetrievalManager:
     
     def retrieve_chunks(self, dataset_id: str, query: str,
                        retrieval_model: Optional[Dict[str, Any]] = None,
-                       external_retrieval_model: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Retrieve chunks from a knowledge base."""
+                       external_retrieval_model: Optional[Dict[str, Any]] = None,
+                       deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Retrieve chunks from a knowledge base.
+        
+        Served from the client's ``retrieval_cache`` when one is configured. With a
+        ``hedge_policy`` on the client, a slow request gets a duplicate and the first
+        answer wins. ``deadline`` bounds the whole call, retries and hedges included,
+        in seconds.
+        """
+        cache = self.client.retrieval_cache
+        if cache is None:
+            return self._retrieve(dataset_id, query, retrieval_model, external_retrieval_model, deadline)
+        
+        key = retrieval_key(dataset_id, query, retrieval_model, external_retrieval_model)
+        result, generation = cache.lookup(dataset_id, key)
+        if result is None:
+            result = self._retrieve(dataset_id, query, retrieval_model, external_retrieval_model, deadline)
+            cache.store(dataset_id, key, result, generation)
+            return result
+        return self.client.codec.convert(result, 'POST', RETRIEVE_TEMPLATE)
+    
+    def iter_retrieve_many(self, dataset_id: str, queries: Iterable[str],
+                           retrieval_model: Optional[Dict[str, Any]] = None,
+                           workers: int = 8, ordered: bool = False) -> Iterator[Dict[str, Any]]:
+        """Run many queries concurrently, yielding a result per query as it arrives.
+        
+        Queries that are identical after normalisation (case, whitespace) are sent
+        once. Requests still go through the client's rate limiter and governor.
+        
+        Args:
+            dataset_id: Knowledge base to search.
+            queries: Query strings.
+            retrieval_model: Retrieval configuration shared by every query.
+            workers: Maximum number of queries in flight.
+            ordered: Yield in input order instead of completion order.
+        
+        Yields:
+            Dicts with ``index`` (input position), ``query``, ``latency`` in seconds and
+            either ``result`` (the retrieve_chunks response) or ``error`` (the APIError).
+        """
+        queries = list(queries)
+        positions = _group_queries(queries)
+        in_order = _InOrder() if ordered else None
+        
+        executor = ContextThreadPoolExecutor(max_workers=max(min(workers, len(positions)), 1))
+        pending = {
+            executor.submit(self._timed_retrieve, dataset_id, queries[indices[0]], retrieval_model): indices
+            for indices in positions.values()
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in _fan_out(future.result(), queries, pending.pop(future)):
+                        if in_order is None:
+                            yield result
+                        else:
+                            yield from in_order.push(result)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def retrieve_many(self, dataset_id: str, queries: Iterable[str],
+                      retrieval_model: Optional[Dict[str, Any]] = None,
+                      workers: int = 8) -> List[Dict[str, Any]]:
+        """Run many queries concurrently and return their results in input order.
+        
+        A failed query does not fail the batch; its entry carries ``error`` instead
+        of ``result``. See ``iter_retrieve_many`` for the entry format.
+        """
+        queries = list(queries)
+        results = [None] * len(queries)
+        for result in self.iter_retrieve_many(dataset_id, queries, retrieval_model, workers=workers):
+            results[result['index']] = result
+        return results
+    
+    def federated_retrieve(self, dataset_ids: Iterable[str], query: str,
+                           retrieval_model: Optional[Dict[str, Any]] = None,
+                           top_k: int = 10, strategy: str = 'rrf',
+                           deadline: Optional[float] = None,
+                           **merge_options: Any) -> Dict[str, Any]:
+        """Query several knowledge bases in parallel and merge the results into one top-k.
+        
+        Args:
+            dataset_ids: Knowledge bases to search.
+            query: Query text.
+            retrieval_model: Retrieval configuration sent to every dataset. Its ``top_k``
+                should be at least ``top_k`` so each dataset returns enough candidates.
+            top_k: Number of merged records to return.
+            strategy: 'rrf' (reciprocal rank fusion), 'score' (per-dataset min-max
+                normalised scores) or 'quota' (per-dataset slots, see ``quotas``).
+            deadline: Seconds to wait for datasets. Slower ones are left out and the
+                response is marked ``partial``. None waits for all.
+            **merge_options: ``rrf_k`` for 'rrf', ``quotas`` ({dataset_id: slots}) for 'quota'.
+        
+        Returns:
+            Dict with ``records`` (each with ``dataset_id``, ``dataset_rank`` and
+            ``fused_score``), ``datasets`` (status, count and latency per dataset)
+            and ``partial``.
+        """
+        if strategy not in MERGE_STRATEGIES:
+            raise ValueError(f"Strategy must be one of {', '.join(MERGE_STRATEGIES)}")
+        
+        dataset_ids = list(dict.fromkeys(dataset_ids))
+        executor = ContextThreadPoolExecutor(max_workers=max(len(dataset_ids), 1))
+        futures = {
+            executor.submit(self._timed_retrieve, dataset_id, query, retrieval_model, deadline): dataset_id
+            for dataset_id in dataset_ids
+        }
+        try:
+            done, _ = wait(futures, timeout=deadline)
+        finally:
+            # Don't wait for stragglers; the deadline also bounds their requests
+            executor.shutdown(wait=False)
+        
+        outcomes = {futures[future]: future.result() for future in done}
+        return federated_response(query, dataset_ids, outcomes, top_k, strategy, **merge_options)
+    
+    def _timed_retrieve(self, dataset_id: str, query: str,
+                        retrieval_model: Optional[Dict[str, Any]],
+                        deadline: Optional[float] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = self.retrieve_chunks(dataset_id, query, retrieval_model, deadline=deadline)
+        except APIError as e:
+            return {'error': e, 'latency': time.monotonic() - started}
+        return {'result': result, 'latency': time.monotonic() - started}
+    
+    def _retrieve(self, dataset_id: str, query: str,
+                  retrieval_model: Optional[Dict[str, Any]] = None,
+                  external_retrieval_model: Optional[Dict[str, Any]] = None,
+                  deadline: Optional[float] = None) -> Dict[str, Any]:
         data = {'query': query}
         
         if retrieval_model:
@@ -20,7 +191,71 @@ class RetrievalManager:
         if external_retrieval_model:
             data['external_retrieval_model'] = external_retrieval_model
         
-        return self.client.post(f'/datasets/{dataset_id}/retrieve', data=data)
+        policy = self.client.hedge_policy
+        if policy is None:
+            return self._send_retrieve(dataset_id, data, deadline)
+        return self._hedged_retrieve(policy, dataset_id, data, deadline)
+    
+    def _send_retrieve(self, dataset_id: str, data: Dict[str, Any],
+                       deadline: Optional[float]) -> Dict[str, Any]:
+        # Retrieval is read-only, so it is always safe to retry (and to hedge)
+        return self.client.post(f'/datasets/{dataset_id}/retrieve', data=data, idempotent=True,
+                                deadline=deadline)
+    
+    def _timed_send(self, dataset_id: str, data: Dict[str, Any],
+                    deadline: Optional[float]) -> Tuple[Dict[str, Any], float]:
+        started = time.monotonic()
+        result = self._send_retrieve(dataset_id, data, deadline)
+        return result, time.monotonic() - started
+    
+    def _hedged_retrieve(self, policy: HedgePolicy, dataset_id: str, data: Dict[str, Any],
+                         deadline: Optional[float]) -> Dict[str, Any]:
+        """Send the request, and a duplicate if it outlives the policy's hedge delay.
+        
+        The first successful answer wins; if one attempt fails the other is still
+        awaited. The losing request cannot be interrupted and finishes in the background,
+        where its latency is still recorded: dropping the slow primaries would pull the
+        policy's percentile, and so the hedge delay, ever lower.
+        """
+        started = time.monotonic()
+        delay = policy.hedge_delay()
+        if delay is None or (deadline is not None and delay >= deadline):
+            result, latency = self._timed_send(dataset_id, data, deadline)
+            policy.record(latency)
+            return result
+        
+        executor = ContextThreadPoolExecutor(max_workers=2)
+        try:
+            attempts = [executor.submit(self._timed_send, dataset_id, data, deadline)]
+            done, _ = wait(attempts, timeout=delay)
+            if not done and policy.allow_hedge():
+                remaining = None if deadline is None else deadline - (time.monotonic() - started)
+                attempts.append(executor.submit(self._timed_send, dataset_id, data, remaining))
+            
+            pending, error = set(attempts), None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result, latency = future.result()
+                    except APIError as e:
+                        error = e
+                        continue
+                    policy.record(latency)
+                    if future is not attempts[0]:
+                        policy.record_hedge_win()
+                    for loser in attempts:
+                        if loser is not future:
+                            loser.add_done_callback(lambda f: self._record_loser(policy, f))
+                    return result
+            raise error
+        finally:
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _record_loser(policy: HedgePolicy, future: Any) -> None:
+        if not future.cancelled() and future.exception() is None:
+            policy.record(future.result()[1])
     
     def create_metadata(self, dataset_id: str, metadata_type: str, name: str) -> Dict[str, Any]:
         """Create knowledge metadata."""
@@ -33,7 +268,7 @@ class RetrievalManager:
     def update_metadata(self, dataset_id: str, metadata_id: str, name: str) -> Dict[str, Any]:
         """Update knowledge metadata."""
         data = {'name': name}
-        return self.client.patch(f'/datasets/{dataset_id}/metadata/{metadata_id}', data=data)
+        return self.client.patch(f'/datasets/{dataset_id}/metadata/{metadata_id}', data=data, idempotent=True)
     
     def delete_metadata(self, dataset_id: str, metadata_id: str) -> Dict[str, Any]:
         """Delete knowledge metadata."""
@@ -43,18 +278,22 @@ class RetrievalManager:
         """Get knowledge metadata list."""
         return self.client.get(f'/datasets/{dataset_id}/metadata')
     
+    def iter_metadata(self, dataset_id: str) -> Iterator[Dict[str, Any]]:
+        """Iterate over metadata fields. The endpoint is not paginated, so this is one request."""
+        yield from self.list_metadata(dataset_id).get('doc_metadata') or []
+    
     def toggle_builtin_metadata(self, dataset_id: str, action: str) -> Dict[str, Any]:
         """Enable or disable built-in metadata."""
         if action not in ['enable', 'disable']:
             raise ValueError("Action must be 'enable' or 'disable'")
         
-        return self.client.post(f'/datasets/{dataset_id}/metadata/built-in/{action}')
+        return self.client.post(f'/datasets/{dataset_id}/metadata/built-in/{action}', idempotent=True)
     
     def update_documents_metadata(self, dataset_id: str,
                                  operation_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Update documents metadata."""
         data = {'operation_data': operation_data}
-        return self.client.post(f'/datasets/{dataset_id}/documents/metadata', data=data)
+        return self.client.post(f'/datasets/{dataset_id}/documents/metadata', data=data, idempotent=True)
     
     def create_retrieval_model(self, search_method: str = 'semantic_search',
                              reranking_enable: bool = False,
@@ -98,4 +337,170 @@ class RetrievalManager:
         else:
             retrieval_model['score_threshold'] = None
         
-        return retrieval_model
\ No newline at end of file
+        return retrieval_model
+
+
+@traced
+class AsyncRetrievalManager(RetrievalManager):
+    """Async manager for retrieval and metadata operations.
+    
+    API methods return awaitables from the underlying AsyncDifyAPIClient;
+    ``create_retrieval_model`` stays a plain helper.
+    """
+    
+    def __init__(self, client: AsyncDifyAPIClient):
+        self.client = client
+    
+    async def retrieve_chunks(self, dataset_id: str, query: str,
+                              retrieval_model: Optional[Dict[str, Any]] = None,
+                              external_retrieval_model: Optional[Dict[str, Any]] = None,
+                              deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Retrieve chunks from a knowledge base, using the client's ``retrieval_cache`` if set.
+        
+        Hedging and ``deadline`` work as in ``RetrievalManager.retrieve_chunks``.
+        """
+        cache = self.client.retrieval_cache
+        if cache is None:
+            return await self._retrieve(dataset_id, query, retrieval_model, external_retrieval_model, deadline)
+        
+        key = retrieval_key(dataset_id, query, retrieval_model, external_retrieval_model)
+        result, generation = cache.lookup(dataset_id, key)
+        if result is None:
+            result = await self._retrieve(dataset_id, query, retrieval_model, external_retrieval_model, deadline)
+            cache.store(dataset_id, key, result, generation)
+            return result
+        return self.client.codec.convert(result, 'POST', RETRIEVE_TEMPLATE)
+    
+    async def iter_retrieve_many(self, dataset_id: str, queries: Iterable[str],
+                                 retrieval_model: Optional[Dict[str, Any]] = None,
+                                 workers: int = 8, ordered: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Run many queries as concurrent tasks, yielding results with ``async for``.
+        
+        See ``RetrievalManager.iter_retrieve_many``; ``workers`` caps the tasks in flight.
+        """
+        queries = list(queries)
+        positions = _group_queries(queries)
+        in_order = _InOrder() if ordered else None
+        semaphore = asyncio.Semaphore(max(workers, 1))
+        
+        async def run(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._timed_retrieve(dataset_id, query, retrieval_model)
+        
+        pending = {
+            asyncio.ensure_future(run(queries[indices[0]])): indices
+            for indices in positions.values()
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for result in _fan_out(task.result(), queries, pending.pop(task)):
+                        if in_order is None:
+                            yield result
+                        else:
+                            for ready in in_order.push(result):
+                                yield ready
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def retrieve_many(self, dataset_id: str, queries: Iterable[str],
+                            retrieval_model: Optional[Dict[str, Any]] = None,
+                            workers: int = 8) -> List[Dict[str, Any]]:
+        """Run many queries concurrently and return their results in input order."""
+        queries = list(queries)
+        results = [None] * len(queries)
+        async for result in self.iter_retrieve_many(dataset_id, queries, retrieval_model, workers=workers):
+            results[result['index']] = result
+        return results
+    
+    async def federated_retrieve(self, dataset_ids: Iterable[str], query: str,
+                                 retrieval_model: Optional[Dict[str, Any]] = None,
+                                 top_k: int = 10, strategy: str = 'rrf',
+                                 deadline: Optional[float] = None,
+                                 **merge_options: Any) -> Dict[str, Any]:
+        """Query several knowledge bases concurrently and merge the results into one top-k.
+        
+        See ``RetrievalManager.federated_retrieve``. Datasets that miss the deadline
+        have their requests cancelled.
+        """
+        if strategy not in MERGE_STRATEGIES:
+            raise ValueError(f"Strategy must be one of {', '.join(MERGE_STRATEGIES)}")
+        
+        dataset_ids = list(dict.fromkeys(dataset_ids))
+        tasks = {
+            asyncio.ensure_future(self._timed_retrieve(dataset_id, query, retrieval_model, deadline)): dataset_id
+            for dataset_id in dataset_ids
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        outcomes = {tasks[task]: task.result() for task in done}
+        return federated_response(query, dataset_ids, outcomes, top_k, strategy, **merge_options)
+    
+    async def _timed_retrieve(self, dataset_id: str, query: str,
+                              retrieval_model: Optional[Dict[str, Any]],
+                              deadline: Optional[float] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = await self.retrieve_chunks(dataset_id, query, retrieval_model, deadline=deadline)
+        except APIError as e:
+            return {'error': e, 'latency': time.monotonic() - started}
+        return {'result': result, 'latency': time.monotonic() - started}
+    
+    async def _timed_send(self, dataset_id: str, data: Dict[str, Any],
+                          deadline: Optional[float]) -> Tuple[Dict[str, Any], float]:
+        started = time.monotonic()
+        result = await self._send_retrieve(dataset_id, data, deadline)
+        return result, time.monotonic() - started
+    
+    async def _hedged_retrieve(self, policy: HedgePolicy, dataset_id: str, data: Dict[str, Any],
+                               deadline: Optional[float]) -> Dict[str, Any]:
+        """Hedged send as in RetrievalManager, except the losing request is cancelled.
+        
+        A cancelled primary never reports its latency, so when the hedge wins the time
+        the primary had been running is recorded instead, as a lower bound.
+        """
+        started = time.monotonic()
+        delay = policy.hedge_delay()
+        if delay is None or (deadline is not None and delay >= deadline):
+            result, latency = await self._timed_send(dataset_id, data, deadline)
+            policy.record(latency)
+            return result
+        
+        attempts = [asyncio.ensure_future(self._timed_send(dataset_id, data, deadline))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and policy.allow_hedge():
+                remaining = None if deadline is None else deadline - (time.monotonic() - started)
+                attempts.append(asyncio.ensure_future(self._timed_send(dataset_id, data, remaining)))
+            
+            pending, error = set(attempts), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result, latency = task.result()
+                    except APIError as e:
+                        error = e
+                        continue
+                    policy.record(latency)
+                    if task is not attempts[0]:
+                        policy.record_hedge_win()
+                        if not attempts[0].done():
+                            policy.record(time.monotonic() - started)
+                    return result
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+    
+    async def iter_metadata(self, dataset_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over metadata fields with ``async for``."""
+        response = await self.list_metadata(dataset_id)
+        for field in response.get('doc_metadata') or []:
+            yield field
\ No newline at end of file
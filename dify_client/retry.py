@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+
+# Methods that are safe to repeat without being marked idempotent by the caller
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'DELETE', 'PUT'])
+
+# 0 is used by APIError for transport failures (connection reset, timeout, ...)
+RETRYABLE_STATUSES = frozenset([0, 408, 429, 500, 502, 503, 504])
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    
+    if retry_at is None:
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy:
+    """Exponential backoff retry policy with jitter and Retry-After support.
+    
+    GET/DELETE (and other idempotent methods) are retried on transient failures.
+    POST and PATCH are only retried when the call is marked idempotent, since
+    repeating them could otherwise create duplicates, or when the server
+    rejected them outright with 429. Subclass and override
+    ``is_retryable`` or ``backoff`` to customise the policy.
+    """
+    
+    def __init__(self, max_attempts: int = 4,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 max_total_time: Optional[float] = 120.0,
+                 jitter: bool = True,
+                 respect_retry_after: bool = True,
+                 retry_statuses: Iterable[int] = RETRYABLE_STATUSES):
+        """Initialize the retry policy.
+        
+        Args:
+            max_attempts: Maximum number of attempts per call, including the first one.
+            backoff_base: Delay in seconds before the first retry; doubles on each attempt.
+            backoff_max: Upper bound for a single backoff delay.
+            max_total_time: Give up once this many seconds would be spent on one call. None disables.
+            jitter: Randomise delays ("full jitter") so concurrent clients don't retry in lockstep.
+            respect_retry_after: Wait for the server's Retry-After hint when it is present.
+            retry_statuses: HTTP statuses treated as transient. 0 means a transport failure.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_total_time = max_total_time
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+    
+    def is_retryable(self, method: str, status: int, idempotent: Optional[bool] = None) -> bool:
+        """Check whether a failed call may be repeated."""
+        if status not in self.retry_statuses:
+            return False
+        
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        
+        # A 429 means the server rejected the call before doing any work
+        return idempotent or status == 429
+    
+    def backoff(self, attempt: int) -> float:
+        """Get the backoff delay after the given (1-based) attempt."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+    
+    def get_retry_delay(self, method: str, status: int, attempt: int, elapsed: float,
+                        retry_after: Optional[float] = None,
+                        idempotent: Optional[bool] = None) -> Optional[float]:
+        """Get seconds to wait before the next attempt, or None to give up."""
+        if attempt >= self.max_attempts:
+            return None
+        
+        if not self.is_retryable(method, status, idempotent):
+            return None
+        
+        delay = self.backoff(attempt)
+        if self.respect_retry_after and retry_after is not None:
+            delay = max(delay, retry_after)
+        
+        if self.max_total_time is not None and elapsed + delay > self.max_total_time:
+            return None
+        
+        return delay
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class RetryStats:
+    """Thread-safe retry counters keyed by "METHOD /endpoint/template"."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+    
+    def _bump(self, key: str, field: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(key, {'retries': 0, 'exhausted': 0})
+            counts[field] += 1
+    
+    def record_retry(self, key: str) -> None:
+        """Record that a call to the endpoint is being retried."""
+        self._bump(key, 'retries')
+    
+    def record_exhausted(self, key: str) -> None:
+        """Record that a retried call still failed and was given up."""
+        self._bump(key, 'exhausted')
+    
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Get a copy of the current counters."""
+        with self._lock:
+            return {key: dict(counts) for key, counts in self._counts.items()}
\ No newline at end of file
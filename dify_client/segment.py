@@ -1,7 +1,10 @@
-from typing import Dict, List, Optional, Any
-from .api_client import DifyAPIClient, APIError
+from typing import Dict, List, Optional, Any, AsyncIterator, Iterator
+from .api_client import DifyAPIClient, AsyncDifyAPIClient, APIError
+from .pagination import MAX_PAGE_SIZE, iter_items, aiter_items
+from .tracing import traced
 
 
+@traced
 class SegmentManager:
     """Manager for segment/chunk operations."""
     
@@ -32,6 +35,20 @@ class SegmentManager:
         
         return self.client.get(f'/datasets/{dataset_id}/documents/{document_id}/segments', params=params)
     
+    def iter_segments(self, dataset_id: str, document_id: str,
+                      keyword: Optional[str] = None,
+                      status: Optional[str] = None,
+                      limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                      workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """Iterate over all chunks of a document, fetching pages lazily.
+        
+        Set ``workers`` above 1 to fetch the remaining pages concurrently once the
+        first page reports the total; items are still yielded in order.
+        """
+        return iter_items(lambda page: self.list_segments(dataset_id, document_id, keyword, status,
+                                                          page=page, limit=limit),
+                          limit, prefetch=prefetch, workers=workers)
+    
     def update_segment(self, dataset_id: str, document_id: str, segment_id: str,
                       content: Optional[str] = None,
                       answer: Optional[str] = None,
@@ -57,7 +74,8 @@ class SegmentManager:
             segment_data['regenerate_child_chunks'] = regenerate_child_chunks
         
         data = {'segment': segment_data}
-        return self.client.post(f'/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}', data=data)
+        return self.client.post(f'/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}', data=data,
+                                idempotent=True)
     
     def delete_segment(self, dataset_id: str, document_id: str, segment_id: str) -> Dict[str, Any]:
         """Delete a chunk in a document."""
@@ -83,11 +101,21 @@ class SegmentManager:
         
         return self.client.get(f'/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks', params=params)
     
+    def iter_child_chunks(self, dataset_id: str, document_id: str, segment_id: str,
+                          keyword: Optional[str] = None,
+                          limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                          workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """Iterate over all child chunks of a chunk, fetching pages lazily."""
+        return iter_items(lambda page: self.list_child_chunks(dataset_id, document_id, segment_id, keyword,
+                                                              page=page, limit=limit),
+                          limit, prefetch=prefetch, workers=workers)
+    
     def update_child_chunk(self, dataset_id: str, document_id: str, segment_id: str,
                           child_chunk_id: str, content: str) -> Dict[str, Any]:
         """Update a child chunk."""
         data = {'content': content}
-        return self.client.patch(f'/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks/{child_chunk_id}', data=data)
+        return self.client.patch(f'/datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}/child_chunks/{child_chunk_id}',
+                                 data=data, idempotent=True)
     
     def delete_child_chunk(self, dataset_id: str, document_id: str, segment_id: str,
                           child_chunk_id: str) -> Dict[str, Any]:
@@ -105,4 +133,35 @@ class SegmentManager:
         if keywords:
             segment['keywords'] = keywords
         
-        return segment
\ No newline at end of file
+        return segment
+
+
+@traced
+class AsyncSegmentManager(SegmentManager):
+    """Async manager for segment/chunk operations.
+    
+    API methods return awaitables from the underlying AsyncDifyAPIClient;
+    ``create_segment`` stays a plain helper.
+    """
+    
+    def __init__(self, client: AsyncDifyAPIClient):
+        self.client = client
+    
+    def iter_segments(self, dataset_id: str, document_id: str,
+                      keyword: Optional[str] = None,
+                      status: Optional[str] = None,
+                      limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                      workers: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over all chunks of a document with ``async for``."""
+        return aiter_items(lambda page: self.list_segments(dataset_id, document_id, keyword, status,
+                                                           page=page, limit=limit),
+                           limit, prefetch=prefetch, workers=workers)
+    
+    def iter_child_chunks(self, dataset_id: str, document_id: str, segment_id: str,
+                          keyword: Optional[str] = None,
+                          limit: int = MAX_PAGE_SIZE, prefetch: bool = False,
+                          workers: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over all child chunks of a chunk with ``async for``."""
+        return aiter_items(lambda page: self.list_child_chunks(dataset_id, document_id, segment_id, keyword,
+                                                               page=page, limit=limit),
+                           limit, prefetch=prefetch, workers=workers)
\ No newline at end of file
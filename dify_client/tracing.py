@@ -0,0 +1,341 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import operator
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # opentelemetry-api is only needed for OpenTelemetryTracer
+    otel_trace = None
+
+# Arguments recorded as span attributes (prefixed with "dify.") when a traced method receives them
+ID_ARGUMENTS = ('dataset_id', 'document_id', 'segment_id', 'child_chunk_id', 'batch')
+
+# Span of the innermost traced call in the current thread or asyncio task
+_current_span = contextvars.ContextVar('dify_client_current_span', default=None)
+
+
+class Span:
+    """A finished or running span, modelled on the OpenTelemetry span data.
+    
+    Ids are the OpenTelemetry sizes (128-bit trace, 64-bit span) and times are
+    nanoseconds since the epoch, so spans can be handed to any OTLP pipeline.
+    """
+    
+    def __init__(self, name: str, trace_id: int, span_id: int, parent_id: Optional[int],
+                 attributes: Optional[Dict[str, Any]], tracer: 'Tracer'):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = 'UNSET'
+        self.status_description = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self._tracer = tracer
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+    
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({'name': name, 'timestamp': time.time_ns(), 'attributes': dict(attributes or {})})
+    
+    def record_exception(self, exception: BaseException) -> None:
+        self.add_event('exception', {
+            'exception.type': type(exception).__name__,
+            'exception.message': str(exception)
+        })
+    
+    def set_status(self, status: str, description: Optional[str] = None) -> None:
+        """Set the status: 'UNSET', 'OK' or 'ERROR'."""
+        self.status = status
+        self.status_description = description
+    
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            self._tracer._finish(self)
+    
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds between start and end, or None while the span is running."""
+        return None if self.end_time is None else (self.end_time - self.start_time) / 1e9
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serialisable dict with hex ids, as OTLP/JSON writes them."""
+        return {
+            'name': self.name,
+            'trace_id': f'{self.trace_id:032x}',
+            'span_id': f'{self.span_id:016x}',
+            'parent_id': None if self.parent_id is None else f'{self.parent_id:016x}',
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'attributes': dict(self.attributes),
+            'events': list(self.events),
+            'status': self.status,
+            'status_description': self.status_description
+        }
+    
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, status={self.status}, duration={self.duration})"
+
+
+class InMemorySpanExporter:
+    """Keeps finished spans in memory, for tests and debugging without a collector."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+    
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+    
+    def get_finished_spans(self) -> List[Span]:
+        """Get finished spans in the order they ended."""
+        with self._lock:
+            return list(self._spans)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class Tracer:
+    """Creates spans for client calls and hands finished ones to an exporter.
+    
+    The current span lives in a context variable, so it follows asyncio tasks
+    automatically and follows work submitted to a ContextThreadPoolExecutor.
+    Pass one as the ``tracer`` client option; use OpenTelemetryTracer to report
+    to an OpenTelemetry SDK instead.
+    """
+    
+    def __init__(self, exporter: Optional[Any] = None):
+        """Initialize the tracer.
+        
+        Args:
+            exporter: Object with an ``export(spans)`` method, called with each span as
+                it ends. Defaults to a new InMemorySpanExporter.
+        """
+        self.exporter = exporter if exporter is not None else InMemorySpanExporter()
+    
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Start a span that is a child of the current span. It does not become current."""
+        parent = _current_span.get()
+        if parent is None:
+            trace_id, parent_id = random.getrandbits(128), None
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(name, trace_id, random.getrandbits(64), parent_id, attributes, self)
+    
+    @contextlib.contextmanager
+    def use_span(self, span: Span) -> Iterator[Span]:
+        """Make ``span`` the current span inside the block, without ending it."""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+    
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+    
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        """End a span, marking it failed if ``error`` is given."""
+        if isinstance(error, asyncio.CancelledError):
+            span.set_attribute('dify.cancelled', True)
+        elif error is not None and not isinstance(error, GeneratorExit):
+            span.record_exception(error)
+            for key, value in _error_attributes(error).items():
+                span.set_attribute(key, value)
+            span.set_status('ERROR', str(error))
+        span.end()
+    
+    @contextlib.contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        """Start a span, make it current for the block and end it afterwards."""
+        span = self.start_span(name, attributes)
+        try:
+            with self.use_span(span):
+                yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        self.end_span(span)
+    
+    def _finish(self, span: Span) -> None:
+        self.exporter.export([span])
+
+
+class OpenTelemetryTracer(Tracer):
+    """Tracer that reports spans through the OpenTelemetry API.
+    
+    Spans join whatever trace is current in OpenTelemetry, so client calls nest
+    under application spans, and are exported by the configured SDK.
+    """
+    
+    def __init__(self, tracer: Optional[Any] = None):
+        """Initialize the tracer.
+        
+        Args:
+            tracer: An OpenTelemetry tracer. Defaults to ``trace.get_tracer('dify_client')``
+                from the global tracer provider.
+        """
+        if otel_trace is None:
+            raise ImportError("opentelemetry-api is required for OpenTelemetryTracer. "
+                              "Install it with: pip install dify-knowledge-client[tracing]")
+        self.tracer = tracer or otel_trace.get_tracer('dify_client')
+    
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        return self.tracer.start_span(name, attributes=attributes)
+    
+    def use_span(self, span: Any) -> Any:
+        return otel_trace.use_span(span, end_on_exit=False,
+                                   record_exception=False, set_status_on_exception=False)
+    
+    def current_span(self) -> Any:
+        return otel_trace.get_current_span()
+    
+    def end_span(self, span: Any, error: Optional[BaseException] = None) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            span.set_attribute('dify.cancelled', True)
+        elif error is not None and not isinstance(error, GeneratorExit):
+            span.record_exception(error)
+            span.set_attributes(_error_attributes(error))
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(error)))
+        span.end()
+
+
+def _error_attributes(error: BaseException) -> Dict[str, Any]:
+    attributes = {'error.type': getattr(error, 'code', None) or type(error).__name__}
+    status = getattr(error, 'status', None)
+    if status:
+        attributes['http.response.status_code'] = status
+    return attributes
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs each task in a copy of the submitter's context.
+    
+    Spans started by a task become children of the span that was current when
+    it was submitted, rather than starting new traces.
+    """
+    
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _iterate(tracer: Tracer, span: Any, iterator: Iterator) -> Iterator:
+    # The span is current only while the wrapped generator runs, not while the caller
+    # handles the items it yielded
+    try:
+        while True:
+            with tracer.use_span(span):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+            yield item
+    except BaseException as e:
+        iterator.close()
+        tracer.end_span(span, e)
+        raise
+    tracer.end_span(span)
+
+
+async def _aiterate(tracer: Tracer, span: Any, iterator: Any) -> Any:
+    try:
+        while True:
+            with tracer.use_span(span):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+            yield item
+    except BaseException as e:
+        await iterator.aclose()
+        tracer.end_span(span, e)
+        raise
+    tracer.end_span(span)
+
+
+async def _await(tracer: Tracer, span: Any, awaitable: Any) -> Any:
+    try:
+        with tracer.use_span(span):
+            result = await awaitable
+    except BaseException as e:
+        tracer.end_span(span, e)
+        raise
+    tracer.end_span(span)
+    return result
+
+
+def _traced_method(method: Callable, get_client: Callable[[Any], Any]) -> Callable:
+    parameters = list(inspect.signature(method).parameters)[1:]
+    id_positions = [(index, name) for index, name in enumerate(parameters) if name in ID_ARGUMENTS]
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = getattr(get_client(self), 'tracer', None)
+        if tracer is None:
+            return method(self, *args, **kwargs)
+        
+        attributes = {'code.function': method.__name__}
+        for index, name in id_positions:
+            if index < len(args):
+                attributes[f'dify.{name}'] = args[index]
+            elif name in kwargs:
+                attributes[f'dify.{name}'] = kwargs[name]
+        
+        span = tracer.start_span(f'{type(self).__name__}.{method.__name__}', attributes)
+        try:
+            with tracer.use_span(span):
+                result = method(self, *args, **kwargs)
+        except BaseException as e:
+            tracer.end_span(span, e)
+            raise
+        
+        # Async managers return awaitables and iterators; keep the span open until they finish
+        if inspect.iscoroutine(result):
+            return _await(tracer, span, result)
+        if inspect.isgenerator(result):
+            return _iterate(tracer, span, result)
+        if inspect.isasyncgen(result):
+            return _aiterate(tracer, span, result)
+        tracer.end_span(span)
+        return result
+    
+    return wrapper
+
+
+def traced(cls: Optional[type] = None, *, client: str = 'client') -> Any:
+    """Class decorator that wraps every public method in a span when the client has a tracer.
+    
+    Methods of sync and async managers are both handled: spans stay open until a
+    returned awaitable completes or a returned iterator is exhausted. Untraced
+    calls cost one attribute lookup.
+    
+    Args:
+        cls: The class to decorate.
+        client: Dotted attribute path from an instance to its API client, e.g.
+            ``'segments.client'`` for helpers built on a manager.
+    """
+    get_client = operator.attrgetter(client)
+    
+    def decorate(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, _traced_method(member, get_client))
+        return cls
+    
+    return decorate if cls is None else decorate(cls)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion example for the Dify Knowledge Client.
+
+Uploads every file in a directory with several concurrent workers. Completed
+uploads are written to a checkpoint file, so re-running the script after a
+crash only uploads what is still missing.
+"""
+
+from dify_client.client import DifyClient
+from dify_client.ingest import BulkIngestor
+
+
+def main():
+    # Size the connection pool to the number of upload workers
+    client = DifyClient(pool_maxsize=8)
+    
+    kb_id = input("Enter knowledge base ID: ")
+    source = input("Enter a directory or glob pattern (e.g. docs/**/*.md): ")
+    
+    ingestor = BulkIngestor(
+        client.documents,
+        kb_id,
+        workers=8,
+        checkpoint_path="ingest_checkpoint.jsonl",
+        indexing_technique="high_quality",
+        process_rule={'mode': 'automatic'}
+    )
+    
+    counts = {'uploaded': 0, 'skipped': 0, 'failed': 0}
+    for result in ingestor.run(source):
+        counts[result['status']] += 1
+        if result['status'] == 'failed':
+            print(f"✗ {result['source']}: {result['error']}")
+        elif result['status'] == 'uploaded':
+            print(f"✓ {result['source']} -> {result['document_id']} (batch {result['batch']})")
+    
+    print(f"\nUploaded: {counts['uploaded']}, skipped: {counts['skipped']}, failed: {counts['failed']}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -14,6 +14,12 @@ setup(
         "tabulate>=0.9.0",
         "prompt-toolkit>=3.0.43",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.8.0"],
+        "tracing": ["opentelemetry-api>=1.0.0"],
+        "fast": ["orjson>=3.9.0"],
+        "typed": ["msgspec>=0.18.0"],
+    },
     entry_points={
         "console_scripts": [
             "dify-client=cli:main",
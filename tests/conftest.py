@@ -0,0 +1,28 @@
+import pytest
+
+from dify_client.client import DifyClient
+from dify_client.mock_server import MockDifyServer
+from dify_client.retry import RetryPolicy
+
+API_KEY = 'test-key'
+
+
+def fast_retries(max_attempts: int = 4) -> RetryPolicy:
+    """Retry policy with millisecond backoff, so tests that exercise retries stay quick."""
+    return RetryPolicy(max_attempts=max_attempts, backoff_base=0.001, backoff_max=0.01, jitter=False)
+
+
+@pytest.fixture
+def server():
+    with MockDifyServer(api_key=API_KEY, retry_after=0.01, seed=7) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return DifyClient(API_KEY, server.base_url, retry_policy=fast_retries())
+
+
+@pytest.fixture
+def dataset_id(client):
+    return client.knowledge_bases.create_dataset('tests')['id']
@@ -0,0 +1,94 @@
+import pytest
+
+from dify_client.api_client import APIError
+from dify_client.bulk import BulkSegments
+
+from .conftest import fast_retries
+
+ADD_SEGMENTS = 'POST /datasets/{dataset_id}/documents/{document_id}/segments'
+UPDATE_SEGMENT = 'POST /datasets/{dataset_id}/documents/{document_id}/segments/{segment_id}'
+
+
+@pytest.fixture
+def document_id(client, dataset_id):
+    return client.documents.create_document_from_text(dataset_id, 'bulk', 'existing')['document']['id']
+
+
+@pytest.fixture
+def bulk(client, dataset_id):
+    return BulkSegments(client.segments, dataset_id, workers=4, retry_policy=fast_retries(3),
+                        documents=client.documents)
+
+
+def contents(client, dataset_id, document_id):
+    return sorted(segment['content'] for segment in client.segments.iter_segments(dataset_id, document_id))
+
+
+def test_insert_packs_batches(client, dataset_id, document_id, bulk):
+    report = bulk.insert(document_id, ({'content': f'segment {i}'} for i in range(25)), batch_size=10)
+    assert (report['batches'], report['created'], report['failed']) == (3, 25, 0)
+    assert len(set(report['segment_ids'])) == 25
+    assert len(contents(client, dataset_id, document_id)) == 26
+
+
+def lose_first_response(client, monkeypatch):
+    """Make the first add_segments call store its segments but fail as if the response was lost."""
+    add_segments = client.segments.add_segments
+    calls = []
+    
+    def lossy(*args, **kwargs):
+        response = add_segments(*args, **kwargs)
+        calls.append(response)
+        if len(calls) == 1:
+            raise APIError('Connection reset', 'connection_error', 0)
+        return response
+    
+    monkeypatch.setattr(client.segments, 'add_segments', lossy)
+    return calls
+
+
+def test_lost_response_is_not_inserted_twice(client, dataset_id, document_id, bulk, monkeypatch):
+    calls = lose_first_response(client, monkeypatch)
+    segments = [{'content': 'existing'}, {'content': 'twin'}, {'content': 'twin'}]
+    report = bulk.insert(document_id, segments)
+    
+    assert len(calls) == 1
+    assert report['created'] == 3
+    stored = {segment['id'] for segment in calls[0]['data']}
+    # Content already in the document maps to the new segment, and twins stay distinct
+    assert set(report['segment_ids']) == stored
+    assert contents(client, dataset_id, document_id) == ['existing', 'existing', 'twin', 'twin']
+
+
+def test_update_and_delete(client, dataset_id, document_id, bulk):
+    bulk.insert(document_id, [{'content': f'old {i}'} for i in range(5)])
+    targets = list(bulk.select([document_id], keyword='old'))
+    assert len(targets) == 5
+    
+    assert bulk.disable(targets)['updated'] == 5
+    assert bulk.disable(bulk.select([document_id], keyword='old'))['skipped'] == 5
+    assert bulk.delete(targets)['deleted'] == 5
+    assert contents(client, dataset_id, document_id) == ['existing']
+
+
+def test_client_owns_retries_of_updates(client, server, dataset_id, document_id, bulk):
+    segment_id = bulk.insert(document_id, [{'content': 'flaky'}])['segment_ids'][0]
+    server.fail_next(20, 503, UPDATE_SEGMENT)
+    before = server.stats()['requests'].get(UPDATE_SEGMENT, 0)
+    
+    result = bulk.update([(document_id, segment_id)], {'content': 'changed'})
+    assert result['failed'] == 1
+    # Only the client's four attempts, not three bulk attempts of four each
+    assert server.stats()['requests'][UPDATE_SEGMENT] - before == 4
+
+
+def test_reconcile_child_chunks(client, dataset_id, document_id, bulk):
+    segment_id = bulk.insert(document_id, [{'content': 'parent'}])['segment_ids'][0]
+    client.segments.create_child_chunk(dataset_id, document_id, segment_id, 'keep')
+    client.segments.create_child_chunk(dataset_id, document_id, segment_id, 'replace me')
+    
+    report = bulk.reconcile_child_chunks([(document_id, segment_id, ['keep', 'new', 'added'])])
+    assert report['reconciled'] == 1
+    assert report['child_chunks'] == {'created': 1, 'updated': 1, 'deleted': 0}
+    children = client.segments.iter_child_chunks(dataset_id, document_id, segment_id)
+    assert sorted(chunk['content'] for chunk in children) == ['added', 'keep', 'new']
@@ -0,0 +1,54 @@
+from dify_client.cache import MemoryRetrievalCache, ResponseCache, SQLiteRetrievalCache
+from dify_client.client import DifyClient
+
+from .conftest import API_KEY, fast_retries
+
+GET_DATASET = 'GET /datasets/{dataset_id}'
+RETRIEVE = 'POST /datasets/{dataset_id}/retrieve'
+
+
+def make_client(server, **options):
+    return DifyClient(API_KEY, server.base_url, retry_policy=fast_retries(), **options)
+
+
+def test_response_cache_serves_repeat_reads_and_drops_them_on_write(server):
+    client = make_client(server, cache=ResponseCache())
+    dataset_id = client.knowledge_bases.create_dataset('cached')['id']
+    
+    for _ in range(3):
+        client.knowledge_bases.get_dataset(dataset_id)
+    assert server.stats()['requests'][GET_DATASET] == 1
+    
+    client.knowledge_bases.update_dataset(dataset_id, name='renamed')
+    assert client.knowledge_bases.get_dataset(dataset_id)['name'] == 'renamed'
+    assert server.stats()['requests'][GET_DATASET] == 2
+
+
+def check_retrieval_cache(server, cache):
+    client = make_client(server, retrieval_cache=cache)
+    dataset_id = client.knowledge_bases.create_dataset('retrieval')['id']
+    document_id = client.documents.create_document_from_text(dataset_id, 'a', 'cached answer')['document']['id']
+    
+    first = client.retrieval.retrieve_chunks(dataset_id, 'cached answer')
+    # Normalised queries share an entry
+    assert client.retrieval.retrieve_chunks(dataset_id, '  Cached   ANSWER ') == first
+    assert server.stats()['requests'][RETRIEVE] == 1
+    
+    # A write to the dataset drops its cached results
+    client.segments.add_segments(dataset_id, document_id, [{'content': 'another cached answer'}])
+    second = client.retrieval.retrieve_chunks(dataset_id, 'cached answer')
+    assert server.stats()['requests'][RETRIEVE] == 2
+    assert len(second['records']) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_memory_retrieval_cache(server):
+    check_retrieval_cache(server, MemoryRetrievalCache())
+
+
+def test_sqlite_retrieval_cache(server, tmp_path):
+    cache = SQLiteRetrievalCache(str(tmp_path / 'retrieval.db'))
+    try:
+        check_retrieval_cache(server, cache)
+    finally:
+        cache.close()
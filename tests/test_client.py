@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from dify_client.api_client import APIError
+from dify_client.client import AsyncDifyClient, DifyClient
+
+from .conftest import API_KEY, fast_retries
+
+
+def test_dataset_document_segment_flow(client, dataset_id):
+    assert any(dataset['id'] == dataset_id for dataset in client.knowledge_bases.iter_datasets())
+    
+    document = client.documents.create_document_from_text(dataset_id, 'guide', 'setup guide')['document']
+    created = client.segments.add_segments(dataset_id, document['id'],
+                                           [{'content': 'install the package'}, {'content': 'run the server'}])
+    assert len(created['data']) == 2
+    
+    segment_id = created['data'][0]['id']
+    client.segments.update_segment(dataset_id, document['id'], segment_id, content='install the client')
+    contents = [segment['content'] for segment in client.segments.iter_segments(dataset_id, document['id'])]
+    assert 'install the client' in contents
+    
+    records = client.retrieval.retrieve_chunks(dataset_id, 'install client')['records']
+    assert records[0]['segment']['content'] == 'install the client'
+    
+    client.segments.delete_segment(dataset_id, document['id'], segment_id)
+    assert len(list(client.segments.iter_segments(dataset_id, document['id']))) == 2
+    client.documents.delete_document(dataset_id, document['id'])
+    assert not list(client.documents.iter_documents(dataset_id))
+
+
+def test_pagination_walks_every_page(client, dataset_id):
+    for i in range(45):
+        client.documents.create_document_from_text(dataset_id, f'doc-{i}', f'text {i}')
+    names = [document['name'] for document in client.documents.iter_documents(dataset_id, limit=20)]
+    assert sorted(names) == sorted(f'doc-{i}' for i in range(45))
+
+
+def test_file_upload(client, dataset_id, tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_text('first paragraph\n\nsecond paragraph')
+    document = client.documents.create_document_from_file(dataset_id, str(path))['document']
+    assert document['name'] == 'notes.txt'
+
+
+def test_retrieve_many_keeps_input_order(client, dataset_id):
+    client.documents.create_document_from_text(dataset_id, 'a', 'apples and pears')
+    results = client.retrieval.retrieve_many(dataset_id, ['apples', 'pears', 'Apples '])
+    assert [result['query'] for result in results] == ['apples', 'pears', 'Apples ']
+    assert all('result' in result for result in results)
+
+
+def test_wrong_api_key_is_rejected(server):
+    client = DifyClient('wrong-key', server.base_url, retry_policy=None)
+    with pytest.raises(APIError) as excinfo:
+        client.knowledge_bases.list_datasets()
+    assert excinfo.value.status == 401
+
+
+def test_async_client_flow(server):
+    pytest.importorskip('aiohttp')
+    
+    async def main():
+        async with AsyncDifyClient(API_KEY, server.base_url, retry_policy=fast_retries()) as client:
+            dataset = await client.knowledge_bases.create_dataset('async')
+            response = await client.documents.create_document_from_text(dataset['id'], 'a', 'async text')
+            document_id = response['document']['id']
+            await client.segments.add_segments(dataset['id'], document_id, [{'content': 'awaited segment'}])
+            segments = [segment async for segment in client.segments.iter_segments(dataset['id'], document_id)]
+            result = await client.retrieval.retrieve_chunks(dataset['id'], 'awaited')
+            return segments, result
+    
+    segments, result = asyncio.run(main())
+    assert 'awaited segment' in [segment['content'] for segment in segments]
+    assert result['records'][0]['segment']['content'] == 'awaited segment'
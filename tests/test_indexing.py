@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from dify_client.indexing import IndexingWatcher
+
+
+def upload(client, dataset_id, name):
+    response = client.documents.create_document_from_text(dataset_id, name, f'{name} text')
+    return response['batch'], response['document']['id']
+
+
+@pytest.fixture
+def watcher(client, server):
+    server.indexing_delay = 0.2
+    with IndexingWatcher(client.documents, min_interval=0.02, max_interval=0.05) as watcher:
+        yield watcher
+
+
+def test_watch_resolves_when_indexed(client, dataset_id, watcher):
+    batch, document_id = upload(client, dataset_id, 'a')
+    documents = watcher.watch(dataset_id, batch).result(5)
+    assert [doc['indexing_status'] for doc in documents] == ['completed']
+    assert watcher.watch_document(dataset_id, batch, document_id).result(5)['id'] == document_id
+    assert watcher.summary()['pending'] == 0
+
+
+def test_cancelled_watch_does_not_stop_other_batches(client, dataset_id, watcher):
+    first, _ = upload(client, dataset_id, 'a')
+    second, _ = upload(client, dataset_id, 'b')
+    other = watcher.watch(dataset_id, first)
+    watcher.watch(dataset_id, first).cancel()
+    
+    assert watcher.watch(dataset_id, second).result(5)[0]['indexing_status'] == 'completed'
+    assert other.result(5)[0]['indexing_status'] == 'completed'
+    assert watcher._thread.is_alive()
+
+
+def test_cancelled_batch_stops_polling(client, dataset_id, watcher):
+    batch, document_id = upload(client, dataset_id, 'a')
+    watcher.watch(dataset_id, batch).cancel()
+    assert (dataset_id, batch) not in watcher._batches
+    assert not watcher._schedule
+    
+    # Watching it again starts afresh instead of raising CancelledError
+    assert watcher.watch_document(dataset_id, batch, document_id).result(5)['indexing_status'] == 'completed'
+
+
+def test_cancelled_document_future(client, dataset_id, watcher):
+    batch, document_id = upload(client, dataset_id, 'a')
+    watcher.watch_document(dataset_id, batch, document_id).cancel()
+    other, _ = upload(client, dataset_id, 'b')
+    
+    assert watcher.watch(dataset_id, other).result(5)[0]['indexing_status'] == 'completed'
+    assert watcher.watch_document(dataset_id, batch, document_id).result(5)['id'] == document_id
+
+
+def test_watch_async_timeout_leaves_batch_watchable(client, dataset_id, watcher):
+    batch, _ = upload(client, dataset_id, 'a')
+    
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(watcher.watch_async(dataset_id, batch), 0.01)
+        return await asyncio.wait_for(watcher.watch_async(dataset_id, batch), 5)
+    
+    assert asyncio.run(main())[0]['indexing_status'] == 'completed'
+
+
+def test_failing_batch_does_not_stop_thread(client, dataset_id, watcher):
+    good, _ = upload(client, dataset_id, 'a')
+    failed = watcher.watch(dataset_id, 'no-such-batch')
+    with pytest.raises(Exception):
+        failed.result(5)
+    assert watcher.watch(dataset_id, good).result(5)[0]['indexing_status'] == 'completed'
@@ -0,0 +1,46 @@
+from dify_client.ingest import BulkIngestor
+from dify_client.sync import DocumentSync
+
+
+def write_corpus(directory, count):
+    directory.mkdir(exist_ok=True)
+    for i in range(count):
+        (directory / f'doc-{i}.txt').write_text(f'document number {i}')
+    return directory
+
+
+def test_ingest_resumes_from_checkpoint(client, dataset_id, tmp_path):
+    corpus = write_corpus(tmp_path / 'corpus', 6)
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    
+    first = BulkIngestor(client.documents, dataset_id, workers=3, checkpoint_path=checkpoint).ingest(str(corpus))
+    assert (first['uploaded'], first['failed']) == (6, 0)
+    
+    second = BulkIngestor(client.documents, dataset_id, workers=3, checkpoint_path=checkpoint).ingest(str(corpus))
+    assert (second['uploaded'], second['skipped']) == (0, 6)
+    assert len(list(client.documents.iter_documents(dataset_id))) == 6
+
+
+def test_ingest_reports_failures(client, server, dataset_id):
+    server.fail_next(1, 400, 'POST /datasets/{dataset_id}/document/create-by-text')
+    report = BulkIngestor(client.documents, dataset_id, workers=1).ingest(
+        [{'name': 'a', 'text': 'first'}, {'name': 'b', 'text': 'second'}]
+    )
+    assert (report['uploaded'], report['failed']) == (1, 1)
+
+
+def test_sync_uploads_only_changes(client, dataset_id, tmp_path):
+    corpus = write_corpus(tmp_path / 'corpus', 3)
+    manifest = str(tmp_path / 'manifest.db')
+    
+    def sync():
+        return DocumentSync(client.documents, dataset_id, manifest, delete_missing=True).sync(str(corpus))
+    
+    assert sync()['created'] == 3
+    assert sync()['unchanged'] == 3
+    
+    (corpus / 'doc-0.txt').write_text('edited')
+    (corpus / 'doc-2.txt').unlink()
+    report = sync()
+    assert (report['updated'], report['unchanged'], report['deleted']) == (1, 1, 1)
+    assert len(list(client.documents.iter_documents(dataset_id))) == 2
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+from dify_client.mirror import LocalMirror, _PostingsIndex
+
+TEXTS = ['cats and dogs', 'cats chase mice', 'dogs chase cats around cats', 'birds sing', 'fish swim']
+
+
+@pytest.fixture
+def document(client, dataset_id):
+    document_id = client.documents.create_document_from_text(dataset_id, 'animals', 'zebra')['document']['id']
+    client.segments.add_segments(dataset_id, document_id, [{'content': text} for text in TEXTS])
+    return document_id
+
+
+def open_mirror(client, dataset_id, path, postings=False):
+    if postings:
+        # An existing postings table makes the mirror keep that backend
+        with sqlite3.connect(path) as conn:
+            _PostingsIndex.create(conn)
+    mirror = LocalMirror(client.documents, client.segments, dataset_id, str(path))
+    mirror.pull()
+    return mirror
+
+
+def scores(result):
+    return [(record['segment']['content'], round(record['score'], 9)) for record in result['records']]
+
+
+def test_backends_score_alike(client, dataset_id, document, tmp_path):
+    with open_mirror(client, dataset_id, tmp_path / 'fts.db') as fts, \
+            open_mirror(client, dataset_id, tmp_path / 'postings.db', postings=True) as postings:
+        assert postings.stats()['index'] == 'postings'
+        for query in ('cats', 'chase dogs', 'zebra', 'nothing'):
+            assert scores(fts.full_text_search(query)) == scores(postings.full_text_search(query))
+
+
+def test_term_in_every_segment_passes_threshold(client, dataset_id, tmp_path):
+    document_id = client.documents.create_document_from_text(dataset_id, 'a', 'common one')['document']['id']
+    client.segments.add_segments(dataset_id, document_id, [{'content': 'common two'}])
+    with open_mirror(client, dataset_id, tmp_path / 'fts.db') as mirror:
+        model = {'search_method': 'full_text_search', 'score_threshold_enabled': True, 'score_threshold': 0.1}
+        assert len(mirror.retrieve_chunks('common', model)['records']) == 2
+
+
+def test_disabled_segment_is_not_searchable(client, dataset_id, document, tmp_path):
+    segment = next(s for s in client.segments.iter_segments(dataset_id, document) if s['content'] == 'birds sing')
+    client.segments.update_segment(dataset_id, document, segment['id'], enabled=False)
+    with open_mirror(client, dataset_id, tmp_path / 'fts.db') as mirror:
+        assert not mirror.full_text_search('birds')['records']
+        client.segments.update_segment(dataset_id, document, segment['id'], enabled=True)
+        mirror.pull()
+        assert scores(mirror.full_text_search('birds'))[0][0] == 'birds sing'
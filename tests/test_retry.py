@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from dify_client.api_client import APIError
+from dify_client.client import AsyncDifyClient, DifyClient
+
+from .conftest import API_KEY, fast_retries
+
+LIST_DATASETS = 'GET /datasets'
+ADD_SEGMENTS = 'POST /datasets/{dataset_id}/documents/{document_id}/segments'
+
+
+def test_transient_503_is_retried(client, server):
+    server.fail_next(2, 503, LIST_DATASETS)
+    client.knowledge_bases.list_datasets()
+    assert server.stats()['injected'] == {503: 2}
+    assert client.api_client.retry_stats()[LIST_DATASETS]['retries'] == 2
+
+
+def test_retries_give_up_after_max_attempts(client, server):
+    server.fail_next(10, 503, LIST_DATASETS)
+    with pytest.raises(APIError) as excinfo:
+        client.knowledge_bases.list_datasets()
+    assert excinfo.value.status == 503
+    assert client.api_client.retry_stats()[LIST_DATASETS]['exhausted'] == 1
+
+
+def test_429_on_post_is_retried_with_retry_after(client, server, dataset_id):
+    document_id = client.documents.create_document_from_text(dataset_id, 'a', 'text')['document']['id']
+    server.fail_next(1, 429, ADD_SEGMENTS)
+    client.segments.add_segments(dataset_id, document_id, [{'content': 'after throttle'}])
+    assert server.stats()['injected'] == {429: 1}
+    assert 'after throttle' in [s['content'] for s in client.segments.iter_segments(dataset_id, document_id)]
+
+
+def test_503_on_post_is_not_retried(client, server, dataset_id):
+    # Adding segments is not idempotent, so an unknown outcome is surfaced
+    document_id = client.documents.create_document_from_text(dataset_id, 'a', 'text')['document']['id']
+    server.fail_next(1, 503, ADD_SEGMENTS)
+    with pytest.raises(APIError):
+        client.segments.add_segments(dataset_id, document_id, [{'content': 'lost'}])
+
+
+def test_no_retry_policy_fails_at_once(server):
+    client = DifyClient(API_KEY, server.base_url, retry_policy=None)
+    server.fail_next(1, 503, LIST_DATASETS)
+    with pytest.raises(APIError):
+        client.knowledge_bases.list_datasets()
+
+
+def test_async_client_retries(server):
+    pytest.importorskip('aiohttp')
+    
+    async def main():
+        async with AsyncDifyClient(API_KEY, server.base_url, retry_policy=fast_retries()) as client:
+            server.fail_next(1, 503, LIST_DATASETS)
+            server.fail_next(1, 429, LIST_DATASETS)
+            return await client.knowledge_bases.list_datasets()
+    
+    assert 'data' in asyncio.run(main())
+    assert server.stats()['injected'] == {503: 1, 429: 1}